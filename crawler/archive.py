@@ -0,0 +1,142 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from crawler.revalidation import body_hash
+from crawler.utils import normalize_url
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always available
+    zstandard = None
+
+
+def _compress(data: bytes, codec: str, level: int) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return zlib.compress(data, level)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("archive body is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+class PageArchive:
+    """
+    Content-addressed archive of every fetched page.
+    Bodies are stored once per SHA-256 (zstd if installed, else zlib) in a
+    SQLite blob table; each fetch adds a small row with URL, time, status and
+    fetch tier. `main.py --replay` re-parses the latest copy of each page
+    with the current selectors, without touching the network.
+    """
+
+    def __init__(self, path: str, codec: Optional[str] = None, level: Optional[int] = None):
+        self.path = path
+        if codec is None:
+            codec = "zstd" if zstandard else "zlib"
+        if codec == "zstd" and zstandard is None:
+            logger.warning("zstandard not installed, archiving with zlib")
+            codec = "zlib"
+        self.codec = codec
+        self.level = level if level is not None else (10 if codec == "zstd" else 6)
+
+        self._lock = threading.Lock()
+        # Shared by all shard processes in --processes mode: wait out their commits
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS bodies
+                              (hash TEXT PRIMARY KEY,
+                               codec TEXT,
+                               size INTEGER,
+                               data BLOB)''')
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS fetches
+                              (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                               supplier TEXT,
+                               url TEXT,
+                               url_clean TEXT,
+                               fetched_at REAL,
+                               status INTEGER,
+                               tier TEXT,
+                               body_hash TEXT)''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_fetches_supplier_url ON fetches(supplier, url_clean)")
+        self._conn.commit()
+
+        self.stats = {"stored": 0, "deduped": 0, "raw_bytes": 0, "stored_bytes": 0}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["PageArchive"]:
+        """
+        `archive: {enabled: true, path: ..., codec: zstd|zlib, level: N}`.
+        On by default, next to the products DB; None if disabled.
+        """
+        opts = config.get("archive") or {}
+        if opts.get("enabled") is False:
+            return None
+        path = opts.get("path")
+        if not path:
+            db_path = config.get("db_path", "products.db")
+            path = os.path.splitext(db_path)[0] + ".archive.db"
+        return cls(path, codec=opts.get("codec"), level=opts.get("level"))
+
+    def store(self, result, supplier: Optional[str] = None):
+        """Archive a FetchResult with a body; identical bodies are kept once"""
+        if not result.html:
+            return
+        raw = result.html.encode("utf-8", "replace")
+        digest = result.body_hash or body_hash(result.html)
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM bodies WHERE hash = ?", (digest,)).fetchone()
+            if exists:
+                self.stats["deduped"] += 1
+            else:
+                data = _compress(raw, self.codec, self.level)
+                self._conn.execute("INSERT INTO bodies (hash, codec, size, data) VALUES (?, ?, ?, ?)",
+                                   (digest, self.codec, len(raw), data))
+                self.stats["stored"] += 1
+                self.stats["raw_bytes"] += len(raw)
+                self.stats["stored_bytes"] += len(data)
+            self._conn.execute(
+                """INSERT INTO fetches (supplier, url, url_clean, fetched_at, status, tier, body_hash)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (supplier, result.url, normalize_url(result.url), time.time(), result.status, result.tier, digest))
+            self._conn.commit()
+
+    def latest(self, supplier: Optional[str] = None,
+               keep: Optional[Callable[[str], bool]] = None) -> Iterator[Tuple[str, float, str]]:
+        """(url, fetched_at, html) for the most recent fetch of every archived URL (those `keep` accepts)"""
+        where = "WHERE supplier = ?" if supplier else ""
+        params = (supplier,) if supplier else ()
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT f.url, f.fetched_at, f.body_hash FROM fetches f
+                    WHERE f.id IN (SELECT MAX(id) FROM fetches {where} GROUP BY url_clean)
+                    ORDER BY f.id""", params).fetchall()
+        for url, fetched_at, digest in rows:
+            if keep is not None and not keep(url):
+                continue
+            html = self.body(digest)
+            if html is not None:
+                yield url, fetched_at, html
+
+    def body(self, digest: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT codec, data FROM bodies WHERE hash = ?", (digest,)).fetchone()
+        if not row:
+            return None
+        return _decompress(row[1], row[0]).decode("utf-8", "replace")
+
+    def report(self) -> Dict[str, Any]:
+        ratio = self.stats["raw_bytes"] / self.stats["stored_bytes"] if self.stats["stored_bytes"] else None
+        return dict(self.stats, codec=self.codec, ratio=round(ratio, 1) if ratio else None)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,259 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+from crawler.core import CrawlerEngine
+from crawler.browser_pool import AsyncBrowserPool, BrowserPool
+from crawler import ratelimit
+from crawler.fetcher import FetchResult, is_challenge_page, CHALLENGE_TITLE, DEFAULT_HEADERS
+from crawler.revalidation import body_hash, conditional_headers
+from crawler.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCrawlerEngine(CrawlerEngine):
+    """
+    asyncio variant of CrawlerEngine.
+    One event loop drives up to `num_workers` in-flight requests over a shared
+    httpx client; challenge/blocked URLs escalate to pages leased from an
+    AsyncBrowserPool (sized by the `browser_pool` config section), which
+    also serves the clearance solves: one Chromium stack per crawl.
+    Uses the same config keys, URL rules and DataPipeline as the threaded engine.
+    """
+
+    RUN_MODE = "async"
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.async_pool = AsyncBrowserPool.from_config(config)
+        self._client = None
+        # httpx transport for the shared client (None: the network; tests use httpx.MockTransport)
+        self._transport = None
+
+    def run(self):
+        asyncio.run(self.run_async())
+
+    async def run_async(self):
+        import httpx
+
+        logger.info(f"Starting async crawl with concurrency {self.num_workers} at {self.base_url}")
+        self._open_frontier()
+        self._start_run()
+        self.start_time = time.time()
+        self.count = 0
+        self.in_flight = 0
+
+        headers = dict(DEFAULT_HEADERS)
+        limits = httpx.Limits(max_connections=self.num_workers, max_keepalive_connections=self.num_workers)
+        async with httpx.AsyncClient(headers=headers, limits=limits, timeout=20, follow_redirects=True,
+                                     transport=self._transport) as client:
+            self._client = client
+            if self.clearance and self._owns_pool:
+                # Solves run in worker threads (asyncio.to_thread) on pages leased from this loop's pool
+                self.browser_pool = BrowserPool.over(self.async_pool, asyncio.get_running_loop())
+                self.clearance.pool = self.browser_pool
+            writer = self._start_writer()
+            status = "failed"
+            try:
+                workers = [asyncio.create_task(self._worker()) for _ in range(self.num_workers)]
+                await asyncio.gather(*workers)
+                status = "stopped" if self.stop_event.is_set() else "finished"
+            finally:
+                await asyncio.to_thread(self._stop_writer, writer)
+                await self.async_pool.close()
+                # No-op for the view over async_pool; closes a pool nobody leased from otherwise
+                self.browser_pool.close()
+                self._finish_run(status)
+
+        self._log_frontier()
+        logger.info(f"Fetch tiers: {self._format_tier_counts()}")
+        logger.info(f"Browser pool: {self.async_pool.stats}")
+        if self.async_pool.resource_policy:
+            logger.info(f"Resource policy: {self.async_pool.resource_policy.report()}")
+        if self.validators:
+            logger.info(f"Revalidation: {self._revalidation_counts()}")
+        if self.archive:
+            logger.info(f"Archive: {self.archive.report()}")
+        logger.info(f"SKU index: {self.sku_index.report()}")
+
+    async def _worker(self):
+        while not self.stop_event.is_set():
+            # The frontier, validators and pipeline are SQLite-backed: every call goes to a thread
+            url = await asyncio.to_thread(self._lease)
+            if url is None:
+                # Frontier drained: done once nobody else can add more links
+                if self.in_flight == 0:
+                    return
+                await asyncio.sleep(0.05)
+                continue
+
+            self.in_flight += 1
+            ok = False
+            try:
+                ok = await self._process_url_async(url)
+            except Exception as e:
+                logger.error(f"Worker error processing {url}: {e}")
+            finally:
+                self._cards.pop(url, None)
+                await asyncio.to_thread(self.frontier.complete if ok else self.frontier.fail, url)
+                self.in_flight -= 1
+
+            self.count += 1
+            if self.count % 10 == 0:
+                elapsed = time.time() - self.start_time
+                rate = self.count / elapsed if elapsed > 0 else 0
+                logger.info(f"--- STATUS: {self.count} pages processed | Queue: {self.frontier.pending} | In-flight: {self.in_flight} | Rate: {rate:.2f} p/s | Limits: {self.rate_limiter.rates()} ---")
+
+    async def _process_url_async(self, url: str) -> bool:
+        logger.info(f"Processing: {url}")
+        with self.tracer.page(url) as trace:
+            with span("fetch"):
+                result = await self._fetch_page(url, dynamic=self.config.get("use_dynamic", False))
+            trace.tier = result.tier
+            self.tier_counts[result.tier] += 1
+
+            if self.archive and result.html:
+                with span("archive"):
+                    await asyncio.to_thread(self.archive.store, result, self.config.get("supplier"))
+            if result.unchanged:
+                with span("store"):
+                    await asyncio.to_thread(self._skip_unchanged, result)
+                trace.finish("unchanged", len(result.html or ""))
+                return True
+            if not result.html:
+                failures = self.consecutive_failures.incr()
+                logger.warning(f"Failed to fetch {url} (Consecutive failures: {failures})")
+                return False
+            self.consecutive_failures.reset()
+
+            # Parse, store and link admission are CPU work and blocking sqlite3: keep them off the event loop
+            await asyncio.to_thread(self._handle_page, url, result, trace)
+            return True
+
+    async def _fetch_page(self, url: str, dynamic: bool = False) -> FetchResult:
+        start = time.time()
+        result = FetchResult(url=url)
+        # Same rule as HTMLFetcher.fetch_page: only challenges/blocks and transport errors go to the browser
+        escalate = True
+
+        if not dynamic and (not self.clearance or self.clearance.http_usable(url)):
+            with span("fetch.throttle"):
+                await self.rate_limiter.acquire_async(url)
+            known = await asyncio.to_thread(self.validators.get, url) if self.validators else None
+            cond = conditional_headers(known)
+            try:
+                with span("fetch.http"):
+                    resp = await self._http_get(url, cond)
+                challenged = resp.status_code in (403, 503) or is_challenge_page(resp.text)
+                if challenged and self.clearance:
+                    # Solve once in the (threaded) browser pool, then retry over HTTP
+                    previous = self.clearance.get(url)
+                    with span("fetch.clearance"):
+                        solved = await asyncio.to_thread(self.clearance.solve, url, previous is not None)
+                    if solved:
+                        with span("fetch.http"):
+                            resp = await self._http_get(url, cond)
+                        challenged = resp.status_code in (403, 503) or is_challenge_page(resp.text)
+                    self.clearance.record_http_result(url, challenged)
+                result.status = resp.status_code
+                result.challenged = challenged
+                if resp.status_code in (429, 503):
+                    self.rate_limiter.record(url, ratelimit.THROTTLED)
+                elif challenged:
+                    self.rate_limiter.record(url, ratelimit.CHALLENGE)
+                elif resp.status_code >= 500:
+                    self.rate_limiter.record(url, ratelimit.ERROR)
+                else:
+                    self.rate_limiter.record(url, ratelimit.OK)
+                if resp.status_code == 304:
+                    result.not_modified = result.unchanged = True
+                    result.tier = "http"
+                elif resp.status_code < 400 and not challenged:
+                    result.html = resp.text
+                    result.tier = "http"
+                    if self.validators:
+                        result.etag = resp.headers.get("ETag")
+                        result.last_modified = resp.headers.get("Last-Modified")
+                        result.body_hash = body_hash(result.html)
+                        result.unchanged = bool(known) and known["body_hash"] == result.body_hash
+                elif not challenged:
+                    escalate = False
+                    logger.info(f"HTTP {resp.status_code} for {url}, not escalating")
+            except Exception as e:
+                self.rate_limiter.record(url, ratelimit.TIMEOUT)
+                logger.debug(f"Async HTTP fetch error for {url}: {e}")
+
+        if escalate and not result.html and not result.not_modified:
+            with span("fetch.browser"):
+                html = await self._fetch_dynamic(url)
+            if html:
+                result.html = html
+                result.tier = "browser"
+
+        result.elapsed = time.time() - start
+        return result
+
+    async def _http_get(self, url: str, extra_headers: Optional[dict] = None):
+        headers = dict(extra_headers or {})
+        c = self.clearance.get(url) if self.clearance else None
+        if c:
+            for cookie in c.cookies:
+                self._client.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""), path=cookie.get("path", "/"))
+            headers["User-Agent"] = c.user_agent
+        return await self._client.get(url, headers=headers or None)
+
+    async def _fetch_dynamic(self, url: str, retries: int = 2) -> Optional[str]:
+        async with self.async_pool.lease() as page:
+            c = self.clearance.get(url) if self.clearance else None
+            if c:
+                await page.context.add_cookies(c.cookies)
+            for attempt in range(retries):
+                saw_challenge = False
+                with span("fetch.throttle"):
+                    await self.rate_limiter.acquire_async(url)
+                try:
+                    with span("fetch.goto"):
+                        await page.goto(url, wait_until="load", timeout=60000)
+
+                    # Wait (without blocking the loop) for the challenge to auto-solve
+                    with span("fetch.challenge_wait"):
+                        for _ in range(20):
+                            try:
+                                if CHALLENGE_TITLE not in await page.title():
+                                    break
+                                saw_challenge = True
+                            except Exception:
+                                pass
+                            await asyncio.sleep(1)
+
+                    with span("fetch.content"):
+                        content = await page.content()
+                    if is_challenge_page(content):
+                        raise Exception("Blocked by anti-bot/captcha after challenge")
+
+                    with span("fetch.selector_wait"):
+                        try:
+                            await page.wait_for_selector("#tab-description, .product-info, #content", timeout=5000)
+                        except Exception:
+                            pass
+                    if saw_challenge and self.clearance:
+                        # We just paid for a solve: share it with the HTTP tier and the other leases
+                        cookies = await page.context.cookies()
+                        user_agent = await page.evaluate("navigator.userAgent")
+                        await asyncio.to_thread(self.clearance.store, url, cookies, user_agent)
+                    self.rate_limiter.record(url, ratelimit.OK)
+                    with span("fetch.content"):
+                        return await page.content()
+                except Exception as e:
+                    logger.warning(f"Async dynamic fetch attempt {attempt+1} failed for {url}: {e}")
+                    if "challenge" in str(e).lower() or "block" in str(e).lower():
+                        await page.context.clear_cookies()
+                        if self.clearance:
+                            await asyncio.to_thread(self.clearance.invalidate, url)
+                        # Domain-wide backoff; the retry waits in acquire_async()
+                        self.rate_limiter.record(url, ratelimit.CHALLENGE)
+                    else:
+                        self.rate_limiter.record(url, ratelimit.TIMEOUT)
+            logger.error(f"Async dynamic fetch failed for {url} after {retries} attempts.")
+            return None
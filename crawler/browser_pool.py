@@ -0,0 +1,352 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, List, Optional
+from crawler.resource_policy import ResourcePolicy
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+
+
+def pool_options(config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Pool kwargs from the optional `browser_pool` section of a supplier config:
+      browser_pool: {browsers: 1, pages: 4, max_navigations: 50, headless: true,
+                     slow_mo: 0, args: ["--no-sandbox"]}
+    `pages` defaults to num_workers so every worker can hold a page; `args`
+    are extra Chromium command-line switches, `slow_mo` delays every
+    Playwright operation by that many milliseconds. The
+    `resource_policy` section, if present, is installed on every pooled page.
+    """
+    opts = config.get("browser_pool") or {}
+    return {
+        "browsers": opts.get("browsers", 1),
+        "pages_per_browser": opts.get("pages", config.get("num_workers", 3)),
+        "max_navigations": opts.get("max_navigations", 50),
+        "headless": opts.get("headless", True),
+        "slow_mo": opts.get("slow_mo", 0),
+        "args": opts.get("args", []),
+        "resource_policy": ResourcePolicy.from_config(config),
+    }
+
+
+class PooledPage:
+    """One leasable browser context + page and its usage counters"""
+
+    def __init__(self, browser_index: int, context, page):
+        self.browser_index = browser_index
+        self.context = context
+        self.page = page
+        self.navigations = 0
+        self.created_at = time.time()
+
+    def _on_load(self, *_):
+        self.navigations += 1
+
+
+class AsyncBrowserPool:
+    """
+    A few Chromium processes shared by many workers.
+    Each browser hosts up to `pages_per_browser` context+page slots which are
+    leased one at a time. Slots are health-checked on lease and recycled
+    (context closed and recreated) after `max_navigations` page loads so
+    long crawls keep a bounded memory footprint.
+    """
+
+    def __init__(self, browsers: int = 1, pages_per_browser: int = 4, max_navigations: int = 50,
+                 headless: bool = True, user_agent: str = DEFAULT_USER_AGENT,
+                 viewport: Optional[Dict[str, int]] = None,
+                 resource_policy: Optional[ResourcePolicy] = None,
+                 slow_mo: float = 0, args: Optional[List[str]] = None):
+        self.num_browsers = max(1, browsers)
+        self.pages_per_browser = max(1, pages_per_browser)
+        self.max_navigations = max_navigations
+        self.headless = headless
+        self.user_agent = user_agent
+        self.viewport = viewport or {"width": 1920, "height": 1080}
+        self.resource_policy = resource_policy
+        self.slow_mo = slow_mo
+        self.args = list(args or [])
+
+        self._playwright = None
+        self._browsers: List[Any] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._created = 0
+        self._closed = False
+
+        self.stats = {"leases": 0, "recycled": 0, "unhealthy": 0, "browser_restarts": 0}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "AsyncBrowserPool":
+        return cls(**pool_options(config))
+
+    @property
+    def capacity(self) -> int:
+        return self.num_browsers * self.pages_per_browser
+
+    async def start(self):
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._playwright:
+                return
+            from playwright.async_api import async_playwright
+            self._playwright = await async_playwright().start()
+            self._closed = False
+            self._created = 0
+            self._browsers = [await self._launch() for _ in range(self.num_browsers)]
+            self._idle = asyncio.Queue()
+            logger.info(f"Browser pool started: {self.num_browsers} browser(s) x {self.pages_per_browser} page(s)")
+
+    async def _launch(self):
+        return await self._playwright.chromium.launch(
+            headless=self.headless,
+            slow_mo=self.slow_mo,
+            args=['--disable-blink-features=AutomationControlled', *self.args]
+        )
+
+    async def _new_slot(self, browser_index: int) -> PooledPage:
+        browser = self._browsers[browser_index]
+        if not browser.is_connected():
+            logger.warning(f"Browser {browser_index} disconnected, relaunching")
+            browser = self._browsers[browser_index] = await self._launch()
+            self.stats["browser_restarts"] += 1
+
+        context = await browser.new_context(user_agent=self.user_agent, viewport=self.viewport)
+        page = await context.new_page()
+        await self._apply_stealth(page)
+        page.set_default_timeout(30000)
+        if self.resource_policy:
+            await self.resource_policy.install(page)
+
+        slot = PooledPage(browser_index, context, page)
+        page.on("load", slot._on_load)
+        return slot
+
+    async def _apply_stealth(self, page):
+        try:
+            from playwright_stealth import Stealth
+            await Stealth().apply_stealth_async(page)
+        except ImportError:
+            try:
+                from playwright_stealth import stealth_async
+                await stealth_async(page)
+            except ImportError:
+                pass
+
+    async def _is_healthy(self, slot: PooledPage) -> bool:
+        if slot.page.is_closed() or not self._browsers[slot.browser_index].is_connected():
+            return False
+        try:
+            await asyncio.wait_for(slot.page.evaluate("1"), timeout=5)
+            return True
+        except Exception:
+            return False
+
+    async def _discard(self, slot: PooledPage):
+        try:
+            await slot.context.close()
+        except Exception:
+            pass
+
+    async def acquire(self) -> PooledPage:
+        await self.start()
+        while True:
+            if not self._idle.empty():
+                slot = self._idle.get_nowait()
+                break
+            if self._created < self.capacity:
+                # Grow lazily, spreading slots across browsers
+                browser_index = self._created % self.num_browsers
+                self._created += 1
+                try:
+                    slot = await self._new_slot(browser_index)
+                except Exception:
+                    self._created -= 1
+                    raise
+                break
+            try:
+                slot = await asyncio.wait_for(self._idle.get(), timeout=1)
+                break
+            except asyncio.TimeoutError:
+                # Re-check capacity: a slot may have been dropped meanwhile
+                continue
+
+        if not await self._is_healthy(slot):
+            self.stats["unhealthy"] += 1
+            await self._discard(slot)
+            slot = await self._new_slot(slot.browser_index)
+
+        self.stats["leases"] += 1
+        return slot
+
+    async def release(self, slot: PooledPage, healthy: bool = True):
+        if self._closed:
+            await self._discard(slot)
+            return
+        if not healthy or (self.max_navigations and slot.navigations >= self.max_navigations):
+            self.stats["recycled"] += 1
+            await self._discard(slot)
+            try:
+                slot = await self._new_slot(slot.browser_index)
+            except Exception as e:
+                logger.error(f"Failed to recreate browser page: {e}")
+                self._created -= 1
+                return
+        self._idle.put_nowait(slot)
+
+    @asynccontextmanager
+    async def lease(self):
+        """async with pool.lease() as page: ..."""
+        slot = await self.acquire()
+        healthy = True
+        try:
+            yield slot.page
+        except Exception:
+            healthy = not slot.page.is_closed()
+            raise
+        finally:
+            await self.release(slot, healthy=healthy)
+
+    async def close(self):
+        self._closed = True
+        for browser in self._browsers:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        self._browsers = []
+        self._idle = None
+        self._start_lock = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+class SyncProxy:
+    """
+    Thread-safe synchronous view of an async Playwright object.
+    Every call is executed on the pool's event loop thread; coroutines are
+    awaited and Playwright objects in the result are wrapped again, so code
+    written against the sync API (page.goto(...).text(), page.title(),
+    page.context.clear_cookies()) keeps working on a leased page.
+    """
+
+    def __init__(self, target, pool: "BrowserPool"):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_pool", pool)
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if not callable(value):
+            return self._pool._wrap(value)
+
+        def call(*args, **kwargs):
+            return self._pool._call(value, *args, **kwargs)
+        return call
+
+    def __repr__(self):
+        return f"SyncProxy({self._target!r})"
+
+
+class BrowserPool:
+    """
+    Synchronous facade over AsyncBrowserPool for threaded callers.
+    The pool runs its own event loop on a daemon thread; worker threads lease
+    pages with `with pool.lease() as page:` and use them like sync Playwright pages.
+    The browsers are only launched on the first lease.
+    """
+
+    def __init__(self, **kwargs):
+        self._async_pool = AsyncBrowserPool(**kwargs)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._owns_loop = True
+
+    @classmethod
+    def over(cls, async_pool: AsyncBrowserPool, loop: asyncio.AbstractEventLoop) -> "BrowserPool":
+        """
+        Sync view of an AsyncBrowserPool that runs on `loop` (the async
+        engine's): threads leave that loop to lease its pages, so no second
+        Chromium is launched. close() leaves the pool and loop to their owner.
+        """
+        pool = cls.__new__(cls)
+        pool._async_pool = async_pool
+        pool._loop = loop
+        pool._thread = None
+        pool._lock = threading.Lock()
+        pool._owns_loop = False
+        return pool
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "BrowserPool":
+        """Build from the optional `browser_pool` section of a supplier config"""
+        return cls(**pool_options(config))
+
+    @property
+    def capacity(self) -> int:
+        return self._async_pool.capacity
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self._async_pool.stats)
+
+    @property
+    def resource_policy(self) -> Optional[ResourcePolicy]:
+        return self._async_pool.resource_policy
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="browser-pool", daemon=True)
+            self._thread.start()
+
+    def _run(self, coro):
+        self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _call(self, fn, *args, **kwargs):
+        async def invoke():
+            result = fn(*args, **kwargs)
+            if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+                result = await result
+            return result
+        return self._wrap(self._run(invoke()))
+
+    def _wrap(self, value):
+        if isinstance(value, list):
+            return [self._wrap(v) for v in value]
+        if type(value).__module__.startswith("playwright."):
+            return SyncProxy(value, self)
+        return value
+
+    @contextmanager
+    def lease(self):
+        """with pool.lease() as page: ... (page behaves like a sync Playwright Page)"""
+        slot = self._run(self._async_pool.acquire())
+        healthy = True
+        try:
+            yield SyncProxy(slot.page, self)
+        except Exception:
+            healthy = not slot.page.is_closed()
+            raise
+        finally:
+            self._run(self._async_pool.release(slot, healthy=healthy))
+
+    def close(self):
+        if not self._loop or not self._owns_loop:
+            return
+        try:
+            self._run(self._async_pool.close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=10)
+            self._loop.close()
+            self._loop = None
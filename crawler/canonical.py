@@ -0,0 +1,46 @@
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from crawler.utils import normalize_url
+
+
+class UrlCanonicalizer:
+    """
+    Per-supplier URL identity for frontier admission.
+    URLs are normalized with normalize_url (host case, fragments, tracking
+    params, query order, trailing slash) plus the supplier's own `strip_params`.
+    URLs for which `sku_of` returns a SKU share one dedup key per SKU, so
+    path aliases of the same product are only fetched once. The engine's
+    sku_of is its UrlClassifier's (sku_url_regex on the full URL, product
+    URLs only), so the keys agree with the SKUs the crawler extracts.
+    """
+
+    def __init__(self, strip_params: Iterable[str] = (), sku_of: Optional[Callable[[str], str]] = None):
+        self.strip_params = {p.lower() for p in strip_params}
+        self.sku_of = sku_of
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any],
+                    sku_of: Optional[Callable[[str], str]] = None) -> "UrlCanonicalizer":
+        """`canonical: {strip_params: [...], collapse_sku_aliases: true}`"""
+        opts = config.get("canonical") or {}
+        return cls(strip_params=opts.get("strip_params", []),
+                   sku_of=sku_of if opts.get("collapse_sku_aliases", True) else None)
+
+    def canonical_url(self, url: str) -> str:
+        url = normalize_url(url)
+        if not self.strip_params:
+            return url
+        parsed = urlparse(url)
+        if not parsed.query:
+            return url
+        query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+                 if k.lower() not in self.strip_params]
+        return urlunparse(parsed._replace(query=urlencode(query)))
+
+    def __call__(self, url: str) -> Tuple[str, str]:
+        """(canonical URL to fetch, dedup key)"""
+        canonical = self.canonical_url(url)
+        sku = self.sku_of(canonical) if self.sku_of else ""
+        if sku:
+            return canonical, f"sku:{sku.upper()}"
+        return canonical, canonical
@@ -0,0 +1,235 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+from crawler.browser_pool import BrowserPool
+
+logger = logging.getLogger(__name__)
+
+# Analytics / ad cookies: their lifetime says nothing about the clearance
+TRACKING_COOKIE_PREFIXES = ("_ga", "_gat", "_gid", "_gcl", "_fbp", "_hj", "_clck", "_clsk", "_uet")
+# Cookies about to expire anyway (throttles like _gat) don't bound the clearance either
+MIN_COOKIE_TTL = 60
+
+
+def domain_key(url: str) -> str:
+    """Clearance is shared per registrable host: www.x.com and x.com are one domain"""
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def clearance_expiry(cookies: List[Dict[str, Any]], domain: str, now: float, default: float) -> float:
+    """
+    Earliest expiry among the cookies that can carry the clearance: set for
+    `domain` (or a parent / subdomain of it), not tracking cookies, and not
+    expiring within MIN_COOKIE_TTL. `default` caps it.
+    """
+    expires_at = default
+    for c in cookies:
+        expires = c.get("expires", -1)
+        if expires <= 0 or expires < now + MIN_COOKIE_TTL:
+            continue
+        if c.get("name", "").startswith(TRACKING_COOKIE_PREFIXES):
+            continue
+        cookie_domain = c.get("domain", "").lstrip(".").lower()
+        if cookie_domain.startswith("www."):
+            cookie_domain = cookie_domain[4:]
+        if cookie_domain and not (cookie_domain == domain or domain.endswith("." + cookie_domain)
+                                  or cookie_domain.endswith("." + domain)):
+            continue
+        expires_at = min(expires_at, expires)
+    return expires_at
+
+
+class Clearance:
+    """Cookies + user agent that passed a domain's challenge"""
+
+    def __init__(self, domain: str, cookies: List[Dict[str, Any]], user_agent: str,
+                 obtained_at: float, expires_at: float):
+        self.domain = domain
+        self.cookies = cookies
+        self.user_agent = user_agent
+        self.obtained_at = obtained_at
+        self.expires_at = expires_at
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+    def apply_to_session(self, session):
+        """Load cookies + UA into a requests.Session"""
+        for c in self.cookies:
+            session.cookies.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+        if self.user_agent:
+            session.headers["User-Agent"] = self.user_agent
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "domain": self.domain,
+            "cookies": self.cookies,
+            "user_agent": self.user_agent,
+            "obtained_at": self.obtained_at,
+            "expires_at": self.expires_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Clearance":
+        return cls(data["domain"], data.get("cookies", []), data.get("user_agent", ""),
+                   data.get("obtained_at", 0), data.get("expires_at", 0))
+
+
+class ClearanceManager:
+    """
+    Solves a domain's anti-bot challenge once in a browser and shares the
+    resulting cookies + user agent with every worker (HTTP tier and browser
+    leases) until they expire. Clearances are persisted to `path` so a cold
+    start does not pay the challenge again.
+    If the HTTP tier keeps getting challenged even with a fresh clearance
+    (e.g. TLS fingerprinting), the domain is marked browser-only.
+    """
+
+    MAX_HTTP_FAILURES = 3
+
+    def __init__(self, pool: BrowserPool, path: str = ".clearance.json", ttl: int = 3600,
+                 challenge_timeout: int = 30):
+        self.pool = pool
+        self.path = path
+        self.ttl = ttl
+        self.challenge_timeout = challenge_timeout
+        self._clearances: Dict[str, Clearance] = {}
+        self._domain_locks: Dict[str, threading.Lock] = {}
+        # Consecutive HTTP-tier challenges per domain despite a (re)solved clearance
+        self._http_failures: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {"solved": 0, "reused": 0, "failed": 0}
+        self._load()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], pool: BrowserPool) -> Optional["ClearanceManager"]:
+        """`clearance: {enabled: true, path: .clearance.json, ttl: 3600}`; None if disabled"""
+        opts = config.get("clearance")
+        if not opts or opts.get("enabled") is False:
+            return None
+        return cls(pool, path=opts.get("path", ".clearance.json"), ttl=opts.get("ttl", 3600),
+                   challenge_timeout=opts.get("challenge_timeout", 30))
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                for data in json.load(f):
+                    c = Clearance.from_dict(data)
+                    if not c.expired:
+                        self._clearances[c.domain] = c
+            if self._clearances:
+                logger.info(f"Loaded clearance for: {', '.join(self._clearances)}")
+        except Exception as e:
+            logger.warning(f"Failed to load clearance store {self.path}: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump([c.to_dict() for c in self._clearances.values()], f, indent=2)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"Failed to save clearance store {self.path}: {e}")
+
+    def get(self, url: str) -> Optional[Clearance]:
+        """Valid clearance for the URL's domain, if any"""
+        with self._lock:
+            c = self._clearances.get(domain_key(url))
+        if c and not c.expired:
+            return c
+        return None
+
+    def http_usable(self, url: str) -> bool:
+        return self._http_failures.get(domain_key(url), 0) < self.MAX_HTTP_FAILURES
+
+    def record_http_result(self, url: str, challenged: bool):
+        domain = domain_key(url)
+        with self._lock:
+            if not challenged:
+                self._http_failures.pop(domain, None)
+                return
+            failures = self._http_failures.get(domain, 0) + 1
+            self._http_failures[domain] = failures
+        if failures == self.MAX_HTTP_FAILURES:
+            logger.warning(f"{domain}: HTTP tier still challenged with clearance, using browser only")
+
+    def invalidate(self, url: str):
+        with self._lock:
+            if self._clearances.pop(domain_key(url), None):
+                self._save()
+
+    def _domain_lock(self, domain: str) -> threading.Lock:
+        with self._lock:
+            return self._domain_locks.setdefault(domain, threading.Lock())
+
+    def solve(self, url: str, force: bool = False) -> Optional[Clearance]:
+        """
+        Get a clearance for the URL's domain, solving the challenge in a
+        browser if needed. Concurrent callers wait for the one solve.
+        """
+        domain = domain_key(url)
+        requested_at = time.time()
+        with self._domain_lock(domain):
+            existing = self.get(url)
+            # Someone solved it while we were waiting, or it is still good
+            if existing and (not force or existing.obtained_at >= requested_at):
+                self.stats["reused"] += 1
+                return existing
+
+            logger.info(f"Solving challenge for {domain} via {url}")
+            try:
+                from crawler.fetcher import CHALLENGE_TITLE, is_challenge_page
+                with self.pool.lease() as page:
+                    page.goto(url, wait_until="load", timeout=60000)
+                    waited = 0
+                    while waited < self.challenge_timeout:
+                        try:
+                            if CHALLENGE_TITLE not in page.title():
+                                break
+                        except Exception:
+                            pass
+                        time.sleep(1)
+                        waited += 1
+                    if is_challenge_page(page.content()):
+                        raise Exception("challenge not cleared")
+                    clearance = self.store_from_page(page, url)
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.warning(f"Clearance solve failed for {domain}: {e}")
+                return None
+
+            self.stats["solved"] += 1
+            return clearance
+
+    def store_from_page(self, page, url: str) -> Clearance:
+        """Capture cookies + UA from a page that got past the challenge"""
+        return self.store(url, page.context.cookies(), page.evaluate("navigator.userAgent"))
+
+    def store(self, url: str, cookies: List[Dict[str, Any]], user_agent: str) -> Clearance:
+        """Share cookies + UA read from a cleared page (async callers read them themselves)"""
+        now = time.time()
+        domain = domain_key(url)
+        expires_at = clearance_expiry(cookies, domain, now, now + self.ttl)
+        clearance = Clearance(domain, cookies, user_agent, now, expires_at)
+        with self._lock:
+            self._clearances[clearance.domain] = clearance
+            self._save()
+        return clearance
+
+    def apply_to_page(self, page, url: str) -> bool:
+        """Add the domain's clearance cookies to a leased page's context"""
+        c = self.get(url)
+        if not c:
+            return False
+        page.context.add_cookies(c.cookies)
+        return True
@@ -1,65 +1,266 @@
 import logging
-from collections import deque
-from typing import Set, Dict, Any
-from urllib.parse import urlparse, urljoin
-from crawler.fetcher import HTMLFetcher
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Set, Dict, Any, Optional, Tuple
+from urllib.parse import urljoin
+from crawler.fetcher import FetchResult, HTMLFetcher
+from crawler.browser_pool import BrowserPool
+from crawler.clearance import ClearanceManager
+from crawler.ratelimit import AdaptiveRateLimiter
+from crawler.revalidation import ValidatorStore
+from crawler.archive import PageArchive
+from crawler.frontier import Frontier
+from crawler.freshness import FreshnessScheduler
+from crawler.canonical import UrlCanonicalizer
+from crawler.sku_index import SkuIndex
+from crawler.url_classifier import UrlClassifier
+from crawler.listing import Listing, ListingHarvester
+from crawler.stats import AtomicCounter
+from crawler.runs import RunRegistry, RunStats
+from crawler.tracing import PageTrace, Tracer, span
 from crawler.parser import HTMLParser
+from crawler.utils import normalize_url
 from crawler.pipeline import DataPipeline
+from crawler.writer import DBWriter, QueuedPipeline, QueuedValidators
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-class CrawlerEngine:
+# Frontier scores: product pages first, then listing pagination, then other categories.
+# Listings lose DEPTH_PENALTY per link hop and gain up to YIELD_BONUS when the page
+# that linked them was still turning up new products.
+PRIORITY_PRODUCT = 100.0
+PRIORITY_PAGINATION = 60.0
+PRIORITY_CATEGORY = 50.0
+DEPTH_PENALTY = 2.0
+YIELD_BONUS = 20.0
+# Recrawl seeds: +1 per day since last seen, so the stalest products go first
+MAX_STALENESS_BONUS = 30.0
+DEFAULT_PAGINATION_PATTERNS = ["page=", "/page/", "paged=", "?p=", "&p="]
+# Frontier thread: URLs leased ahead per worker, events applied per wakeup
+LEASE_AHEAD = 2
+EVENT_BATCH = 500
+REPLAY_BATCH = 500  # archived products written per transaction
+
+class PageParser:
+    """
+    A supplier config's parsing rules without any crawl state: URL
+    classification, listing harvest, product selectors and field
+    normalization. Opens no DB, browser or frontier, so a parse process can
+    build one cheaply (StagedCrawlerEngine, parse_mode: processes);
+    CrawlerEngine is one too.
+    """
+
     def __init__(self, config: Dict[str, Any]):
         self.config = config
+        # URL patterns compiled once; verdicts for repeated links are cached
+        self.url_classifier = UrlClassifier.from_config(config)
+        # Listing mode: product links, card fields and pagination read from
+        # listing pages (None: follow every crawlable link)
+        self.listing = ListingHarvester.from_config(config)
+        self.product_selectors = {k: v for k, v in (config.get("selectors") or {}).items() if k != "product_link"}
+        # Cards of leased product URLs, until their page is parsed
+        self._cards: Dict[str, Dict[str, Any]] = {}
+        # Known SKUs, fed by parsed products (the engine's; None: not tracked)
+        self.sku_index: Optional[SkuIndex] = None
+
+    def _extract_page(self, url: str, html: str,
+                      with_links: bool = True) -> Tuple[Optional[Dict[str, Any]], Set[str], Optional[Listing]]:
+        """
+        Parse a fetched page. Returns (product_data, links, listing):
+        product_data is None for non-product or blocked pages; links is
+        empty with with_links=False; listing is what the ListingHarvester
+        read from a non-product page (listing mode only).
+        """
+        with span("parse.lexbor"):
+            parser = HTMLParser(html)
+        product_data = None
+        # Links harvested from a listing card are products whatever their URL looks like
+        card = self._cards.pop(url, None)
+        is_product = card is not None or self._is_product_url(url)
+        
+        if is_product:
+            with span("parse.fields"):
+                product_data = parser.parse_product(self.product_selectors)
+            
+            if product_data.get('title'):
+                title = product_data['title']
+                title_lower = title.lower()
+                if any(x in title_lower for x in ["403", "forbidden", "access denied", "robot challenge", "bot detection", "screen reader"]):
+                    logger.warning(f"Detected Blocked Page (Title: '{title}') for {url}, skipping ingestion.")
+                    return None, set(), None
+
+            # The listing card fills in what the product page did not have
+            for field, value in (card or {}).items():
+                if value and not product_data.get(field):
+                    product_data[field] = value
+                
+            if product_data:
+                self._normalize_product(url, product_data)
+            else:
+                product_data = None
+        
+        if not with_links:
+            return product_data, set(), None
+
+        listing = None
+        if self.listing:
+            if is_product:
+                if not self.listing.product_page_links:
+                    # Listing mode: product pages are leaves
+                    return product_data, set(), None
+            else:
+                with span("parse.listing"):
+                    listing = self.listing.harvest(parser, url)
+
+        # No cap: the frontier spills to disk instead of dropping links
+        with span("parse.links"):
+            links = parser.extract_links(url)
+        return product_data, links, listing
+
+    def _normalize_product(self, url: str, product_data: Dict[str, Any]):
+        """Fill in url/supplier/sku and coerce parsed fields to pipeline types (in place)"""
+        product_data['url'] = url
+        product_data['supplier'] = self.config.get("supplier")
+        
+        if not product_data.get('sku'):
+            product_data['sku'] = self._extract_sku_from_url(url)
+        
+        if product_data.get('price') and isinstance(product_data['price'], str):
+            import re
+            try:
+                clean_price = re.sub(r'[^\d.]', '', product_data['price'])
+                product_data['price'] = float(clean_price) if clean_price else None
+            except ValueError:
+                product_data['price'] = None
+
+        if product_data.get('images'):
+            if isinstance(product_data['images'], str):
+                product_data['images'] = [product_data['images']]
+            product_data['images'] = [urljoin(url, img) for img in product_data['images'] if img]
+            
+        if product_data.get('properties') and not isinstance(product_data['properties'], dict):
+            product_data['properties'] = {}
+        
+        if product_data.get('sku') and self.sku_index is not None:
+            self.sku_index.add(product_data['sku'])
+
+        if product_data.get('variants'):
+            # Normalize string variants to dicts and filter out placeholders
+            norm_variants = []
+            for v in product_data['variants']:
+                if isinstance(v, str):
+                    if v.strip() in ["צבע", "בחר צבע", "בחר"]:
+                        continue
+                    norm_variants.append({"name": v.strip()})
+                else:
+                    norm_variants.append(v)
+            product_data['variants'] = norm_variants
+
+        # DEBUG: Log images before saving
+        logger.info(f"DEBUG: About to save product {product_data.get('sku')} with {len(product_data.get('images', []))} images: {product_data.get('images', [])[:2]}")
+
+    def _is_product_url(self, url: str) -> bool:
+        return self.url_classifier.classify(url).is_product
+
+    def _extract_sku_from_url(self, url: str) -> str:
+        return self.url_classifier.sku(url)
+
+
+class CrawlerEngine(PageParser):
+    RUN_MODE = "threads"  # crawl_runs.mode
+
+    def __init__(self, config: Dict[str, Any], browser_pool: Optional[BrowserPool] = None,
+                 clearance: Optional[ClearanceManager] = None):
+        """browser_pool / clearance: shared instances (multi-supplier crawl); built from config if omitted"""
+        super().__init__(config)
         self.base_url = config.get("base_url")
         self.allowed_domains = set(config.get("allowed_domains", []))
-        self.queue = deque([self.base_url])
-        self.visited: Set[str] = set()
-        self.visited_skus: Set[str] = set()
+        # discover: false (--budget) fetches only the seeded URLs, no link following
+        self.discover = config.get("discover", True)
+        # Disk-backed frontier (also the visited set). The SQLite file is opened
+        # here, but only _open_frontier() (a crawl starting) resets or recovers it,
+        # so --replay and one-off scripts never wipe a crawl that can be resumed.
+        # Admission is on canonical URL / SKU, so aliases of a page are fetched once.
+        self.frontier = Frontier.from_config(
+            config, canonicalize=UrlCanonicalizer.from_config(config, sku_of=self._dedup_sku))
+        self._frontier_open = False
         
-        # Threading support
-        import threading
+        # Threading support. During run() only the frontier thread touches the
+        # frontier; workers talk to it through the work queue and _events.
         self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self._events: Optional[queue.SimpleQueue] = None
+        self.in_flight = 0
         self.num_workers = config.get("num_workers", 3)
         
+        # One browser pool for all workers; Chromium only starts on first escalation
+        self._owns_pool = browser_pool is None
+        self.browser_pool = browser_pool or BrowserPool.from_config(config)
+        # Challenge solved once per domain, cookies shared with every worker
+        self.clearance = clearance or ClearanceManager.from_config(config, self.browser_pool)
+        # Per-domain AIMD throttle shared by all workers (replaces fixed sleeps)
+        self.rate_limiter = AdaptiveRateLimiter.from_config(config)
+        
         # Shared setup
         db_path = config.get('db_path', 'products.db')
-        self.pipeline = DataPipeline(db_path)
-        self._load_existing_skus(db_path)
-        self.consecutive_failures = 0
+        self.pipeline = DataPipeline(db_path, validation=config.get('validation', 'fast'))
+        # During run() products-DB writes go through one DBWriter thread (long-lived
+        # WAL connection, group commit); `writer: {enabled: false}` writes per item
+        self.use_writer = (config.get("writer") or {}).get("enabled", True)
+        # This supplier's known SKUs as 64-bit fingerprints (incremental skips)
+        self.sku_index = SkuIndex.from_config(config)
+        # Conditional GETs on recrawls; unchanged pages skip parse + DB write
+        self.validators = ValidatorStore.from_config(config)
+        self.revalidation = {k: AtomicCounter() for k in ("not_modified", "same_body", "changed")}
+        # Every fetched body, compressed + deduplicated, for offline --replay
+        self.archive = PageArchive.from_config(config)
+        self.consecutive_failures = AtomicCounter()
         self.MAX_CONSECUTIVE_FAILURES = 5
+        # Pages served per fetch tier, summed over all workers
+        self.tier_counts: Counter = Counter()
+        # Per-run outcomes, bytes and phase latencies -> crawl_runs row + JSON report.
+        # A ShardedCrawl / MultiSupplierCrawl records the run for its engines.
+        self.run_stats = RunStats()
+        # Timing spans per URL (fetch / parse / store and their sub-phases) into
+        # run_stats' histograms, plus optional JSONL traces (tracing.jsonl)
+        self.tracer = Tracer.from_config(config, self.run_stats)
+        self.record_run = True
+        self.run_report: Optional[Dict[str, Any]] = None
+        self._run_id: Optional[int] = None
+        self._run_started = 0.0
 
-    def _load_existing_skus(self, db_path: str):
-        try:
-            import sqlite3
-            import os
-            if os.path.exists(db_path):
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                cursor.execute("SELECT sku FROM products WHERE sku IS NOT NULL")
-                rows = cursor.fetchall()
-                for row in rows:
-                    if row[0]:
-                        self.visited_skus.add(row[0].upper())
-                conn.close()
-                logger.info(f"Loaded {len(self.visited_skus)} existing SKUs from DB.")
-        except Exception as e:
-            logger.error(f"Failed to load existing SKUs: {e}")
-
-    def seed_queue(self, urls: list[str]):
-        """Append external URLs to the queue with normalization"""
+    def _open_frontier(self):
+        """Fresh crawl: clear the frontier. --resume: keep it and re-queue what was in flight."""
         with self.lock:
-            for url in urls:
-                normalized_url = url.split("#")[0]
-                if normalized_url not in self.visited:
-                    self.queue.append(normalized_url)
-            
-            # Shuffle to distribute workers
-            import random
-            temp_list = list(self.queue)
-            random.shuffle(temp_list)
-            self.queue = deque(temp_list)
+            if self._frontier_open:
+                return
+            self._frontier_open = True
+        if self.config.get("resume"):
+            self.frontier.recover()
+            logger.info(f"Resuming crawl: {self.frontier.counts()}")
+        else:
+            self.frontier.reset()
+        if self.discover:
+            self._add_links([(self.base_url, PRIORITY_CATEGORY, 0)])
+
+    def seed_queue(self, urls: list[str], priority: Optional[float] = None):
+        """Add external URLs to the frontier with normalization (scored by URL type unless given)"""
+        self._open_frontier()
+        normalized = [url.split("#")[0] for url in urls]
+        if priority is not None:
+            self._add_links([(url, priority, 0) for url in normalized])
+            return
+        self._add_links([(url, PRIORITY_PRODUCT if self._is_product_url(url) else self._listing_priority(url, 0), 0)
+                         for url in normalized])
+
+    def stop(self):
+        """Graceful stop (SIGTERM): finish in-flight pages, leave the rest pending for --resume"""
+        if not self.stop_event.is_set():
+            logger.info("Stop requested: finishing in-flight pages, frontier kept for --resume")
+        self.stop_event.set()
 
     def seed_from_db(self):
         """Seed queue with all URLs currently in the products database"""
@@ -68,222 +269,466 @@ class CrawlerEngine:
             conn = sqlite3.connect(self.pipeline.db_path)
             cursor = conn.cursor()
             # Select url or source_url
-            cursor.execute("SELECT url FROM products WHERE url IS NOT NULL")
+            supplier = self.config.get("supplier")
+            if supplier:
+                # Only this supplier's pages (several suppliers share one DB)
+                from crawler.utils import slugify_supplier
+                cursor.execute("SELECT url, last_seen_at FROM products WHERE url IS NOT NULL AND supplier_slug = ?",
+                               (slugify_supplier(supplier),))
+            else:
+                cursor.execute("SELECT url, last_seen_at FROM products WHERE url IS NOT NULL")
             rows = cursor.fetchall()
-            urls = [row[0] for row in rows if row[0].startswith("http")]
             conn.close()
-            
-            logger.info(f"DB Seeding: Found {len(urls)} product URLs.")
-            self.seed_queue(urls)
+
+            # Freshness: bucket by days since last seen, stalest first
+            from datetime import datetime, timezone
+            now = datetime.now(timezone.utc)
+            buckets: Dict[float, list] = {}
+            for url, last_seen in rows:
+                if not url.startswith("http"):
+                    continue
+                age_days = MAX_STALENESS_BONUS
+                try:
+                    seen = datetime.fromisoformat(str(last_seen))
+                    if seen.tzinfo is None:
+                        seen = seen.replace(tzinfo=timezone.utc)
+                    age_days = min(MAX_STALENESS_BONUS, (now - seen).days)
+                except (TypeError, ValueError):
+                    pass
+                buckets.setdefault(PRIORITY_PRODUCT + age_days, []).append(url)
+
+            logger.info(f"DB Seeding: Found {sum(len(u) for u in buckets.values())} product URLs.")
+            for priority, urls in buckets.items():
+                self.seed_queue(urls, priority=priority)
         except Exception as e:
             logger.error(f"Failed to seed from DB: {e}")
 
+    def seed_stale(self, budget: int, now: Optional[float] = None):
+        """
+        Seed the `budget` products most likely to have changed since they
+        were last seen (adaptive per-product revisit intervals); the
+        likeliest are fetched first
+        """
+        from crawler.utils import slugify_supplier
+        scheduler = FreshnessScheduler.from_config(self.config)
+        supplier = self.config.get("supplier")
+        stale = scheduler.most_stale(budget, slugify_supplier(supplier) if supplier else None, now=now)
+        logger.info(f"Freshness: {len(stale)} of the stalest products seeded (budget {budget}), "
+                    f"intervals {scheduler.report(slugify_supplier(supplier) if supplier else None)}")
+        buckets: Dict[float, list] = {}
+        for url, p_changed in stale:
+            buckets.setdefault(PRIORITY_PRODUCT + round(MAX_STALENESS_BONUS * p_changed), []).append(url)
+        for priority, urls in buckets.items():
+            self.seed_queue(urls, priority=priority)
+
     def run(self):
         logger.info(f"Starting multi-threaded crawl with {self.num_workers} workers at {self.base_url}")
-        import time
         from concurrent.futures import ThreadPoolExecutor
         
+        self._open_frontier()
+        self._start_run()
         start_time = time.time()
-        self.count = 0
+        self.count = AtomicCounter()
+        work: queue.Queue = queue.Queue()
+        self._events = queue.SimpleQueue()
         
         def worker():
-            fetcher = HTMLFetcher()
+            fetcher = HTMLFetcher(pool=self.browser_pool, clearance=self.clearance,
+                                  rate_limiter=self.rate_limiter, validators=self.validators)
             try:
                 while True:
-                    url = None
-                    with self.lock:
-                        if not self.queue:
-                            break
-                        url = self.queue.popleft()
-                        if url in self.visited:
-                            continue
-                        self.visited.add(url)
+                    url = work.get()
+                    if url is None:
+                        break
                     
+                    ok = False
                     try:
-                        self._process_url(url, fetcher)
+                        ok = self._process_url(url, fetcher)
                     except Exception as e:
                         logger.error(f"Worker error processing {url}: {e}")
+                    self._events.put(("done", url, ok))
                     
-                    with self.lock:
-                        self.count += 1
-                        if self.count % 10 == 0:
-                            elapsed = time.time() - start_time
-                            rate = self.count / elapsed if elapsed > 0 else 0
-                            logger.info(f"--- STATUS: {self.count} pages processed | Queue: {len(self.queue)} | Rate: {rate:.2f} p/s ---")
+                    count = self.count.incr()
+                    if count % 10 == 0:
+                        self._log_status(count, start_time)
             finally:
+                with self.lock:
+                    self.tier_counts.update(fetcher.tier_counts)
                 fetcher.close()
 
-        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
-            futures = [executor.submit(worker) for _ in range(self.num_workers)]
-            for future in futures:
-                future.result()
+        writer = self._start_writer()
+        status = "failed"
+        try:
+            with ThreadPoolExecutor(max_workers=self.num_workers + 1) as executor:
+                owner = executor.submit(self._run_frontier, work)
+                futures = [executor.submit(worker) for _ in range(self.num_workers)]
+                owner.result()
+                for future in futures:
+                    future.result()
+            status = "stopped" if self.stop_event.is_set() else "finished"
+        finally:
+            self._events = None
+            self._stop_writer(writer)
+            if self._owns_pool:
+                self.browser_pool.close()
+            self._finish_run(status)
 
-    def _process_url(self, url: str, fetcher: HTMLFetcher):
-        logger.info(f"Processing: {url}")
-        
-        use_dynamic = self.config.get("use_dynamic", False)
-        html = None
-        
+        self._log_summary()
+
+    def _log_summary(self):
+        self._log_frontier()
+        logger.info(f"Fetch tiers: {self._format_tier_counts()}")
+        logger.info(f"Browser pool: {self.browser_pool.stats}")
+        if self.browser_pool.resource_policy:
+            logger.info(f"Resource policy: {self.browser_pool.resource_policy.report()}")
+        if self.clearance:
+            logger.info(f"Clearance: {self.clearance.stats}")
+        if self.validators:
+            logger.info(f"Revalidation: {self._revalidation_counts()}")
+        if self.archive:
+            logger.info(f"Archive: {self.archive.report()}")
+        logger.info(f"SKU index: {self.sku_index.report()}")
+
+    def _start_writer(self, maxsize: int = 0) -> Optional[DBWriter]:
+        """
+        Route pipeline / validator writes through a DBWriter until _stop_writer().
+        Not when the pipeline is already queued: a ShardedCrawl or
+        MultiSupplierCrawl runs the writer for its engines.
+        """
+        if not self.use_writer or not isinstance(self.pipeline, DataPipeline):
+            return None
+        results: queue.Queue = queue.Queue(maxsize=maxsize)
+        writer = DBWriter.from_config(self.config, results, revalidate=self.validators is not None,
+                                      pipeline=self.pipeline, stats=self.run_stats)
+        self._direct = (self.pipeline, self.validators)
+        self.pipeline = QueuedPipeline(self.pipeline, results)
+        if self.validators:
+            self.validators = QueuedValidators(self.validators, results)
+        writer.start()
+        return writer
+
+    def _stop_writer(self, writer: Optional[DBWriter]):
+        """Flush and stop the writer; direct writes again"""
+        if writer is None:
+            return
+        writer.close()
+        self.pipeline, self.validators = self._direct
+        logger.info(f"DB writer: {dict(writer.stats)}")
+
+    def _start_run(self):
+        self._run_started = time.time()
+        if not self.record_run:
+            return
         try:
-            if use_dynamic:
-                html = fetcher.fetch_dynamic(url)
-            else:
-                html = fetcher.fetch(url)
-                
-            if not html:
-                self.consecutive_failures += 1
-                logger.warning(f"Failed to fetch {url} (Consecutive failures: {self.consecutive_failures})")
-                return
+            self._runs = RunRegistry.from_config(self.config)
+            self._run_id = self._runs.start(self.config.get("supplier"), self.RUN_MODE)
+        except Exception as e:
+            logger.error(f"Run registry unavailable: {e}")
 
-            self.consecutive_failures = 0
+    def _finish_run(self, status: str):
+        self.tracer.close()
+        if self._run_id is None:
+            return
+        from crawler.utils import slugify_supplier
+        supplier = self.config.get("supplier")
+        try:
+            self.run_report = self._runs.finish(
+                self._run_id, self.run_stats, self.pipeline.write_summary(slugify_supplier(supplier) if supplier else None),
+                time.time() - self._run_started, status, extra=self._run_extra())
+        except Exception as e:
+            logger.error(f"Could not record run {self._run_id}: {e}")
 
-            # ADDED: Smaller random delay for throughput
-            import time
-            import random
-            time.sleep(random.uniform(0.5, 1.5))
+    def _run_extra(self) -> Dict[str, Any]:
+        """Engine-specific sections of the run report"""
+        return {"frontier": self.frontier.counts(), "revalidation": self._revalidation_counts()}
 
-            parser = HTMLParser(html)
-            
-            if self._is_product_url(url):
-                product_data = parser.parse_product(self.config.get("selectors", {}))
-                
-                if product_data.get('title'):
-                    title = product_data['title']
-                    title_lower = title.lower()
-                    if any(x in title_lower for x in ["403", "forbidden", "access denied", "robot challenge", "bot detection", "screen reader"]):
-                        logger.warning(f"Detected Blocked Page (Title: '{title}') for {url}, skipping ingestion.")
-                        return
-                    
-                if product_data:
-                    product_data['url'] = url
-                    product_data['supplier'] = self.config.get("supplier")
-                    
-                    if not product_data.get('sku'):
-                        product_data['sku'] = self._extract_sku_from_url(url)
-                    
-                    if product_data.get('price') and isinstance(product_data['price'], str):
-                        import re
+    def _log_status(self, count: int, start_time: float):
+        elapsed = time.time() - start_time
+        rate = count / elapsed if elapsed > 0 else 0
+        logger.info(f"--- STATUS: {count} pages processed | Queue: {self.frontier.pending} | Rate: {rate:.2f} p/s | Limits: {self.rate_limiter.rates()} ---")
+
+    def _run_frontier(self, work: queue.Queue):
+        """
+        Sole owner of the frontier during run(): keeps `work` topped up with
+        leased URLs and applies worker events ("links" / "done") in batches.
+        Ends when nothing is pending or in flight, or after stop() once the
+        pages already being processed are finished.
+        """
+        outstanding = 0  # leased, not yet reported done
+        try:
+            while True:
+                if self.stop_event.is_set():
+                    # Hand back what no worker has picked up yet
+                    while True:
                         try:
-                            clean_price = re.sub(r'[^\d.]', '', product_data['price'])
-                            product_data['price'] = float(clean_price) if clean_price else None
-                        except ValueError:
-                            product_data['price'] = None
-
-                    if product_data.get('images'):
-                        if isinstance(product_data['images'], str):
-                            product_data['images'] = [product_data['images']]
-                        product_data['images'] = [urljoin(url, img) for img in product_data['images'] if img]
-                        
-                    if product_data.get('properties') and not isinstance(product_data['properties'], dict):
-                        product_data['properties'] = {}
-                    
-                    if product_data.get('sku'):
-                        with self.lock:
-                            self.visited_skus.add(product_data['sku'].upper())
-
-                    if product_data.get('variants'):
-                        # Normalize string variants to dicts and filter out placeholders
-                        norm_variants = []
-                        for v in product_data['variants']:
-                            if isinstance(v, str):
-                                if v.strip() in ["צבע", "בחר צבע", "בחר"]:
-                                    continue
-                                norm_variants.append({"name": v.strip()})
+                            url = work.get_nowait()
+                        except queue.Empty:
+                            break
+                        self.frontier.release(url)
+                        self._cards.pop(url, None)
+                        outstanding -= 1
+                else:
+                    with self.frontier.transaction():
+                        while outstanding < self._max_outstanding():
+                            url = self._lease()
+                            if url is None:
+                                break
+                            work.put(url)
+                            outstanding += 1
+                if outstanding == 0 and (self.stop_event.is_set() or self._drained()):
+                    return
+
+                try:
+                    events = [self._events.get(timeout=0.1)]
+                except queue.Empty:
+                    continue
+                while len(events) < EVENT_BATCH:
+                    try:
+                        events.append(self._events.get_nowait())
+                    except queue.Empty:
+                        break
+                with self.frontier.transaction():
+                    for event in events:
+                        if event[0] == "done":
+                            _, url, ok = event
+                            self._cards.pop(url, None)
+                            if ok:
+                                self.frontier.complete(url)
                             else:
-                                norm_variants.append(v)
-                        product_data['variants'] = norm_variants
+                                self.frontier.fail(url)
+                            outstanding -= 1
+                        else:
+                            self._admit_now(*event[1:])
+        finally:
+            for _ in range(self.num_workers):
+                work.put(None)
 
-                    # DEBUG: Log images before saving
-                    logger.info(f"DEBUG: About to save product {product_data.get('sku')} with {len(product_data.get('images', []))} images: {product_data.get('images', [])[:2]}")
-                    
-                    self.pipeline.process_item(product_data)
-            
-            with self.lock:
-                q_len = len(self.queue)
-            
-            if q_len < 500:
-                links = parser.extract_links(url)
-                for link in links:
-                    link = link.split("#")[0]
-                    if self._can_crawl(link):
-                        with self.lock:
-                            if link not in self.visited:
-                                self.queue.append(link)
-                                
-        except Exception as e:
-            logger.error(f"Error processing {url}: {e}")
+    def _max_outstanding(self) -> int:
+        """Leased URLs allowed between the frontier and a "done" event"""
+        return self.num_workers * LEASE_AHEAD
 
-    def _is_product_url(self, url: str) -> bool:
-        patterns = self.config.get("product_url_patterns", [])
-        for p in patterns:
-            if p.startswith("regex:"):
-                import re
-                if re.search(p[6:], url):
-                    return True
-            elif p in url:
-                return True
-        return False
+    def _lease(self) -> Optional[str]:
+        """Next URL from the frontier; a product harvested from a listing brings its card along"""
+        url = self.frontier.lease()
+        if url and self.listing:
+            card = self.frontier.card(url)
+            if card is not None:
+                self._cards[url] = card
+        return url
 
-    def _extract_sku_from_url(self, url: str) -> str:
-        import re
-        sku_regex = self.config.get("sku_url_regex")
-        if sku_regex:
-            match = re.search(sku_regex, url)
-            if match:
-                return match.group(1)
-        return ""
-
-    def _can_crawl(self, url: str) -> bool:
-        parsed = urlparse(url)
-        if parsed.netloc and parsed.netloc not in self.allowed_domains:
-            return False
-            
-        cat_patterns = self.config.get("category_url_patterns", [])
-        prod_patterns = self.config.get("product_url_patterns", [])
+    def _drained(self) -> bool:
+        """Nothing left to lease (checked by the frontier thread once no page is outstanding)"""
+        return not self.frontier.pending
+
+    def replay(self):
+        """Re-run parsing + pipeline over the archived pages with the current selectors; no network"""
+        if not self.archive:
+            logger.error("Archive disabled in config, nothing to replay")
+            return
+        from datetime import datetime, timezone
+        start = time.time()
+        pages = saved = 0
+        items = []
+        cards = self._replay_cards()
+        for url, fetched_at, html in self.archive.latest(self.config.get("supplier")):
+            pages += 1
+            card = cards.get(normalize_url(url))
+            if card is not None:
+                self._cards[url] = card
+            product_data, _, _ = self._extract_page(url, html, with_links=False)
+            if product_data:
+                items.append((product_data, datetime.fromtimestamp(fetched_at, timezone.utc)))
+            if len(items) >= REPLAY_BATCH:
+                saved += sum(self.pipeline.process_batch(items).values())
+                items = []
+        if items:
+            saved += sum(self.pipeline.process_batch(items).values())
+        logger.info(f"Replay done: {pages} archived pages, {saved} products in {time.time() - start:.1f}s")
+
+    def _replay_cards(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Listing cards re-read from the archived listing pages (listing mode),
+        by normalized product URL: card-only products are products on replay too
+        """
+        cards: Dict[str, Dict[str, Any]] = {}
+        if not self.listing:
+            return cards
+        for url, _, html in self.archive.latest(self.config.get("supplier"), keep=lambda u: not self._is_product_url(u)):
+            listing = self.listing.harvest(HTMLParser(html), url)
+            for link, card in listing.products.items():
+                cards[normalize_url(link)] = card
+        logger.info(f"Replay: {len(cards)} product cards from archived listing pages")
+        return cards
+
+    def _log_frontier(self):
+        logger.info(f"Frontier: {self.frontier.counts()} {self.frontier.stats}")
+        logger.info(f"Canonical dedup: {self.frontier.aliases} duplicate URL(s) skipped (fetches avoided)")
+
+    def _format_tier_counts(self) -> str:
+        total = sum(self.tier_counts.values())
+        parts = []
+        for tier in ("http", "browser", "failed"):
+            n = self.tier_counts.get(tier, 0)
+            pct = (100.0 * n / total) if total else 0.0
+            parts.append(f"{tier}={n} ({pct:.0f}%)")
+        return " | ".join(parts)
+
+    def _process_url(self, url: str, fetcher: HTMLFetcher) -> bool:
+        """Fetch + parse + store one URL; False if it could not be fetched"""
+        logger.info(f"Processing: {url}")
         
-        is_category = False
-        for p in cat_patterns:
-            if p.startswith("regex:"):
-                import re
-                if re.search(p[6:], url):
-                    is_category = True
-                    break
-            elif p in url:
-                is_category = True
-                break
-
-        is_product = False
-        for p in prod_patterns:
-            if p.startswith("regex:"):
-                import re
-                if re.search(p[6:], url):
-                    is_product = True
-                    break
-            elif p in url:
-                is_product = True
-                break
+        with self.tracer.page(url) as trace:
+            try:
+                result = self._fetch_url(url, fetcher, trace)
+                if result is not None:
+                    self._handle_page(url, result, trace)
+                return trace.outcome != "failed"
+                                    
+            except Exception as e:
+                logger.error(f"Error processing {url}: {e}")
+                return False
+
+    def _fetch_url(self, url: str, fetcher: HTMLFetcher, trace: PageTrace) -> Optional[FetchResult]:
+        """
+        Fetch stage: the result to parse, or None when there is nothing to
+        parse (revalidated as unchanged, or failed: trace.outcome tells which)
+        """
+        # Tiered: plain HTTP first, browser only for challenge/blocked URLs
+        with span("fetch"):
+            result = fetcher.fetch_page(url, dynamic=self.config.get("use_dynamic", False))
+        trace.tier = result.tier
+        if self.archive and result.html:
+            with span("archive"):
+                self.archive.store(result, self.config.get("supplier"))
+        if result.unchanged:
+            with span("store"):
+                self._skip_unchanged(result)
+            trace.finish("unchanged", len(result.html or ""))
+            return None
+
+        if not result.html:
+            failures = self.consecutive_failures.incr()
+            logger.warning(f"Failed to fetch {url} (Consecutive failures: {failures})")
+            return None
+
+        self.consecutive_failures.reset()
+        return result
+
+    def _handle_page(self, url: str, result: FetchResult, trace: PageTrace):
+        """Parse + store stages: extract the product, write it, hand the links to the frontier"""
+        with span("parse"):
+            product_data, links, listing = self._extract_page(url, result.html)
+        if product_data:
+            with span("store"):
+                self.pipeline.process_item(product_data)
+                self._remember_validators(result)
+        self._enqueue_links(links, parent=url, listing=listing)
+        trace.finish("ok", len(result.html))
+
+    def _skip_unchanged(self, result):
+        """Page revalidated as unchanged: only refresh last_seen_at"""
+        self.consecutive_failures.reset()
+        self.revalidation["not_modified" if result.not_modified else "same_body"].incr()
+        logger.info(f"Unchanged ({'304' if result.not_modified else 'same body'}): {result.url}")
+        self.pipeline.touch_url(result.url)
+
+    def _remember_validators(self, result):
+        if not self.validators:
+            return
+        self.revalidation["changed"].incr()
+        # Only product pages are remembered: listings must keep feeding links
+        self.validators.remember(result)
+
+    def _revalidation_counts(self) -> Dict[str, int]:
+        return {k: c.value for k, c in self.revalidation.items() if c.value}
+
+    def _enqueue_links(self, links: Set[str], parent: Optional[str] = None, listing: Optional[Listing] = None):
+        """Classify discovered links and admit them as one batch (the frontier ignores URLs it has already seen)"""
+        if not self.discover:
+            return
+        products, listings, pages = [], [], []
+        if listing:
+            products = [(link, card) for link, card in listing.products.items() if self._can_crawl(link, kind="product")]
+            pages = [link for link in listing.pages if self._can_crawl(link, kind="listing")]
+        # On a listing page the cards are the products; other product links are menus, ads, "recently viewed"
+        harvested = bool(products)
+        seen = set(pages)
+        for link in links:
+            link = link.split("#")[0]
+            if link in seen or not self._can_crawl(link):
+                continue
+            if self._is_product_url(link):
+                if not harvested:
+                    products.append((link, None))
+            else:
+                listings.append(link)
+        events = self._events
+        if events is not None:
+            # run(): the frontier thread admits it
+            events.put(("links", parent, products, listings, pages))
+        else:
+            self._admit_now(parent, products, listings, pages)
+
+    def _admit_now(self, parent: Optional[str], products: list, listings: list, pages: list = ()):
+        """
+        Score and add one page's links: products (url, card) first, then its
+        pagination (same depth as the page: a long listing is not a deep one),
+        then other listings; both boosted by how many products were new
+        """
+        depth = self.frontier.depth(parent) + 1 if parent else 0
+        new_products = self._add_links([(link, PRIORITY_PRODUCT, depth, card) for link, card in products])
+        bonus = min(YIELD_BONUS, new_products)
+        page_depth = max(0, depth - 1)
+        added = new_products + self._add_links(
+            [(link, PRIORITY_PAGINATION - DEPTH_PENALTY * page_depth + bonus, page_depth) for link in pages]
+            + [(link, self._listing_priority(link, depth, bonus), depth) for link in listings])
+        if parent:
+            self.frontier.record_yield(parent, added)
+
+    def _add_links(self, entries: list) -> int:
+        """Add scored (url, priority, depth) entries to the frontier; returns how many were new"""
+        return self.frontier.add_entries(entries)
+
+    def _listing_priority(self, url: str, depth: int, bonus: float = 0.0) -> float:
+        base = PRIORITY_PAGINATION if self._is_pagination_url(url) else PRIORITY_CATEGORY
+        return base - DEPTH_PENALTY * depth + bonus
+
+    def _is_pagination_url(self, url: str) -> bool:
+        patterns = self.config.get("pagination_url_patterns", DEFAULT_PAGINATION_PATTERNS)
+        return any(p in url for p in patterns)
+
+    def _dedup_sku(self, url: str) -> str:
+        """
+        SKU that makes URL aliases one frontier entry: the classifier's (full
+        URL, product URLs only), never for category or pagination URLs, which
+        a broad numeric product pattern can also match.
+        """
+        verdict = self.url_classifier.classify(url)
+        if not verdict.is_product or verdict.is_category or self._is_pagination_url(url):
+            return ""
+        return verdict.sku
+
+    def _can_crawl(self, url: str, kind: Optional[str] = None) -> bool:
+        """kind: "product" / "listing" when the page markup already says what the link is (listing harvest)"""
+        verdict = self.url_classifier.classify(url)
+        if not verdict.allowed:
+            return False
         
         if "add-to-cart" in url:
             return False
             
-        if is_product:
+        if verdict.is_product if kind is None else kind == "product":
             # Check for incremental mode
             if self.config.get("incremental", False):
-                sku = self._extract_sku_from_url(url)
+                sku = verdict.sku if kind is None else self._extract_sku_from_url(url)
                 # If we couldn't extract SKU from URL, we might still crawl to be safe, 
                 # or skip if strict. defaulting to crawl.
-                if sku:
-                   with self.lock:
-                       if sku.upper() in self.visited_skus:
-                           logger.info(f"Skipping existing SKU (Incremental): {sku}")
-                           return False
+                if sku and sku in self.sku_index:
+                    logger.info(f"Skipping existing SKU (Incremental): {sku}")
+                    return False
             return True
             
-        if is_category:
-            if url == self.base_url: return True
-            with self.lock:
-                if len(self.queue) > 500: 
-                    return False
+        if kind == "listing" or verdict.is_category:
             return True
 
         return url == self.base_url
@@ -1,110 +1,295 @@
 import requests
 import logging
-from typing import Optional
-from playwright.sync_api import sync_playwright
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional, TYPE_CHECKING
+from requests.adapters import HTTPAdapter
+from crawler.browser_pool import BrowserPool
+from crawler.resource_policy import ResourcePolicy
+from crawler import ratelimit
+from crawler.ratelimit import AdaptiveRateLimiter
+from crawler.revalidation import ValidatorStore, body_hash, conditional_headers
+from crawler.tracing import span
+
+if TYPE_CHECKING:
+    from crawler.clearance import ClearanceManager
 
 logger = logging.getLogger(__name__)
 
+# Markers that mean we got a challenge/block page instead of real content.
+CHALLENGE_TITLE = "Robot Challenge Screen"
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9,he;q=0.8",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Referer": "https://www.google.com/",
+    "Upgrade-Insecure-Requests": "1"
+}
+
+
+def is_challenge_page(html: str) -> bool:
+    """True if the HTML is an anti-bot challenge or block page"""
+    if not html:
+        return False
+    return (
+        CHALLENGE_TITLE in html
+        or "sgcaptcha" in html
+        or "access denied" in html.lower()
+    )
+
+
+@dataclass
+class FetchResult:
+    """Outcome of a single page fetch"""
+    url: str
+    html: Optional[str] = None
+    status: Optional[int] = None
+    tier: str = "failed"  # http | browser | failed
+    elapsed: float = 0.0
+    challenged: bool = False  # HTTP tier hit a challenge/block page
+    # Revalidation (only when the fetcher has a ValidatorStore)
+    not_modified: bool = False  # server answered 304 to our conditional GET
+    unchanged: bool = False     # 304, or the body hash matches the stored one
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    body_hash: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.html)
+
+
 class HTMLFetcher:
-    def __init__(self, headers: Optional[dict] = None):
-        self.headers = headers or {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.9,he;q=0.8",
-            "Accept-Encoding": "gzip, deflate, br",
-            "Referer": "https://www.google.com/",
-            "Upgrade-Insecure-Requests": "1"
-        }
-        self.playwright = None
-        self.browser = None
-        self.page = None
-        
-    def _init_browser(self):
-        if not self.browser:
-            from playwright.sync_api import sync_playwright
-            self.playwright = sync_playwright().start()
-            self.browser = self.playwright.chromium.launch(
-                headless=True,
-                args=['--disable-blink-features=AutomationControlled']
-            )
-            self.context = self.browser.new_context(
-                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36",
-                viewport={"width": 1920, "height": 1080}
-            )
-            self.page = self.context.new_page()
-            
-            # Apply stealth
-            try:
-                from playwright_stealth import stealth
-                stealth(self.page)
-            except (ImportError, TypeError):
-                # Fallback for newer playwright-stealth
-                from playwright_stealth import Stealth
-                stealth = Stealth()
-                stealth.apply_stealth_sync(self.page)
-            
-            # Set a standard timeout
-            self.page.set_default_timeout(30000)
+    def __init__(self, headers: Optional[dict] = None, pool: Optional[BrowserPool] = None,
+                 pool_size: int = 10, http_timeout: int = 20,
+                 resource_policy: Optional[ResourcePolicy] = None,
+                 clearance: Optional["ClearanceManager"] = None,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 validators: Optional[ValidatorStore] = None):
+        self.headers = headers or dict(DEFAULT_HEADERS)
+        self.http_timeout = http_timeout
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Pages served per tier (http / browser / failed)
+        self.tier_counts: Counter = Counter()
+        # Headers of the last HTTP-tier response (ETag / Last-Modified)
+        self.last_response_headers = {}
+
+        # Pages are leased from a shared BrowserPool (or a private one, created on demand).
+        # A shared pool carries its own resource policy; this one is for the private pool.
+        self.pool = pool
+        self._owns_pool = False
+        self.resource_policy = resource_policy
+        # Shared challenge clearance (cookies + UA) for both tiers
+        self.clearance = clearance
+        # Shared per-domain throttle; every request (HTTP or navigation) takes a token
+        self.rate_limiter = rate_limiter
+        # Stored ETag / Last-Modified / body hash for conditional GETs on recrawls
+        self.validators = validators
 
     def fetch(self, url: str, retries: int = 3) -> Optional[str]:
-        # Force dynamic fetch for Comfort Gifts to handle challenges
-        return self.fetch_dynamic(url, retries=retries)
-        
+        """Tiered fetch: plain HTTP first, browser only on challenge/block"""
+        return self.fetch_page(url, retries=retries).html
+
+    def fetch_page(self, url: str, retries: int = 3, dynamic: bool = False) -> FetchResult:
+        """
+        Fetch a page through the cheapest tier that works.
+        - dynamic=False: pooled HTTP client, escalate to Playwright on challenge/block
+        - dynamic=True: straight to Playwright (suppliers configured with use_dynamic)
+        """
+        start = time.time()
+        result = FetchResult(url=url)
+        # The browser is for challenges/blocks and dead connections, not for 404s and server errors
+        escalate = True
+
+        if not dynamic and (not self.clearance or self.clearance.http_usable(url)):
+            if self.rate_limiter:
+                with span("fetch.throttle"):
+                    self.rate_limiter.acquire(url)
+            known = self.validators.get(url) if self.validators else None
+            html, status = self._fetch_http_tier(url, conditional_headers(known))
+            result.status = status
+            result.challenged = status in (403, 503) or is_challenge_page(html)
+            self._record_outcome(url, status, result.challenged)
+            if status == 304:
+                result.not_modified = result.unchanged = True
+                result.tier = "http"
+            elif html and not result.challenged:
+                result.html = html
+                result.tier = "http"
+                if self.validators:
+                    self._set_validators(result, known)
+            elif result.challenged or status is None:
+                logger.info(f"HTTP tier blocked/failed for {url} (status={status}), escalating to browser")
+            else:
+                escalate = False
+                logger.info(f"HTTP {status} for {url}, not escalating")
+
+        if escalate and not result.html and not result.not_modified:
+            with span("fetch.browser"):
+                html = self.fetch_dynamic(url, retries=min(retries, 2))
+            if html:
+                result.html = html
+                result.tier = "browser"
+
+        result.elapsed = time.time() - start
+        self.tier_counts[result.tier] += 1
+        return result
+
+    def _set_validators(self, result: FetchResult, known: Optional[dict]):
+        headers = self.last_response_headers
+        result.etag = headers.get("ETag")
+        result.last_modified = headers.get("Last-Modified")
+        result.body_hash = body_hash(result.html)
+        result.unchanged = bool(known) and known["body_hash"] == result.body_hash
+
+    def _record_outcome(self, url: str, status: Optional[int], challenged: bool):
+        if not self.rate_limiter:
+            return
+        if status in (429, 503):
+            outcome = ratelimit.THROTTLED
+        elif challenged:
+            outcome = ratelimit.CHALLENGE
+        elif status is None:
+            outcome = ratelimit.TIMEOUT
+        elif status >= 500:
+            outcome = ratelimit.ERROR
+        else:
+            outcome = ratelimit.OK
+        self.rate_limiter.record(url, outcome)
+
+    def _fetch_http_tier(self, url: str, headers: Optional[dict] = None) -> tuple[Optional[str], Optional[int]]:
+        """HTTP GET with the domain's clearance; solve the challenge once if we hit it"""
+        if not self.clearance:
+            return self.fetch_static(url, headers)
+
+        c = self.clearance.get(url)
+        if c:
+            c.apply_to_session(self.session)
+        html, status = self.fetch_static(url, headers)
+        challenged = status in (403, 503) or is_challenge_page(html)
+        if challenged:
+            # One browser solve per domain; concurrent workers wait and reuse it
+            with span("fetch.clearance"):
+                c = self.clearance.solve(url, force=c is not None)
+            if c:
+                c.apply_to_session(self.session)
+                html, status = self.fetch_static(url, headers)
+                challenged = status in (403, 503) or is_challenge_page(html)
+        self.clearance.record_http_result(url, challenged)
+        return html, status
+
+    def fetch_static(self, url: str, headers: Optional[dict] = None) -> tuple[Optional[str], Optional[int]]:
+        """Single GET through the pooled session. Returns (html, status); 304 comes back as ("", 304)."""
+        self.last_response_headers = {}
+        try:
+            with span("fetch.http"):
+                resp = self.session.get(url, headers=headers, timeout=self.http_timeout)
+                # Decoding the body (charset detection included) counts as part of the request
+                text = resp.text if resp.status_code < 400 else None
+        except requests.RequestException as e:
+            logger.debug(f"HTTP fetch error for {url}: {e}")
+            return None, None
+        self.last_response_headers = resp.headers
+        if resp.status_code >= 400:
+            # 403/429/503 are usually the WAF, anything else is a plain miss
+            return None, resp.status_code
+        return text, resp.status_code
+
+    def _get_pool(self) -> BrowserPool:
+        if self.pool is None:
+            # Standalone use: a private single-page pool
+            self.pool = BrowserPool(pages_per_browser=1, resource_policy=self.resource_policy)
+            self._owns_pool = True
+        return self.pool
+
     def fetch_dynamic(self, url: str, retries: int = 2) -> Optional[str]:
-        import time
-        self._init_browser()
-        for attempt in range(retries):
-            try:
-                # Shield Genius can takes a few seconds to clear
-                logger.info(f"Navigating to {url}...")
-                self.page.goto(url, wait_until="load", timeout=60000)
-                
-                # Check for Robot Challenge Screen
-                max_wait = 20
-                waited = 0
-                while waited < max_wait:
+        with self._get_pool().lease() as page:
+            if self.clearance:
+                self.clearance.apply_to_page(page, url)
+            for attempt in range(retries):
+                saw_challenge = False
+                if self.rate_limiter:
+                    with span("fetch.throttle"):
+                        self.rate_limiter.acquire(url)
+                try:
+                    # Shield Genius can takes a few seconds to clear
+                    logger.info(f"Navigating to {url}...")
+                    with span("fetch.goto"):
+                        page.goto(url, wait_until="load", timeout=60000)
+                    
+                    # Check for Robot Challenge Screen
+                    max_wait = 20
+                    waited = 0
+                    with span("fetch.challenge_wait"):
+                        while waited < max_wait:
+                            try:
+                                title = page.title()
+                                if CHALLENGE_TITLE not in title:
+                                    break
+                                saw_challenge = True
+                                if waited == 0:
+                                    logger.info("Detected Robot Challenge Screen. Waiting for auto-solve...")
+                            except Exception:
+                                # Context might be destroyed during refresh
+                                pass
+                            time.sleep(1)
+                            waited += 1
+                    
                     try:
-                        title = self.page.title()
-                        if "Robot Challenge Screen" not in title:
-                            break
-                        if waited == 0:
-                            logger.info("Detected Robot Challenge Screen. Waiting for auto-solve...")
-                    except Exception:
-                        # Context might be destroyed during refresh
+                        if CHALLENGE_TITLE in page.title():
+                            raise Exception("Robot Challenge failed to solve in time.")
+                    except:
                         pass
-                    time.sleep(1)
-                    waited += 1
-                
-                try:
-                    if "Robot Challenge Screen" in self.page.title():
-                        raise Exception("Robot Challenge failed to solve in time.")
-                except:
-                    pass
-
-                content = self.page.content()
-                if "sgcaptcha" in content or "access denied" in content.lower():
-                    raise Exception("Blocked by anti-bot/captcha after challenge")
-                
-                # Final wait for dynamic content
-                try:
-                    self.page.wait_for_selector("#tab-description, .product-info, #content", timeout=5000)
-                except:
-                    pass
+
+                    with span("fetch.content"):
+                        content = page.content()
+                    if is_challenge_page(content):
+                        raise Exception("Blocked by anti-bot/captcha after challenge")
                     
-                return self.page.content()
-            except Exception as e:
-                logger.warning(f"Dynamic fetch attempt {attempt+1} failed: {e}")
-                if "challenge" in str(e).lower() or "block" in str(e).lower():
-                    logger.info("Hit block/challenge, attempting cooldown and refresh...")
-                    self.context.clear_cookies()
-                    time.sleep(30)
-                if attempt == retries - 1:
-                    logger.error(f"Dynamic fetch failed for {url} after {retries} attempts.")
+                    # Final wait for dynamic content
+                    with span("fetch.selector_wait"):
+                        try:
+                            page.wait_for_selector("#tab-description, .product-info, #content", timeout=5000)
+                        except:
+                            pass
+
+                    if saw_challenge and self.clearance:
+                        # We just paid for a solve: share it with every other worker
+                        self.clearance.store_from_page(page, url)
+
+                    if self.rate_limiter:
+                        self.rate_limiter.record(url, ratelimit.OK)
+                    with span("fetch.content"):
+                        return page.content()
+                except Exception as e:
+                    logger.warning(f"Dynamic fetch attempt {attempt+1} failed: {e}")
+                    if "challenge" in str(e).lower() or "block" in str(e).lower():
+                        logger.info("Hit block/challenge, attempting cooldown and refresh...")
+                        page.context.clear_cookies()
+                        if self.clearance:
+                            self.clearance.invalidate(url)
+                        if self.rate_limiter:
+                            # Domain-wide backoff; the next attempt waits in acquire()
+                            self.rate_limiter.record(url, ratelimit.CHALLENGE)
+                        else:
+                            time.sleep(30)
+                    elif self.rate_limiter:
+                        self.rate_limiter.record(url, ratelimit.TIMEOUT)
+                    if attempt == retries - 1:
+                        logger.error(f"Dynamic fetch failed for {url} after {retries} attempts.")
         return None
 
     def close(self):
-        if self.browser:
-            self.browser.close()
-        if self.playwright:
-            self.playwright.stop()
+        self.session.close()
+        if self._owns_pool and self.pool:
+            self.pool.close()
+            self.pool = None
 
@@ -0,0 +1,144 @@
+import heapq
+import logging
+import math
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400.0
+# Prior: this many default intervals' worth of observation at the default
+# rate, so short or few quiet revisits lengthen the interval gradually
+PRIOR_INTERVALS = 2
+
+
+def init_schema(conn: sqlite3.Connection):
+    """Per-product change history: revisits, how many found new content, seconds covered"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS product_freshness
+                    (catalog_id TEXT PRIMARY KEY,
+                     checks INTEGER DEFAULT 0,
+                     changes INTEGER DEFAULT 0,
+                     observed REAL DEFAULT 0,
+                     last_changed_at REAL)''')
+
+
+def to_epoch(value: Any) -> Optional[float]:
+    """last_seen_at as stored (datetime or ISO string) -> unix time; None if unknown"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value))
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def record_check(conn: sqlite3.Connection, catalog_id: str, previous_seen: Any, seen_at: Any, changed: bool):
+    """
+    One revisit of a known product: `changed` if its content_hash differs
+    from the stored one. A first sighting (previous_seen None) only creates
+    the row. Runs inside the caller's upsert transaction.
+    """
+    prev, now = to_epoch(previous_seen), to_epoch(seen_at)
+    if prev is None or now is None or now <= prev:
+        conn.execute("INSERT OR IGNORE INTO product_freshness (catalog_id, last_changed_at) VALUES (?, ?)",
+                     (catalog_id, now))
+        return
+    conn.execute('''INSERT INTO product_freshness (catalog_id, checks, changes, observed, last_changed_at)
+                    VALUES (?, 1, ?, ?, ?)
+                    ON CONFLICT(catalog_id) DO UPDATE SET
+                    checks = checks + 1,
+                    changes = changes + excluded.changes,
+                    observed = observed + excluded.observed,
+                    last_changed_at = COALESCE(excluded.last_changed_at, last_changed_at)''',
+                 (catalog_id, int(changed), now - prev, now if changed else None))
+
+
+class FreshnessScheduler:
+    """
+    Adaptive revisit intervals from each product's observed change history.
+
+    Changes are modelled as a Poisson process per product. Its rate is
+    estimated from n revisits spaced I apart on average, X of which found
+    new content, as -ln((n - X + 0.5) / (n + 0.5)) / I. That estimate does
+    not blow up when every revisit saw a change, unlike X / (n * I). It is
+    blended with the default rate by observed time (the prior counts as
+    PRIOR_INTERVALS default intervals). The revisit
+    interval is 1 / rate, clamped to [min_interval, max_interval]. The
+    chance that a product changed since it was last seen is
+    1 - exp(-age / interval); `most_stale(N)` returns the N products with
+    the highest chance.
+    """
+
+    def __init__(self, db_path: str, min_interval: float = 0.25 * DAY, max_interval: float = 60 * DAY,
+                 default_interval: float = 7 * DAY):
+        self.db_path = db_path
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.default_interval = min(max(default_interval, self.min_interval), self.max_interval)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "FreshnessScheduler":
+        """`freshness: {min_interval_hours: 6, max_interval_days: 60, default_interval_days: 7}`"""
+        opts = config.get("freshness") or {}
+        return cls(config.get("db_path", "products.db"),
+                   min_interval=opts.get("min_interval_hours", 6) * 3600,
+                   max_interval=opts.get("max_interval_days", 60) * DAY,
+                   default_interval=opts.get("default_interval_days", 7) * DAY)
+
+    def interval(self, checks: int, changes: int, observed: float) -> float:
+        """Revisit interval in seconds"""
+        if not checks or observed <= 0:
+            return self.default_interval
+        mean_gap = observed / checks
+        changes = min(changes, checks)
+        estimate = -math.log((checks - changes + 0.5) / (checks + 0.5)) / mean_gap
+        prior_time = PRIOR_INTERVALS * self.default_interval
+        rate = (estimate * observed + PRIOR_INTERVALS) / (observed + prior_time)
+        return min(max(1.0 / rate, self.min_interval), self.max_interval)
+
+    def stale_probability(self, interval: float, age: float) -> float:
+        return 1.0 - math.exp(-max(0.0, age) / interval)
+
+    def _candidates(self, supplier_slug: Optional[str]):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            init_schema(conn)
+            query = '''SELECT p.url, p.last_seen_at, f.checks, f.changes, f.observed
+                       FROM products p LEFT JOIN product_freshness f ON f.catalog_id = p.catalog_id
+                       WHERE p.url IS NOT NULL'''
+            if supplier_slug:
+                return conn.execute(query + " AND p.supplier_slug = ?", (supplier_slug,)).fetchall()
+            return conn.execute(query).fetchall()
+        finally:
+            conn.close()
+
+    def most_stale(self, budget: int, supplier_slug: Optional[str] = None,
+                   now: Optional[float] = None) -> List[Tuple[str, float]]:
+        """(url, probability it changed since last seen) for the `budget` stalest products, stalest first"""
+        now = now or time.time()
+        scored = []
+        for url, last_seen, checks, changes, observed in self._candidates(supplier_slug):
+            if not url.startswith("http"):
+                continue
+            seen = to_epoch(last_seen)
+            age = now - seen if seen is not None else self.max_interval
+            interval = self.interval(checks or 0, changes or 0, observed or 0.0)
+            scored.append((self.stale_probability(interval, age), url))
+        return [(url, p) for p, url in heapq.nlargest(budget, scored)]
+
+    def report(self, supplier_slug: Optional[str] = None) -> Dict[str, Any]:
+        """How many products fall in each interval band (for logs)"""
+        bands = {"<1d": 0, "1-7d": 0, "7-30d": 0, ">=30d": 0}
+        for _, _, checks, changes, observed in self._candidates(supplier_slug):
+            days = self.interval(checks or 0, changes or 0, observed or 0.0) / DAY
+            key = "<1d" if days < 1 else "1-7d" if days < 7 else "7-30d" if days < 30 else ">=30d"
+            bands[key] += 1
+        return bands
@@ -0,0 +1,279 @@
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from crawler.utils import slugify_supplier
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+
+class Frontier:
+    """
+    Disk-backed crawl frontier: one row per URL ever admitted, with state
+    pending -> in_flight -> done/failed and the time it was leased.
+    Every transition is written through, so a crash or SIGTERM loses at most
+    the pages that were in flight; `recover()` puts those back to pending
+    and `main.py --resume` continues from there.
+    The URL column doubles as the visited set (a URL is only admitted once).
+
+    URLs are leased highest `priority` first (FIFO within a priority). The
+    top `heap_size` pending URLs are cached in an in-memory heap; anything
+    below it stays on disk and is read back when the heap runs dry, so
+    memory is bounded without ever dropping links.
+
+    With a `canonicalize` callable (url -> (canonical url, dedup key), e.g.
+    UrlCanonicalizer) URLs are admitted in canonical form and deduplicated on
+    the key. Every distinct raw URL offered is recorded too, so
+    (raw URLs seen - URLs admitted) is exactly the number of fetches avoided.
+    """
+
+    def __init__(self, path: str, heap_size: int = 10000,
+                 canonicalize: Optional[Callable[[str], Tuple[str, str]]] = None):
+        self.path = path
+        self.heap_size = max(1, heap_size)
+        self.canonicalize = canonicalize
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS frontier
+                              (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                               url TEXT UNIQUE,
+                               state TEXT,
+                               attempts INTEGER DEFAULT 0,
+                               priority REAL DEFAULT 0,
+                               depth INTEGER DEFAULT 0,
+                               yield INTEGER,
+                               dedup_key TEXT,
+                               card TEXT,
+                               added_at REAL,
+                               leased_at REAL,
+                               updated_at REAL)''')
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(frontier)")]
+        for col, dtype in (("priority", "REAL DEFAULT 0"), ("depth", "INTEGER DEFAULT 0"), ("yield", "INTEGER"), ("dedup_key", "TEXT"), ("card", "TEXT")):
+            if col not in columns:
+                self._conn.execute(f"ALTER TABLE frontier ADD COLUMN {col} {dtype}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_frontier_priority ON frontier(state, priority DESC, id)")
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_frontier_key ON frontier(dedup_key)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS raw_urls (url TEXT PRIMARY KEY)")
+        self._raw_seen = self._conn.execute("SELECT COUNT(*) FROM raw_urls").fetchone()[0]
+        self._counts: Counter = Counter(dict(self._conn.execute(
+            "SELECT state, COUNT(*) FROM frontier GROUP BY state").fetchall()))
+
+        # Cached best pending URLs: (-priority, id, url, depth). _disk_max bounds
+        # the priority of pending rows that are only on disk (unknown after open).
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._disk_max = float("inf") if self._counts[PENDING] else float("-inf")
+        # Depth of leased URLs, for scoring the links they produce
+        self._depths: Dict[str, int] = {}
+        self.stats = {"spilled": 0, "refills": 0}
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any],
+                    canonicalize: Optional[Callable[[str], Tuple[str, str]]] = None) -> "Frontier":
+        """
+        `frontier: {path: ..., heap_size: 10000}`; the path defaults to
+        <db>.<supplier>.frontier.db next to the products DB
+        """
+        opts = config.get("frontier") or {}
+        return cls(cls.path_for(config), heap_size=opts.get("heap_size", 10000), canonicalize=canonicalize)
+
+    @staticmethod
+    def path_for(config: Dict[str, Any]) -> str:
+        path = (config.get("frontier") or {}).get("path")
+        if path:
+            return path
+        db_path = config.get("db_path", "products.db")
+        slug = slugify_supplier(config.get("supplier") or "default")
+        return f"{os.path.splitext(db_path)[0]}.{slug}.frontier.db"
+
+    def reset(self):
+        """Forget everything (fresh crawl)"""
+        with self._lock:
+            self._conn.execute("DELETE FROM frontier")
+            self._conn.execute("DELETE FROM raw_urls")
+            self._raw_seen = 0
+            self._counts.clear()
+            self._heap = []
+            self._disk_max = float("-inf")
+            self._depths.clear()
+
+    def recover(self) -> int:
+        """Return URLs leased by a run that died back to pending; returns how many"""
+        with self._lock:
+            n = self._conn.execute("UPDATE frontier SET state = ?, leased_at = NULL WHERE state = ?",
+                                   (PENDING, IN_FLIGHT)).rowcount
+            self._counts[PENDING] += n
+            self._counts[IN_FLIGHT] = 0
+            # Recovered rows may outrank what is cached; re-read from disk
+            self._disk_max = float("inf")
+        if n:
+            logger.info(f"Frontier: {n} in-flight URL(s) from the previous run returned to pending")
+        return n
+
+    def add(self, url: str, priority: float = 0.0, depth: int = 0) -> bool:
+        """Admit a URL; False if it was seen before (in any state)"""
+        return self.add_many([url], priority=priority, depth=depth) == 1
+
+    def add_many(self, urls: Iterable[str], priority: float = 0.0, depth: int = 0) -> int:
+        return self.add_entries((url, priority, depth) for url in urls)
+
+    def add_entries(self, entries: Iterable[tuple]) -> int:
+        """
+        Admit (url, priority, depth) entries in one transaction; returns how
+        many were new. An optional 4th item is the product's listing card
+        (dict), kept with the URL until it is fetched (see card()).
+        """
+        now = time.time()
+        added = 0
+        with self.transaction():
+            for entry in entries:
+                raw, priority, depth = entry[:3]
+                card = json.dumps(entry[3]) if len(entry) > 3 and entry[3] is not None else None
+                url, key = self.canonicalize(raw) if self.canonicalize else (raw, raw)
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO frontier (url, dedup_key, state, priority, depth, card, added_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (url, key, PENDING, priority, depth, card, now))
+                if cur.rowcount:
+                    added += 1
+                    self._counts[PENDING] += 1
+                    self._push(priority, cur.lastrowid, url, depth)
+                if self.canonicalize:
+                    self._raw_seen += self._conn.execute(
+                        "INSERT OR IGNORE INTO raw_urls (url) VALUES (?)", (raw,)).rowcount
+        return added
+
+    @contextmanager
+    def transaction(self):
+        """Group several calls into one commit; nests (inner blocks join the outer one)"""
+        with self._lock:
+            if self._conn.in_transaction:
+                yield
+                return
+            self._conn.execute("BEGIN")
+            try:
+                yield
+            finally:
+                self._conn.execute("COMMIT")
+
+    def _push(self, priority: float, row_id: int, url: str, depth: int):
+        heapq.heappush(self._heap, (-priority, row_id, url, depth))
+        if len(self._heap) >= 2 * self.heap_size:
+            # Keep the best half in memory; the rest is still pending on disk
+            self._heap.sort()
+            spilled = self._heap[self.heap_size:]
+            del self._heap[self.heap_size:]
+            self._disk_max = max(self._disk_max, -spilled[0][0])
+            self.stats["spilled"] += len(spilled)
+
+    def _refill(self):
+        """Reload the best `heap_size` pending rows (heap entries included) from disk"""
+        rows = self._conn.execute(
+            "SELECT priority, id, url, depth FROM frontier WHERE state = ? ORDER BY priority DESC, id LIMIT ?",
+            (PENDING, self.heap_size)).fetchall()
+        self._heap = [(-p, i, u, d) for p, i, u, d in rows]
+        heapq.heapify(self._heap)
+        self._disk_max = rows[-1][0] if len(rows) == self.heap_size else float("-inf")
+        self.stats["refills"] += 1
+
+    def lease(self) -> Optional[str]:
+        """Highest-priority pending URL, marked in_flight; None when nothing is pending"""
+        with self._lock:
+            while True:
+                if not self._counts[PENDING]:
+                    return None
+                if not self._heap or -self._heap[0][0] < self._disk_max:
+                    # Something on disk may outrank the cache
+                    self._refill()
+                    if not self._heap:
+                        return None
+                _, row_id, url, depth = heapq.heappop(self._heap)
+                n = self._conn.execute(
+                    "UPDATE frontier SET state = ?, leased_at = ?, attempts = attempts + 1 WHERE id = ? AND state = ?",
+                    (IN_FLIGHT, time.time(), row_id, PENDING)).rowcount
+                if n:
+                    self._counts[PENDING] -= 1
+                    self._counts[IN_FLIGHT] += 1
+                    self._depths[url] = depth
+                    return url
+
+    def depth(self, url: str) -> int:
+        """Link depth of a leased URL (0 for seeds)"""
+        return self._depths.get(url, 0)
+
+    def card(self, url: str) -> Optional[Dict[str, Any]]:
+        """Listing card the URL was admitted with ({} for a card without fields), None if none"""
+        with self._lock:
+            row = self._conn.execute("SELECT card FROM frontier WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def record_yield(self, url: str, new_urls: int):
+        """How many new URLs a page contributed (discovery yield, for reports/scoring)"""
+        with self._lock:
+            self._conn.execute("UPDATE frontier SET yield = ? WHERE url = ?", (new_urls, url))
+
+    def release(self, url: str):
+        """Give back a leased URL that was not processed (e.g. on stop)"""
+        with self._lock:
+            n = self._conn.execute("UPDATE frontier SET state = ?, leased_at = NULL WHERE url = ? AND state = ?",
+                                   (PENDING, url, IN_FLIGHT)).rowcount
+            if n:
+                self._counts[IN_FLIGHT] -= 1
+                self._counts[PENDING] += 1
+                # It may outrank the cached heap
+                self._disk_max = float("inf")
+            self._depths.pop(url, None)
+
+    def complete(self, url: str):
+        self._finish(url, DONE)
+
+    def fail(self, url: str):
+        self._finish(url, FAILED)
+
+    def _finish(self, url: str, state: str):
+        with self._lock:
+            n = self._conn.execute("UPDATE frontier SET state = ?, updated_at = ? WHERE url = ? AND state = ?",
+                                   (state, time.time(), url, IN_FLIGHT)).rowcount
+            if n:
+                self._counts[IN_FLIGHT] -= 1
+                self._counts[state] += 1
+            self._depths.pop(url, None)
+
+    def __contains__(self, url: str) -> bool:
+        if self.canonicalize:
+            url = self.canonicalize(url)[0]
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM frontier WHERE url = ?", (url,)).fetchone() is not None
+
+    @property
+    def aliases(self) -> int:
+        """Distinct URL variants folded into an admitted URL (= fetches avoided)"""
+        with self._lock:
+            return max(0, self._raw_seen - sum(self._counts.values()))
+
+    @property
+    def pending(self) -> int:
+        return self._counts[PENDING]
+
+    @property
+    def in_flight(self) -> int:
+        return self._counts[IN_FLIGHT]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {state: self._counts[state] for state in (PENDING, IN_FLIGHT, DONE, FAILED)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,115 @@
+import json
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, List, Mapping, Optional
+from crawler.freshness import to_epoch
+
+logger = logging.getLogger(__name__)
+
+# Columns the upsert overwrites in place: product_changes is their only record of earlier values
+TRACKED_FIELDS = ("title", "sku", "price", "availability", "description", "color",
+                  "images", "properties", "category_path", "url_clean")
+
+
+def init_schema(conn: sqlite3.Connection):
+    """
+    Per-product deltas, {field: new value as stored in products}, one row
+    per sighting that changed something. kind: inserted (first sighting,
+    every tracked field), changed (only the fields that differ) or
+    baseline (state of a product stored before the history existed, so
+    its deltas have a start).
+    """
+    conn.execute('''CREATE TABLE IF NOT EXISTS product_changes
+                    (id INTEGER PRIMARY KEY,
+                     catalog_id TEXT NOT NULL,
+                     changed_at REAL NOT NULL,
+                     kind TEXT NOT NULL,
+                     fields TEXT NOT NULL)''')
+    # "What changed since last week" and "history of one product"
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_changes_time ON product_changes(changed_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_changes_product ON product_changes(catalog_id, changed_at)")
+
+
+def _epoch(value: Any) -> Optional[float]:
+    # Query bounds may also come as unix times in strings (query parameters)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return to_epoch(value)
+
+
+def _insert(conn: sqlite3.Connection, catalog_id: str, at: float, kind: str, fields: Dict[str, Any]):
+    conn.execute("INSERT INTO product_changes (catalog_id, changed_at, kind, fields) VALUES (?, ?, ?, ?)",
+                 (catalog_id, at, kind, json.dumps(fields, ensure_ascii=False)))
+
+
+def record_change(conn: sqlite3.Connection, catalog_id: str, previous: Optional[Mapping[str, Any]],
+                  row: Mapping[str, Any], seen_at: Any):
+    """
+    One upsert of `row` over `previous` (the stored tracked fields plus
+    last_seen_at, None for a new product). Writes only the fields that
+    differ; runs inside the caller's upsert transaction.
+    """
+    at = to_epoch(seen_at) or time.time()
+    if previous is None:
+        _insert(conn, catalog_id, at, "inserted", {f: row.get(f) for f in TRACKED_FIELDS})
+        return
+    delta = {f: row.get(f) for f in TRACKED_FIELDS if row.get(f) != previous[f]}
+    if not delta:
+        return
+    # A replayed (older) sighting still changes the row now: it goes after the stored state
+    at = max(at, to_epoch(previous["last_seen_at"]) or at)
+    if not conn.execute("SELECT 1 FROM product_changes WHERE catalog_id = ? LIMIT 1", (catalog_id,)).fetchone():
+        # Last known state before this change, as of the sighting that stored it
+        _insert(conn, catalog_id, min(to_epoch(previous["last_seen_at"]) or at, at), "baseline",
+                {f: previous[f] for f in TRACKED_FIELDS})
+    _insert(conn, catalog_id, at, "changed", delta)
+
+
+def changes(db_path: str, since: Any, until: Any = None, supplier_slug: Optional[str] = None,
+            limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Inserted / changed products in [since, until) (datetimes, ISO strings
+    or unix times), oldest first: {catalog_id, changed_at, kind, fields}.
+    """
+    query = "SELECT catalog_id, changed_at, kind, fields FROM product_changes WHERE changed_at >= ? AND kind != 'baseline'"
+    params: list = [_epoch(since) or 0.0]
+    if until is not None:
+        query += " AND changed_at < ?"
+        params.append(_epoch(until))
+    if supplier_slug:
+        query += " AND catalog_id LIKE ?"
+        params.append(f"{supplier_slug}:%")
+    query += " ORDER BY changed_at, id"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    conn = sqlite3.connect(db_path)
+    try:
+        return [{"catalog_id": catalog_id, "changed_at": changed_at, "kind": kind, "fields": json.loads(fields)}
+                for catalog_id, changed_at, kind, fields in conn.execute(query, params)]
+    except sqlite3.OperationalError as e:
+        logger.error(f"Could not read product changes: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def product_at(db_path: str, catalog_id: str, at: Any) -> Optional[Dict[str, Any]]:
+    """A product's tracked fields as of `at`, replayed from its history; None if not known by then"""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT fields FROM product_changes WHERE catalog_id = ? AND changed_at <= ? "
+                            "ORDER BY changed_at, id", (catalog_id, _epoch(at))).fetchall()
+    except sqlite3.OperationalError as e:
+        logger.error(f"Could not read history of {catalog_id}: {e}")
+        return None
+    finally:
+        conn.close()
+    if not rows:
+        return None
+    state: Dict[str, Any] = {"catalog_id": catalog_id}
+    for (fields,) in rows:
+        state.update(json.loads(fields))
+    return state
@@ -0,0 +1,86 @@
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional
+from urllib.parse import urljoin
+from crawler.parser import HTMLParser
+
+logger = logging.getLogger(__name__)
+
+PAGINATION_TYPES = ("next_button", "numbered")
+
+
+class Listing(NamedTuple):
+    products: Dict[str, Dict[str, Any]]  # product URL -> card fields ({} if none configured)
+    pages: List[str]                     # pagination links to follow
+
+
+class ListingHarvester:
+    """
+    Reads product listings (category / search result pages) the way the
+    supplier's config describes them: product URLs from `product_link` (or
+    the first link of each `card`), card-level fields such as title, price
+    and image, and the pagination links. Discovery then follows listings
+    page by page instead of every link on the site.
+    """
+
+    def __init__(self, product_link: Optional[str] = None, card: Optional[str] = None,
+                 card_fields: Optional[Dict[str, str]] = None, pagination: Optional[Dict[str, Any]] = None,
+                 product_page_links: bool = False):
+        pagination = pagination or {}
+        self.product_link = product_link
+        self.card = card
+        self.card_fields = card_fields or {}
+        self.pagination_type = pagination.get("type", "next_button")
+        if self.pagination_type not in PAGINATION_TYPES:
+            raise ValueError(f"Unknown pagination type {self.pagination_type!r} (expected one of {PAGINATION_TYPES})")
+        self.pagination_selector = pagination.get("selector")
+        # Product pages are leaves unless their links are wanted too (related products etc.)
+        self.product_page_links = product_page_links
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["ListingHarvester"]:
+        """
+        `listing: {product_link, card, card_fields, product_page_links}` plus
+        `pagination: {type, selector}`; `selectors.product_link` is read too.
+        None (follow every link) unless product links or pagination are configured.
+        """
+        opts = config.get("listing") or {}
+        if opts.get("enabled") is False:
+            return None
+        product_link = opts.get("product_link") or (config.get("selectors") or {}).get("product_link")
+        pagination = config.get("pagination") or {}
+        if not (product_link or opts.get("card") or pagination.get("selector")):
+            return None
+        return cls(product_link=product_link, card=opts.get("card"), card_fields=opts.get("card_fields"),
+                   pagination=pagination, product_page_links=opts.get("product_page_links", False))
+
+    def harvest(self, parser: HTMLParser, url: str) -> Listing:
+        products: Dict[str, Dict[str, Any]] = {}
+        if self.card:
+            for node in parser.tree.css(self.card):
+                link = node if node.tag == "a" else node.css_first(self.product_link or "a[href]")
+                href = self._resolve(url, link)
+                if href and href not in products:
+                    products[href] = parser.parse_fields(self.card_fields, root=node) if self.card_fields else {}
+        elif self.product_link:
+            for node in parser.tree.css(self.product_link):
+                href = self._resolve(url, node)
+                if href:
+                    products.setdefault(href, {})
+
+        pages: List[str] = []
+        if self.pagination_selector:
+            for node in parser.tree.css(self.pagination_selector):
+                href = self._resolve(url, node if node.tag == "a" else node.css_first("a[href]"))
+                if href and href != url and href not in pages:
+                    pages.append(href)
+                    if self.pagination_type == "next_button":
+                        break
+        return Listing(products, pages)
+
+    @staticmethod
+    def _resolve(base_url: str, node) -> Optional[str]:
+        href = node.attributes.get("href") if node is not None else None
+        if not href:
+            return None
+        full_url = urljoin(base_url, href).split("#")[0]
+        return full_url if full_url.startswith("http") else None
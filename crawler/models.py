@@ -1,5 +1,7 @@
-from pydantic import BaseModel, Field, HttpUrl
-from typing import List, Dict, Optional, Any
+from pydantic import BaseModel, Field, GetPydanticSchema, HttpUrl, TypeAdapter
+from pydantic_core import core_schema
+from typing import Annotated, List, Dict, Optional, Any
+from typing_extensions import NotRequired, TypedDict
 from datetime import datetime
 
 class Product(BaseModel):
@@ -30,3 +32,46 @@ class Product(BaseModel):
     content_hash: str
     first_seen_at: datetime
     last_seen_at: datetime
+
+
+# HttpUrl's checks (and normalization), done in pydantic-core, returned as the
+# string str(HttpUrl(...)) gives: no HttpUrl object per image to build and str() again
+HttpUrlStr = Annotated[str, GetPydanticSchema(lambda _type, _handler: core_schema.no_info_after_validator_function(
+    str, core_schema.url_schema(max_length=2083, allowed_schemes=["http", "https"], host_required=True)))]
+
+
+class ScrapedFields(TypedDict):
+    """
+    The Product fields that come from supplier pages, with Product's types.
+    The rest (ids, content_hash, timestamps, supplier) is generated by
+    DataPipeline and only checked by check_system_fields.
+    """
+    url: HttpUrlStr
+    title: str
+    sku: NotRequired[Optional[str]]
+    category_path: NotRequired[List[str]]
+    description: NotRequired[Optional[str]]
+    color: NotRequired[Optional[str]]
+    properties: NotRequired[Dict[str, str]]
+    images: NotRequired[List[HttpUrlStr]]
+    price: NotRequired[Optional[float]]
+    currency: NotRequired[Optional[str]]
+    availability: NotRequired[Optional[str]]
+    variants: NotRequired[List[Dict[str, Any]]]
+    raw: NotRequired[Dict[str, Any]]
+
+
+# Built once: validating against it skips Product construction and model_dump()
+SCRAPED_FIELDS = TypeAdapter(ScrapedFields)
+
+SYSTEM_STR_FIELDS = ("supplier", "catalog_id", "sku_clean", "supplier_slug", "content_hash")
+
+
+def check_system_fields(data: Dict[str, Any]):
+    """Product's rules for the pipeline-generated fields, by hand (ValueError)"""
+    for field in SYSTEM_STR_FIELDS:
+        if not isinstance(data.get(field), str):
+            raise ValueError(f"{field}: expected a string, got {data.get(field)!r}")
+    for field in ("first_seen_at", "last_seen_at"):
+        if not isinstance(data.get(field), datetime):
+            raise ValueError(f"{field}: expected a datetime, got {data.get(field)!r}")
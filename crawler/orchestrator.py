@@ -0,0 +1,165 @@
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+from crawler.browser_pool import BrowserPool
+from crawler.clearance import ClearanceManager
+from crawler.core import CrawlerEngine
+from crawler.runs import RunRegistry
+from crawler.stats import AtomicCounter
+from crawler.utils import slugify_supplier
+from crawler.writer import DBWriter, QueuedPipeline, QueuedValidators
+
+logger = logging.getLogger(__name__)
+
+LOG_EVERY = 10.0  # seconds between status lines
+
+
+def _clearance_enabled(config: Dict[str, Any]) -> bool:
+    opts = config.get("clearance")
+    return bool(opts) and opts.get("enabled") is not False
+
+
+class PoolQuota:
+    """
+    One supplier's view of the shared BrowserPool: at most `limit` pages
+    leased at a time, so a challenge-heavy supplier cannot starve the rest.
+    """
+
+    def __init__(self, pool: BrowserPool, limit: int):
+        self.pool = pool
+        self.limit = max(1, limit)
+        self._slots = threading.BoundedSemaphore(self.limit)
+
+    @contextmanager
+    def lease(self):
+        with self._slots:
+            with self.pool.lease() as page:
+                yield page
+
+    def close(self):
+        pass  # the orchestrator closes the shared pool
+
+    def __getattr__(self, name):
+        return getattr(self.pool, name)
+
+
+class SupplierEngine(CrawlerEngine):
+    """CrawlerEngine for one supplier of a MultiSupplierCrawl"""
+
+    def __init__(self, config: Dict[str, Any], **kwargs):
+        super().__init__(config, **kwargs)
+        self.count = AtomicCounter()
+        # Recorded by the orchestrator once the shared writer has stored its products
+        self.record_run = False
+
+    def _log_status(self, count: int, start_time: float):
+        pass  # the orchestrator logs one line for all suppliers
+
+
+class MultiSupplierCrawl:
+    """
+    main.py --configs a.yaml b.yaml ...: all suppliers crawled at the same
+    time, so a full refresh takes as long as the slowest one.
+    Each supplier keeps its own frontier, worker quota (`num_workers`),
+    per-domain rate limiter (`rate_limit`) and browser quota (`browser_quota`,
+    default: an equal share of the pool). They share one browser pool, one
+    clearance store and one products-DB writer.
+    """
+
+    def __init__(self, configs: List[Dict[str, Any]]):
+        self.configs = configs
+        db_path = configs[0].get("db_path", "products.db")
+        self.results: queue.Queue = queue.Queue()
+        self.writer = DBWriter.from_config(configs[0], self.results, revalidate=any(c.get("revalidate") for c in configs))
+
+        # Pool sized by the first config that has a browser_pool section
+        pool_config = next((c for c in configs if c.get("browser_pool")), configs[0])
+        self.browser_pool = BrowserPool.from_config(pool_config)
+        clearance_config = next((c for c in configs if _clearance_enabled(c)), None)
+        self.clearance = ClearanceManager.from_config(clearance_config, self.browser_pool) if clearance_config else None
+
+        self.engines: List[SupplierEngine] = []
+        share = max(1, self.browser_pool.capacity // len(configs))
+        for config in configs:
+            if config.get("db_path", "products.db") != db_path:
+                raise ValueError("All suppliers of a multi-supplier crawl must use the same db_path")
+            pool = PoolQuota(self.browser_pool, config.get("browser_quota", share))
+            engine = SupplierEngine(config, browser_pool=pool,
+                                    clearance=self.clearance if _clearance_enabled(config) else None)
+            engine.pipeline = QueuedPipeline(engine.pipeline, self.results)
+            if engine.validators:
+                engine.validators = QueuedValidators(engine.validators, self.results)
+            self.engines.append(engine)
+        self.elapsed: Dict[str, float] = {}
+        self.status: Dict[str, str] = {}
+
+    def stop(self):
+        for engine in self.engines:
+            engine.stop()
+
+    def run(self):
+        names = [self._name(e) for e in self.engines]
+        logger.info(f"Starting multi-supplier crawl: {', '.join(f'{n} ({e.num_workers} workers)' for n, e in zip(names, self.engines))}")
+        start = time.time()
+        runs = RunRegistry.from_config(self.engines[0].config)
+        run_ids = {id(engine): runs.start(engine.config.get("supplier"), "multi") for engine in self.engines}
+        self.writer.start()
+        threads = [threading.Thread(target=self._run_engine, args=(engine,), name=f"supplier-{self._name(engine)}")
+                   for engine in self.engines]
+        try:
+            for t in threads:
+                t.start()
+            while True:
+                alive = [t for t in threads if t.is_alive()]
+                if not alive:
+                    break
+                alive[0].join(timeout=LOG_EVERY)
+                self._log_status(start)
+        finally:
+            for t in threads:
+                t.join()
+            self.writer.close()
+            self.browser_pool.close()
+            for engine in self.engines:
+                supplier = engine.config.get("supplier")
+                runs.finish(run_ids[id(engine)], engine.run_stats,
+                            self.writer.pipeline.write_summary(slugify_supplier(supplier) if supplier else None),
+                            self.elapsed.get(self._name(engine), 0.0), self.status.get(self._name(engine), "failed"),
+                            extra={"frontier": engine.frontier.counts()})
+
+        total = time.time() - start
+        per_supplier = ", ".join(f"{n} {self.elapsed.get(n, 0):.1f}s" for n in names)
+        logger.info(f"Multi-supplier crawl done in {total:.1f}s ({per_supplier}); "
+                    f"{self.writer.stats['row']} products written")
+
+    def _run_engine(self, engine: SupplierEngine):
+        name = self._name(engine)
+        start = time.time()
+        self.status[name] = "failed"
+        try:
+            engine.run()
+            self.status[name] = "stopped" if engine.stop_event.is_set() else "finished"
+        except Exception as e:
+            logger.error(f"Crawl of {name} failed: {e}")
+        finally:
+            self.elapsed[name] = time.time() - start
+            logger.info(f"Supplier {name} finished in {self.elapsed[name]:.1f}s")
+
+    def _log_status(self, start: float):
+        elapsed = time.time() - start
+        parts = []
+        total = 0
+        for engine in self.engines:
+            count = engine.count.value
+            total += count
+            parts.append(f"{self._name(engine)} {count} (queue {engine.frontier.pending})")
+        rate = total / elapsed if elapsed > 0 else 0
+        logger.info(f"--- STATUS: {total} pages processed | Rate: {rate:.2f} p/s | Written: {self.writer.stats['row']} | "
+                    f"{' | '.join(parts)} ---")
+
+    @staticmethod
+    def _name(engine: CrawlerEngine) -> str:
+        return engine.config.get("supplier") or engine.base_url
@@ -13,6 +13,13 @@ class HTMLParser:
         data = self.extract_json_ld() or {}
         
         # Selectors override or enrich JSON-LD
+        data.update(self.parse_fields(selectors))
+        return data
+
+    def parse_fields(self, selectors: Dict[str, str], root=None) -> Dict[str, Any]:
+        """Selector fields found under `root` (default: the whole page), e.g. one product card"""
+        root = root if root is not None else self.tree
+        data = {}
         for field, selector in selectors.items():
             value = None
             attr = None
@@ -29,7 +36,7 @@ class HTMLParser:
                 parts = selector.split("::", 1)
                 sel_part = parts[0].strip()
                 attr = parts[1].strip()
-                elements = self.tree.css(sel_part)
+                elements = root.css(sel_part)
                 if elements:
                     # Apply regex if present
                     if regex_pattern:
@@ -52,18 +59,18 @@ class HTMLParser:
             else:
                 # Special handling for breadcrumb -> category_path (list)
                     if field == 'variants':
-                        elements = self.tree.css(selector)
+                        elements = root.css(selector)
                         if elements:
                             data[field] = [el.text(strip=True) for el in elements]
                             continue
                     elif field == 'breadcrumb':
-                        elements = self.tree.css(selector)
+                        elements = root.css(selector)
                         if elements:
                             value = [el.text(strip=True) for el in elements]
                             data['category_path'] = value
                             continue
                     else:
-                        element = self.tree.css_first(selector)
+                        element = root.css_first(selector)
                         
                         if element:
                             text_content = element.text(separator=' ', strip=True)
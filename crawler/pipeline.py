@@ -1,21 +1,68 @@
 import sqlite3
 import json
 from datetime import datetime, timezone
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Union
 import logging
-from crawler.models import Product
+import threading
+from collections import Counter, defaultdict
+from crawler.models import Product, SCRAPED_FIELDS, check_system_fields
+from crawler.freshness import init_schema as init_freshness_schema, record_check, to_epoch
+from crawler.history import TRACKED_FIELDS, init_schema as init_history_schema, record_change
+from crawler.tracing import span
 from crawler.utils import normalize_url, generate_legacy_hash_id, generate_content_hash
 
 logger = logging.getLogger(__name__)
 
+# catalog_ids per UPDATE ... IN (...) when bumping last_seen_at of unchanged rows
+BUMP_CHUNK = 500
+
+VALIDATION_MODES = ("fast", "model")
+
+# json.dumps(value, ensure_ascii=False) without building a JSONEncoder per call
+_to_json = json.JSONEncoder(ensure_ascii=False).encode
+
+# Columns of a prepared row: Product's fields minus legacy_hash_id (not in the DB schema)
+_ROW_FIELDS = [name for name in Product.model_fields if name != 'legacy_hash_id']
+
+# last_seen_at never moves back (replay writes archived fetch times over newer sightings)
+_KEEP_NEWER_SEEN = "last_seen_at = MAX(COALESCE(last_seen_at, ?), ?)"
+
+# What a full upsert needs of the stored row: change detection, freshness and history
+_SELECT_PREVIOUS = (f"SELECT content_hash, last_seen_at, {', '.join(TRACKED_FIELDS)} "
+                    f"FROM products WHERE catalog_id = ?")
+
+
+def _newer(stored: Any, seen_at: Any) -> Any:
+    """The later of two last_seen_at values (stored ones may be ISO strings)"""
+    before, now = to_epoch(stored), to_epoch(seen_at)
+    return stored if before is not None and (now is None or before > now) else seen_at
+
+
 class DataPipeline:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, validation: str = "fast", init_db: bool = True):
+        """init_db=False: only for prepare_row (parse processes); the DB is never opened"""
         self.db_path = db_path
-        logger.info(f"Initialized DataPipeline with DB: {self.db_path}")
-        self._init_db()
+        if validation not in VALIDATION_MODES:
+            raise ValueError(f"validation must be one of {VALIDATION_MODES}, got {validation!r}")
+        # fast: prebuilt TypeAdapter for the scraped fields, hand checks for the generated ones;
+        # model: a full Product per item (the reference path)
+        self.validation = validation
+        # (supplier_slug, inserted | changed | unchanged) -> rows, for the run registry
+        self.write_counts: Counter = Counter()
+        self._counts_lock = threading.Lock()
+        # supplier_slug -> {catalog_id: (hash((content_hash, url_clean)), last_seen_at)} of the
+        # stored rows, loaded on the supplier's first write and kept current by this pipeline
+        self._stored: Dict[str, Dict[str, Tuple[int, Any]]] = {}
+        self._stored_lock = threading.Lock()
+        if init_db:
+            logger.info(f"Initialized DataPipeline with DB: {self.db_path}")
+            self._init_db()
         
     def _init_db(self):
         conn = sqlite3.connect(self.db_path)
+        # WAL (persistent in the DB file): readers never block the writer, and a
+        # commit appends to the log instead of rewriting pages through a rollback journal
+        conn.execute("PRAGMA journal_mode=WAL")
         c = conn.cursor()
         
         # Check if table exists
@@ -66,83 +113,153 @@ class DataPipeline:
                     c.execute(f"ALTER TABLE products ADD COLUMN {col} {dtype}")
             
             # Note: Changing PRIMARY KEY requires full migration (Done in migrate_identity.py)
+
+        # Change history behind the freshness scheduler (--budget)
+        init_freshness_schema(c)
+        # Changed fields per product per crawl (crawler/history.py)
+        init_history_schema(c)
                 
         conn.commit()
         conn.close()
         
-    def process_item(self, item_data: Dict[str, Any]):
-        try:
-            # Add system fields if missing
-            now = datetime.now(timezone.utc)
-            item_data['first_seen_at'] = now
-            item_data['last_seen_at'] = now
-            
-            # 1. URL Normalization
-            raw_url = item_data.get('url', '')
-            clean_url = normalize_url(raw_url)
-            item_data['url_clean'] = clean_url
-            
-            # 2. Identity Generation
-            supplier = item_data.get('supplier', 'Unknown')
-            sku = item_data.get('sku')
-            
-            if not sku:
-                logger.error(f"SKU Missing for {clean_url}. Skipping ingestion.")
-                return
+    def connect(self) -> sqlite3.Connection:
+        """Write connection: WAL with synchronous=NORMAL fsyncs at checkpoints, not on every commit"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
 
-            from crawler.utils import clean_sku, slugify_supplier, generate_catalog_id
-            
-            item_data['sku_clean'] = clean_sku(sku)
-            item_data['supplier_slug'] = slugify_supplier(supplier)
-            item_data['catalog_id'] = generate_catalog_id(supplier, sku)
-            
-            # Legacy ID (Keep for DB backward compatibility, but system uses catalog_id)
-            item_data['product_id'] = item_data['catalog_id']
-            item_data['legacy_hash_id'] = generate_legacy_hash_id(supplier, sku, clean_url)
-            
-            # Specific cleanup for Comfort (remove HTML)
-            if supplier == 'Comfort' and item_data.get('description'):
-                try:
-                    soup = BeautifulSoup(item_data['description'], 'html.parser')
-                    # Get text with separator to avoid merging lines
-                    text = soup.get_text(separator=' ', strip=True)
-                    item_data['description'] = text
-                except Exception as e:
-                    logger.warning(f"Failed to clean description for {sku}: {e}")
-
-            # 3. Stable Content Hash (Excluding timestamps)
-            item_data['content_hash'] = generate_content_hash(item_data)
-            
-            # 4. Derive Color from Variants if available
-            # Variants often contain color names. We want to extract them into a string.
-            if item_data.get('variants'):
-                 # We expect variants to be a list of dicts like [{"name": "Red"}, {"name": "Blue"}] or strings (if parser logic changed)
-                 # Based on core.py it's normalized to [{"name": "..."}]
-                 colors = []
-                 for v in item_data['variants']:
-                     if isinstance(v, dict) and 'name' in v:
-                         name = v['name']
-                         # Filter out generic labels often found in Hebrew sites
-                         if name not in ["צבע", "בחר צבע", "בחר", "Color", "Select Color"]:
-                             colors.append(name)
-                 
-                 if colors:
-                     item_data['color'] = ", ".join(sorted(list(set(colors))))
+    def process_item(self, item_data: Dict[str, Any], seen_at: Optional[datetime] = None):
+        row = self.prepare_row(item_data, seen_at)
+        if row:
+            self.write_row(row)
 
-            
-            # Validate with Pydantic
-            product = Product(**item_data)
-            
-            self._save_to_db(product)
-            logger.info(f"Saved product: {product.title} ({product.catalog_id})")
+    def process_batch(self, items: Iterable[Union[Dict[str, Any], Tuple[Dict[str, Any], datetime]]],
+                      seen_at: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        process_item for many items with one connection and one commit;
+        returns the write outcomes. Items seen at different times (replay)
+        come as (item, seen_at) pairs.
+        """
+        rows = (self.prepare_row(*item) if isinstance(item, tuple) else self.prepare_row(item, seen_at)
+                for item in items)
+        return self.write_rows(row for row in rows if row)
+
+    def prepare_row(self, item_data: Dict[str, Any], seen_at: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """
+        Everything before the upsert (identity, content hash, validation,
+        serialization) as a DB-ready row; None if the item is rejected.
+        Needs no connection, so it can run in another process than write_row.
+        """
+        try:
+            if not self._normalize(item_data, seen_at):
+                return None
+            if self.validation == "model":
+                # Validate with Pydantic
+                with span("store.validate"):
+                    product = Product(**item_data)
+                with span("store.serialize"):
+                    return self._serialize(product)
+            with span("store.validate"):
+                check_system_fields(item_data)
+                fields = SCRAPED_FIELDS.validate_python(item_data)
+            with span("store.serialize"):
+                return self._row(item_data, fields)
             
         except Exception as e:
             logger.error(f"Validation or Storage error: {e}")
+            return None
 
-    def _save_to_db(self, product: Product):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+    def _normalize(self, item_data: Dict[str, Any], seen_at: Optional[datetime]) -> bool:
+        """Identity, content hash and derived fields, set on item_data; False if it has no SKU"""
+        # Add system fields if missing (replay passes the archived fetch time)
+        now = seen_at or datetime.now(timezone.utc)
+        item_data['first_seen_at'] = now
+        item_data['last_seen_at'] = now
+        
+        # 1. URL Normalization
+        raw_url = item_data.get('url', '')
+        clean_url = normalize_url(raw_url)
+        item_data['url_clean'] = clean_url
         
+        # 2. Identity Generation
+        supplier = item_data.get('supplier', 'Unknown')
+        sku = item_data.get('sku')
+        
+        if not sku:
+            logger.error(f"SKU Missing for {clean_url}. Skipping ingestion.")
+            return False
+
+        from crawler.utils import clean_sku, slugify_supplier, generate_catalog_id
+        
+        item_data['sku_clean'] = clean_sku(sku)
+        item_data['supplier_slug'] = slugify_supplier(supplier)
+        item_data['catalog_id'] = generate_catalog_id(supplier, sku)
+        
+        # Legacy ID (Keep for DB backward compatibility, but system uses catalog_id)
+        item_data['product_id'] = item_data['catalog_id']
+        item_data['legacy_hash_id'] = generate_legacy_hash_id(supplier, sku, clean_url)
+        
+        # Specific cleanup for Comfort (remove HTML)
+        if supplier == 'Comfort' and item_data.get('description'):
+            try:
+                soup = BeautifulSoup(item_data['description'], 'html.parser')
+                # Get text with separator to avoid merging lines
+                text = soup.get_text(separator=' ', strip=True)
+                item_data['description'] = text
+            except Exception as e:
+                logger.warning(f"Failed to clean description for {sku}: {e}")
+
+        # 3. Stable Content Hash (Excluding timestamps)
+        item_data['content_hash'] = generate_content_hash(item_data)
+        
+        # 4. Derive Color from Variants if available
+        # Variants often contain color names. We want to extract them into a string.
+        if item_data.get('variants'):
+             # We expect variants to be a list of dicts like [{"name": "Red"}, {"name": "Blue"}] or strings (if parser logic changed)
+             # Based on core.py it's normalized to [{"name": "..."}]
+             colors = []
+             for v in item_data['variants']:
+                 if isinstance(v, dict) and 'name' in v:
+                     name = v['name']
+                     # Filter out generic labels often found in Hebrew sites
+                     if name not in ["צבע", "בחר צבע", "בחר", "Color", "Select Color"]:
+                         colors.append(name)
+             
+             if colors:
+                 item_data['color'] = ", ".join(sorted(list(set(colors))))
+
+        return True
+
+    def touch_url(self, url: str):
+        """Bump last_seen_at for a page that revalidated as unchanged (no parse, no upsert)"""
+        conn = self.connect()
+        try:
+            touched = self.touch(conn, url)
+            conn.commit()
+            self.count_touched(touched)
+        except sqlite3.OperationalError as e:
+            logger.error(f"DB Error touching {url}: {e}")
+        finally:
+            conn.close()
+
+    def touch(self, conn: sqlite3.Connection, url: str) -> List[str]:
+        """touch_url inside the caller's transaction; returns the catalog_ids it touched"""
+        now = datetime.now(timezone.utc)
+        url_clean = normalize_url(url)
+        touched = []
+        # An unchanged revisit is freshness history too
+        for catalog_id, last_seen in conn.execute(
+                "SELECT catalog_id, last_seen_at FROM products WHERE url_clean = ?", (url_clean,)).fetchall():
+            record_check(conn, catalog_id, last_seen, now, changed=False)
+            touched.append(catalog_id)
+        conn.execute("UPDATE products SET last_seen_at = ? WHERE url_clean = ?", (now, url_clean))
+        self._note_seen(touched, now)
+        return touched
+
+    def _save_to_db(self, product: Product):
+        self.write_row(self._serialize(product))
+
+    def _serialize(self, product: Product) -> Dict[str, Any]:
         # Serialize complex types
         data = product.model_dump()
         data['category_path'] = json.dumps(data['category_path'], ensure_ascii=False)
@@ -157,7 +274,128 @@ class DataPipeline:
         # Remove legacy_hash_id - column doesn't exist in DB schema
         if 'legacy_hash_id' in data:
             del data['legacy_hash_id']
-        
+        return data
+
+    def _row(self, item_data: Dict[str, Any], fields: Dict[str, Any]) -> Dict[str, Any]:
+        """_serialize's row from SCRAPED_FIELDS output plus the pipeline-generated fields"""
+        data = {name: fields[name] if name in fields else item_data.get(name) for name in _ROW_FIELDS}
+        data['category_path'] = _to_json(fields.get('category_path', []))
+        data['properties'] = _to_json(fields.get('properties', {}))
+        data['images'] = _to_json(fields.get('images', []))
+        data['variants'] = _to_json(fields.get('variants', []))
+        data['raw'] = _to_json(fields.get('raw', {}))
+        return data
+
+    def _count_write(self, supplier_slug: Optional[str], outcome: str):
+        with self._counts_lock:
+            self.write_counts[(supplier_slug, outcome)] += 1
+
+    def write_summary(self, supplier_slug: Optional[str] = None) -> Dict[str, int]:
+        """Products inserted / changed / unchanged by this pipeline (one supplier, or all)"""
+        summary = {"inserted": 0, "changed": 0, "unchanged": 0}
+        with self._counts_lock:
+            for (slug, outcome), n in self.write_counts.items():
+                if supplier_slug is None or slug == supplier_slug:
+                    summary[outcome] += n
+        return summary
+
+    def write_row(self, data: Dict[str, Any]) -> Optional[str]:
+        """Upsert a row from prepare_row; returns inserted / changed / unchanged (None on a DB error)"""
+        conn = self.connect()
+        try:
+            outcome = self.upsert(conn, data)
+            self._commit(conn)
+            if outcome:
+                self.count_write(data, outcome)
+            return outcome
+        finally:
+            conn.close()
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """Upsert many rows in one transaction (bulk callers: replay, merges); returns the outcomes"""
+        written, bumps = [], []
+        conn = self.connect()
+        try:
+            for data in rows:
+                outcome = self.upsert(conn, data, bumps)
+                if outcome:
+                    written.append((data, outcome))
+            self.bump_seen(conn, bumps)
+            self._commit(conn)
+        finally:
+            conn.close()
+        summary = {"inserted": 0, "changed": 0, "unchanged": 0}
+        for data, outcome in written:
+            self.count_write(data, outcome)
+            summary[outcome] += 1
+        return summary
+
+    def _commit(self, conn: sqlite3.Connection):
+        try:
+            with span("store.commit"):
+                conn.commit()
+        except sqlite3.Error:
+            # The stored-row cache may hold rows that were rolled back
+            self.forget_stored()
+            raise
+
+    def forget_stored(self):
+        """Drop the stored-row cache (after a failed commit); it reloads on the next write"""
+        with self._stored_lock:
+            self._stored.clear()
+
+    def _stored_rows(self, conn: sqlite3.Connection, supplier_slug: Optional[str]) -> Dict[str, Tuple[int, Any]]:
+        stored = self._stored.get(supplier_slug)
+        if stored is None:
+            with self._stored_lock:
+                stored = self._stored.get(supplier_slug)
+                if stored is None:
+                    # One scan of the (supplier_slug, sku_clean) index per supplier and run
+                    stored = {catalog_id: (hash((content_hash, url_clean)), last_seen)
+                              for catalog_id, content_hash, url_clean, last_seen in conn.execute(
+                                  "SELECT catalog_id, content_hash, url_clean, last_seen_at FROM products "
+                                  "WHERE supplier_slug = ?", (supplier_slug,))}
+                    self._stored[supplier_slug] = stored
+                    logger.info(f"Loaded {len(stored)} stored content hashes for {supplier_slug}")
+        return stored
+
+    def _note_seen(self, catalog_ids: Iterable[str], seen_at: Any):
+        for catalog_id in catalog_ids:
+            stored = self._stored.get(catalog_id.split(":", 1)[0])
+            if stored and catalog_id in stored:
+                stored[catalog_id] = (stored[catalog_id][0], _newer(stored[catalog_id][1], seen_at))
+
+    def upsert(self, conn: sqlite3.Connection, data: Dict[str, Any],
+               bumps: Optional[List[Tuple[str, Any]]] = None) -> Optional[str]:
+        """
+        Upsert inside the caller's transaction (no commit, not counted until
+        the caller has committed: count_write). Returns inserted / changed /
+        unchanged, None on a DB error.
+
+        A row whose content_hash and url_clean match the stored ones is not
+        rewritten: only its last_seen_at is bumped, right away or, when the
+        caller passes `bumps`, collected there for one bump_seen() per batch.
+        """
+        catalog_id = data.get('catalog_id')
+        fingerprint = hash((data.get('content_hash'), data.get('url_clean')))
+        seen_at = data.get('last_seen_at')
+        try:
+            stored = self._stored_rows(conn, data.get('supplier_slug'))
+            known = stored.get(catalog_id)
+            if known and known[0] == fingerprint:
+                with span("store.touch"):
+                    record_check(conn, catalog_id, known[1], seen_at, changed=False)
+                    if bumps is None:
+                        conn.execute(f"UPDATE products SET {_KEEP_NEWER_SEEN} WHERE catalog_id = ?",
+                                     (seen_at, seen_at, catalog_id))
+                    else:
+                        bumps.append((catalog_id, seen_at))
+                stored[catalog_id] = (fingerprint, _newer(known[1], seen_at))
+                return "unchanged"
+        except sqlite3.OperationalError as e:
+            logger.error(f"DB Error (Schema Mismatch?): {e}")
+            return None
+
         # Upsert using catalog_id
         keys = list(data.keys())
         placeholders = ",".join(["?"] * len(keys))
@@ -169,7 +407,7 @@ class DataPipeline:
         
         query = f"""INSERT INTO products ({columns}) VALUES ({placeholders})
                     ON CONFLICT(catalog_id) DO UPDATE SET
-                    last_seen_at=excluded.last_seen_at,
+                    last_seen_at=MAX(COALESCE(products.last_seen_at, excluded.last_seen_at), excluded.last_seen_at),
                     content_hash=excluded.content_hash,
                     price=excluded.price,
                     availability=excluded.availability,
@@ -185,13 +423,49 @@ class DataPipeline:
                     """
         
         try:
-            c.execute(query, list(data.values()))
-            conn.commit()
+            with span("store.upsert"):
+                c = conn.cursor()
+                c.row_factory = sqlite3.Row
+                previous = c.execute(_SELECT_PREVIOUS, (catalog_id,)).fetchone()
+                c.execute(query, list(data.values()))
+                changed = bool(previous) and previous['content_hash'] != data.get('content_hash')
+                record_check(conn, catalog_id, previous['last_seen_at'] if previous else None, seen_at, changed=changed)
+                record_change(conn, catalog_id, previous, data, seen_at)
+            stored[catalog_id] = (fingerprint, _newer(previous['last_seen_at'], seen_at) if previous else seen_at)
+            logger.info(f"Saved product: {data.get('title')} ({catalog_id})")
+            if not previous:
+                return "inserted"
+            # Same content at a new URL was still rewritten (freshness only counts content changes)
+            return "changed" if changed or previous['url_clean'] != data.get('url_clean') else "unchanged"
         except sqlite3.OperationalError as e:
             logger.error(f"DB Error (Schema Mismatch?): {e}")
             # Fallback for during-migration state or if conflict target missing
-        finally:
-            conn.close()
+            return None
+
+    def bump_seen(self, conn: sqlite3.Connection, bumps: List[Tuple[str, Any]]):
+        """
+        last_seen_at of the unchanged rows upsert() collected, inside the
+        caller's transaction: one UPDATE ... WHERE catalog_id IN (...) per
+        distinct seen_at, so every row gets its own sighting time.
+        """
+        by_seen = defaultdict(list)
+        for catalog_id, seen_at in bumps:
+            by_seen[seen_at].append(catalog_id)
+        for seen_at, catalog_ids in by_seen.items():
+            for i in range(0, len(catalog_ids), BUMP_CHUNK):
+                chunk = catalog_ids[i:i + BUMP_CHUNK]
+                conn.execute(f"UPDATE products SET {_KEEP_NEWER_SEEN} WHERE catalog_id IN ({','.join('?' * len(chunk))})",
+                             [seen_at, seen_at, *chunk])
+            self._note_seen(catalog_ids, seen_at)
+
+    def count_write(self, data: Dict[str, Any], outcome: str):
+        """Count a committed upsert (write_summary)"""
+        self._count_write(data.get('supplier_slug'), outcome)
+
+    def count_touched(self, catalog_ids: Iterable[str]):
+        """Count committed touches: unchanged revisits"""
+        for catalog_id in catalog_ids:
+            self._count_write(catalog_id.split(":", 1)[0], "unchanged")
         
     def run_migration(self):
         """
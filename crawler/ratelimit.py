@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Fetch outcomes understood by AdaptiveRateLimiter.record()
+OK = "ok"
+THROTTLED = "throttled"    # HTTP 429
+CHALLENGE = "challenge"    # anti-bot / block page
+TIMEOUT = "timeout"        # network error or timeout
+ERROR = "error"            # other failed fetch
+
+
+class _Bucket:
+    def __init__(self, rate: float, tokens: float, now: float):
+        self.rate = rate
+        self.tokens = tokens
+        self.updated = now
+
+
+class AdaptiveRateLimiter:
+    """
+    Shared per-domain token bucket with AIMD rate control.
+    Every request takes a token from its domain's bucket (refilled at `rate`
+    requests/second, up to `burst`). Healthy responses raise the rate
+    additively by `increase`; 429s, challenge pages and timeouts cut it by
+    the factor `decrease`, and 429/challenge also put the domain in debt for
+    `penalty` seconds so all workers pause together.
+    """
+
+    def __init__(self, initial_rps: float = 1.0, min_rps: float = 0.1, max_rps: float = 10.0,
+                 increase: float = 0.1, decrease: float = 0.5, burst: float = 2.0,
+                 penalty: float = 10.0, clock: Callable[[], float] = time.monotonic):
+        self.initial_rps = initial_rps
+        self.min_rps = min_rps
+        self.max_rps = max_rps
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = max(1.0, burst)
+        self.penalty = penalty
+        self._clock = clock
+        self._buckets: Dict[str, _Bucket] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "AdaptiveRateLimiter":
+        """Build from the optional `rate_limit` section of a supplier config"""
+        opts = config.get("rate_limit") or {}
+        return cls(
+            initial_rps=opts.get("initial_rps", 1.0),
+            min_rps=opts.get("min_rps", 0.1),
+            max_rps=opts.get("max_rps", 10.0),
+            increase=opts.get("increase", 0.1),
+            decrease=opts.get("decrease", 0.5),
+            burst=opts.get("burst", 2.0),
+            penalty=opts.get("penalty", 10.0),
+        )
+
+    @staticmethod
+    def _domain(url: str) -> str:
+        return (urlparse(url).hostname or "").lower()
+
+    def _bucket(self, domain: str, now: float) -> _Bucket:
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            bucket = self._buckets[domain] = _Bucket(self.initial_rps, self.burst, now)
+        else:
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * bucket.rate)
+            bucket.updated = now
+        return bucket
+
+    def reserve(self, url: str) -> float:
+        """Take a token for the URL's domain; returns seconds to wait before sending"""
+        with self._lock:
+            now = self._clock()
+            bucket = self._bucket(self._domain(url), now)
+            bucket.tokens -= 1
+            if bucket.tokens >= 0:
+                return 0.0
+            return -bucket.tokens / bucket.rate
+
+    def acquire(self, url: str) -> float:
+        """Block the calling thread until the domain allows another request"""
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, url: str) -> float:
+        wait = self.reserve(url)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def record(self, url: str, outcome: str):
+        """Feed back a fetch outcome: additive increase on OK, multiplicative decrease otherwise"""
+        domain = self._domain(url)
+        with self._lock:
+            now = self._clock()
+            bucket = self._bucket(domain, now)
+            old_rate = bucket.rate
+            if outcome == OK:
+                bucket.rate = min(self.max_rps, bucket.rate + self.increase)
+                return
+
+            bucket.rate = max(self.min_rps, bucket.rate * self.decrease)
+            if outcome in (THROTTLED, CHALLENGE):
+                # Everyone waits out the penalty, not just the worker that got hit
+                bucket.tokens = min(bucket.tokens, -self.penalty * bucket.rate)
+        logger.info(f"Rate limit {domain}: {outcome} -> {old_rate:.2f} to {bucket.rate:.2f} req/s")
+
+    def rate(self, url: str) -> Optional[float]:
+        bucket = self._buckets.get(self._domain(url))
+        return bucket.rate if bucket else None
+
+    def rates(self) -> Dict[str, float]:
+        """Current requests/second per domain (for status lines and monitoring)"""
+        with self._lock:
+            return {domain: round(b.rate, 2) for domain, b in self._buckets.items()}
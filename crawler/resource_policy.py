@@ -0,0 +1,155 @@
+import logging
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_TYPES = ("image", "font", "media")
+DEFAULT_BLOCK_PATTERNS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "facebook.net",
+    "hotjar.com",
+)
+# Never block the anti-bot challenge, or the page will never clear
+DEFAULT_ALLOW_PATTERNS = ("sgcaptcha", "captcha", "challenge")
+
+
+class _PageState:
+    """Per-page navigation bookkeeping used by the route handler"""
+
+    def __init__(self):
+        self.nav_start: Optional[float] = None
+        self.control = False
+
+
+class ResourcePolicy:
+    """
+    Per-supplier request interception for browser pages.
+    Blocks sub-resources by Playwright resource type and URL substring, with
+    an allow-list that always wins (challenge scripts). Every `sample_every`-th
+    navigation runs unblocked as a control sample; those measure what the
+    blocked requests would have cost so the run report can state bytes and
+    navigation time saved instead of guessing.
+    """
+
+    def __init__(self, block_types: Iterable[str] = DEFAULT_BLOCK_TYPES,
+                 block_patterns: Iterable[str] = DEFAULT_BLOCK_PATTERNS,
+                 allow_patterns: Iterable[str] = DEFAULT_ALLOW_PATTERNS,
+                 sample_every: int = 25):
+        self.block_types = set(block_types)
+        self.block_patterns = tuple(block_patterns)
+        self.allow_patterns = tuple(allow_patterns)
+        self.sample_every = sample_every
+
+        # Navigations started (the control sample pick); the two below only count those that loaded
+        self.started = 0
+        self.navigations = 0
+        self.control_navigations = 0
+        self.nav_time = 0.0
+        self.control_nav_time = 0.0
+        self.blocked: Counter = Counter()          # resource type -> requests blocked
+        self.control_seen: Counter = Counter()     # resource type -> would-be-blocked requests in control navs
+        self.control_bytes: Counter = Counter()    # resource type -> their body bytes
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional["ResourcePolicy"]:
+        """Build from the `resource_policy` config section; None if absent or disabled"""
+        opts = config.get("resource_policy")
+        if not opts or opts.get("enabled") is False:
+            return None
+        return cls(
+            block_types=opts.get("block_types", DEFAULT_BLOCK_TYPES),
+            block_patterns=opts.get("block_patterns", DEFAULT_BLOCK_PATTERNS),
+            allow_patterns=opts.get("allow_patterns", DEFAULT_ALLOW_PATTERNS),
+            sample_every=opts.get("sample_every", 25),
+        )
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if resource_type == "document":
+            return False
+        if any(p in url for p in self.allow_patterns):
+            return False
+        if resource_type in self.block_types:
+            return True
+        return any(p in url for p in self.block_patterns)
+
+    async def install(self, page):
+        """Route every request of an (async) Playwright page through the policy"""
+        state = _PageState()
+
+        async def handle(route):
+            request = route.request
+            rtype = request.resource_type
+            try:
+                if rtype == "document" and request.frame == page.main_frame:
+                    self._begin_navigation(state)
+
+                if not self.should_block(rtype, request.url):
+                    await route.continue_()
+                elif state.control:
+                    # Control sample: let it through but measure what blocking saves
+                    response = await route.fetch()
+                    body = await response.body()
+                    self.control_seen[rtype] += 1
+                    self.control_bytes[rtype] += len(body)
+                    await route.fulfill(response=response, body=body)
+                else:
+                    self.blocked[rtype] += 1
+                    await route.abort()
+            except Exception as e:
+                logger.debug(f"Route handling failed for {request.url}: {e}")
+                # An unresolved route hangs the request (often the document) until the goto timeout
+                try:
+                    if self.should_block(rtype, request.url) and not state.control:
+                        await route.abort()
+                    else:
+                        await route.continue_()
+                except Exception:
+                    pass  # already handled before the failure
+
+        def on_load(*_):
+            if state.nav_start is None:
+                return
+            elapsed = time.monotonic() - state.nav_start
+            state.nav_start = None
+            if state.control:
+                self.control_navigations += 1
+                self.control_nav_time += elapsed
+            else:
+                self.navigations += 1
+                self.nav_time += elapsed
+
+        await page.route("**/*", handle)
+        page.on("load", on_load)
+
+    def _begin_navigation(self, state: _PageState):
+        # No await in here: concurrent pages on the loop each get their own slot in the count
+        state.control = bool(self.sample_every) and self.started % self.sample_every == 0
+        self.started += 1
+        state.nav_start = time.monotonic()
+
+    def report(self) -> Dict[str, Any]:
+        """Per-run savings; estimates come from the unblocked control samples"""
+        bytes_saved = 0
+        for rtype, n in self.blocked.items():
+            if self.control_seen[rtype]:
+                bytes_saved += n * self.control_bytes[rtype] / self.control_seen[rtype]
+
+        avg_nav = self.nav_time / self.navigations if self.navigations else None
+        avg_control = self.control_nav_time / self.control_navigations if self.control_navigations else None
+        time_saved = None
+        if avg_nav is not None and avg_control is not None:
+            time_saved = max(0.0, avg_control - avg_nav) * self.navigations
+
+        return {
+            "navigations": self.navigations,
+            "control_navigations": self.control_navigations,
+            "blocked_requests": dict(self.blocked),
+            "avg_nav_s": round(avg_nav, 3) if avg_nav is not None else None,
+            "avg_control_nav_s": round(avg_control, 3) if avg_control is not None else None,
+            "est_bytes_saved": int(bytes_saved),
+            "est_nav_time_saved_s": round(time_saved, 1) if time_saved is not None else None,
+        }
@@ -0,0 +1,87 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from crawler.utils import normalize_url
+
+logger = logging.getLogger(__name__)
+
+
+def body_hash(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8", "replace")).hexdigest()
+
+
+def conditional_headers(validators: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """If-None-Match / If-Modified-Since for previously stored validators"""
+    headers = {}
+    if validators and validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators and validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+class ValidatorStore:
+    """
+    HTTP validators from the last processed fetch of each page, keyed by
+    normalize_url(url): ETag, Last-Modified and a hash of the body.
+    Recrawls send them as a conditional GET and skip parsing/storing pages
+    that come back 304 or byte-identical.
+    Lives in the products DB (table http_validators); safe to share across threads.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS http_validators
+                              (url_clean TEXT PRIMARY KEY,
+                               etag TEXT,
+                               last_modified TEXT,
+                               body_hash TEXT,
+                               checked_at TIMESTAMP)''')
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional["ValidatorStore"]:
+        """Enabled by `revalidate: true` (main.py --recrawl sets it); None otherwise"""
+        if not config.get("revalidate"):
+            return None
+        return cls(config.get("db_path", "products.db"))
+
+    def get(self, url: str) -> Optional[Dict[str, str]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, body_hash FROM http_validators WHERE url_clean = ?",
+                (normalize_url(url),)).fetchone()
+        if not row:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "body_hash": row[2]}
+
+    def remember(self, result):
+        """
+        Store the validators of a FetchResult. Call only after the page was
+        parsed and saved, so a failed write is retried in full next time.
+        """
+        self.remember_many([result])
+
+    def remember_many(self, results):
+        """remember() for several results, one commit"""
+        now = datetime.now(timezone.utc).isoformat()
+        rows = [(normalize_url(r.url), r.etag, r.last_modified, r.body_hash, now) for r in results if r.body_hash]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                """INSERT INTO http_validators (url_clean, etag, last_modified, body_hash, checked_at)
+                   VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT(url_clean) DO UPDATE SET
+                   etag=excluded.etag, last_modified=excluded.last_modified,
+                   body_hash=excluded.body_hash, checked_at=excluded.checked_at""", rows)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
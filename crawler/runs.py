@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from crawler.stats import LatencyHistogram
+from crawler.utils import slugify_supplier
+
+logger = logging.getLogger(__name__)
+
+# Page outcomes counted per run
+OUTCOMES = ("ok", "unchanged", "failed")
+
+
+class RunStats:
+    """
+    One crawl's counters, filled in by every worker: pages by outcome,
+    bytes fetched, fetch tiers and a latency histogram per phase.
+    Snapshots are plain dicts, so shard processes can send theirs home.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages: Counter = Counter()
+        self.tiers: Counter = Counter()
+        self.bytes = 0
+        self.phases: Dict[str, LatencyHistogram] = {}
+
+    def page(self, outcome: str, tier: Optional[str] = None, nbytes: int = 0):
+        with self._lock:
+            self.pages[outcome] += 1
+            if tier:
+                self.tiers[tier] += 1
+            self.bytes += nbytes
+
+    def time(self, phase: str, seconds: float):
+        hist = self.phases.get(phase)
+        if hist is None:
+            with self._lock:
+                hist = self.phases.setdefault(phase, LatencyHistogram())
+        hist.add(seconds)
+
+    def latency(self) -> Dict[str, Dict[str, float]]:
+        return {phase: hist.summary() for phase, hist in sorted(self.phases.items())}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = dict(self.phases)
+            snap = {"pages": dict(self.pages), "tiers": dict(self.tiers), "bytes": self.bytes}
+        snap["phases"] = {phase: hist.snapshot() for phase, hist in phases.items()}
+        return snap
+
+    def merge(self, snapshot: Dict[str, Any]):
+        with self._lock:
+            self.pages.update(snapshot["pages"])
+            self.tiers.update(snapshot["tiers"])
+            self.bytes += snapshot["bytes"]
+            for phase in snapshot["phases"]:
+                self.phases.setdefault(phase, LatencyHistogram())
+        for phase, hist in snapshot["phases"].items():
+            self.phases[phase].merge(hist)
+
+
+class RunRegistry:
+    """
+    `crawl_runs` table in the products DB: one row per crawl run (supplier,
+    mode, start/end, pages by outcome, bytes, products inserted / changed /
+    unchanged), with the full report (fetch tiers, per-phase p50/p95/p99)
+    as JSON in the row and in <report_dir>/<supplier>-<id>.json.
+    A row is created when the run starts (status "running"), so crashed
+    runs stay visible.
+    """
+
+    def __init__(self, db_path: str, report_dir: Optional[str] = None):
+        self.db_path = db_path
+        self.report_dir = report_dir
+        conn = self._connect()
+        try:
+            conn.execute('''CREATE TABLE IF NOT EXISTS crawl_runs
+                            (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                             supplier TEXT,
+                             mode TEXT,
+                             status TEXT,
+                             started_at TEXT,
+                             ended_at TEXT,
+                             duration REAL,
+                             pages_ok INTEGER,
+                             pages_unchanged INTEGER,
+                             pages_failed INTEGER,
+                             bytes INTEGER,
+                             pages_per_sec REAL,
+                             products_inserted INTEGER,
+                             products_changed INTEGER,
+                             products_unchanged INTEGER,
+                             report TEXT)''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_crawl_runs_supplier ON crawl_runs(supplier, started_at)")
+            conn.commit()
+        finally:
+            conn.close()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RunRegistry":
+        """`runs: {report_dir: ...}`; reports default to runs/ next to the products DB"""
+        db_path = config.get("db_path", "products.db")
+        opts = config.get("runs") or {}
+        report_dir = opts.get("report_dir", os.path.join(os.path.dirname(os.path.abspath(db_path)), "runs"))
+        return cls(db_path, report_dir=report_dir or None)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def start(self, supplier: Optional[str], mode: str) -> int:
+        conn = self._connect()
+        try:
+            cur = conn.execute("INSERT INTO crawl_runs (supplier, mode, status, started_at) VALUES (?, ?, ?, ?)",
+                               (supplier, mode, "running", datetime.now(timezone.utc).isoformat()))
+            conn.commit()
+            return cur.lastrowid
+        finally:
+            conn.close()
+
+    def finish(self, run_id: int, stats: RunStats, products: Dict[str, int], duration: float,
+               status: str = "finished", extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Write the run's totals and report; returns the report"""
+        pages = {outcome: stats.pages.get(outcome, 0) for outcome in OUTCOMES}
+        processed = sum(pages.values())
+        report = {
+            "run_id": run_id,
+            "status": status,
+            "duration": round(duration, 2),
+            "pages": pages,
+            "pages_per_sec": round(processed / duration, 2) if duration > 0 else 0.0,
+            "bytes": stats.bytes,
+            "tiers": dict(stats.tiers),
+            "latency": stats.latency(),
+            "products": products,
+            **(extra or {}),
+        }
+        conn = self._connect()
+        try:
+            conn.execute('''UPDATE crawl_runs SET status = ?, ended_at = ?, duration = ?, pages_ok = ?,
+                            pages_unchanged = ?, pages_failed = ?, bytes = ?, pages_per_sec = ?,
+                            products_inserted = ?, products_changed = ?, products_unchanged = ?, report = ?
+                            WHERE id = ?''',
+                         (status, datetime.now(timezone.utc).isoformat(), duration, pages["ok"], pages["unchanged"],
+                          pages["failed"], stats.bytes, report["pages_per_sec"], products.get("inserted", 0),
+                          products.get("changed", 0), products.get("unchanged", 0), json.dumps(report), run_id))
+            row = conn.execute("SELECT supplier, mode, started_at, ended_at FROM crawl_runs WHERE id = ?",
+                               (run_id,)).fetchone()
+            conn.commit()
+        finally:
+            conn.close()
+        report = {"supplier": row[0], "mode": row[1], "started_at": row[2], "ended_at": row[3], **report}
+        if self.report_dir:
+            try:
+                os.makedirs(self.report_dir, exist_ok=True)
+                path = os.path.join(self.report_dir, f"{slugify_supplier(row[0] or 'all')}-{run_id}.json")
+                with open(path, "w") as f:
+                    json.dump(report, f, indent=2)
+            except OSError as e:
+                logger.error(f"Could not write run report: {e}")
+        logger.info(f"Run {run_id} ({status}): {processed} pages in {duration:.1f}s, products {products}, "
+                    f"latency p50/p95 {self._brief(report['latency'])}")
+        return report
+
+    @staticmethod
+    def _brief(latency: Dict[str, Dict[str, float]]) -> str:
+        # Top-level phases only; sub-phases ("fetch.goto") are in the report
+        return " ".join(f"{phase}={s.get('p50_ms', 0):.0f}/{s.get('p95_ms', 0):.0f}ms"
+                        for phase, s in latency.items() if s.get("count") and "." not in phase)
+
+
+def list_runs(db_path: str, supplier: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='crawl_runs'").fetchone():
+            return []
+        query = "SELECT * FROM crawl_runs"
+        params: list = []
+        if supplier:
+            query += " WHERE supplier = ?"
+            params.append(supplier)
+        rows = conn.execute(query + " ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+        return [{k: row[k] for k in row.keys() if k != "report"} for row in rows]
+    finally:
+        conn.close()
+
+
+def get_run(db_path: str, run_id: int) -> Optional[Dict[str, Any]]:
+    """One run with its full report"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='crawl_runs'").fetchone():
+            return None
+        row = conn.execute("SELECT * FROM crawl_runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        run = dict(row)
+        run["report"] = json.loads(run["report"]) if run["report"] else None
+        return run
+    finally:
+        conn.close()
@@ -0,0 +1,307 @@
+import copy
+import hashlib
+import logging
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from crawler.browser_pool import BrowserPool
+from crawler.core import CrawlerEngine
+from crawler.frontier import Frontier
+from crawler.runs import RunRegistry, RunStats
+from crawler.stats import AtomicCounter
+from crawler.writer import DBWriter, QueuedPipeline, QueuedValidators
+
+logger = logging.getLogger(__name__)
+
+STATUS_EVERY = 0.25  # seconds between shard reports
+LOG_EVERY = 5.0      # seconds between aggregated status lines
+
+
+def shard_of(key: str, count: int) -> int:
+    """Stable shard for a frontier dedup key (same in every process and run)"""
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") % count
+
+
+def shard_frontier_path(config: Dict[str, Any], index: int, count: int) -> str:
+    """<frontier path>.shard<i>of<n>.frontier.db (a different --processes N starts a new frontier)"""
+    path = Frontier.path_for(config)
+    stem = path[:-len(".frontier.db")] if path.endswith(".frontier.db") else path
+    return f"{stem}.shard{index}of{count}.frontier.db"
+
+
+class ShardEngine(CrawlerEngine):
+    """
+    CrawlerEngine for one shard process. It owns the URLs whose dedup key
+    hashes to `index`; links owned by another shard go to that shard's inbox.
+    """
+
+    def __init__(self, config: Dict[str, Any], index: int, count: int, inboxes: list, results, all_done):
+        super().__init__(config)
+        self.index = index
+        self.shard_count = count
+        self.inboxes = inboxes
+        self.all_done = all_done
+        self.pipeline = QueuedPipeline(self.pipeline, results)
+        if self.validators:
+            self.validators = QueuedValidators(self.validators, results)
+        self.count = AtomicCounter()
+        # Inbox batches sent / added; balanced totals + idle shards = crawl finished
+        self.sent = AtomicCounter()
+        self.received = AtomicCounter()
+        self.ready = False
+        self.finished = False
+        # The parent records one run for all shards
+        self.record_run = False
+
+    def _owner(self, url: str) -> int:
+        key = self.frontier.canonicalize(url)[1] if self.frontier.canonicalize else url
+        return shard_of(key, self.shard_count)
+
+    def _add_links(self, entries: list) -> int:
+        local, remote = [], {}
+        for entry in entries:
+            owner = self._owner(entry[0])
+            if owner == self.index:
+                local.append(entry)
+            else:
+                remote.setdefault(owner, []).append(entry)
+        for owner, batch in remote.items():
+            self.sent.incr()
+            self.inboxes[owner].put(batch)
+        # Only this shard's links count towards yield / bonus
+        return self.frontier.add_entries(local) if local else 0
+
+    def seed_queue(self, urls: list[str], priority: Optional[float] = None):
+        """Every shard gets the full seed list and keeps its own share"""
+        super().seed_queue([url for url in urls if self._owner(url.split("#")[0]) == self.index], priority)
+
+    def _drained(self) -> bool:
+        # Another shard may still send links; only the parent knows when all are idle
+        return self.all_done.is_set()
+
+    def _log_status(self, count: int, start_time: float):
+        pass  # the parent logs one line for all shards
+
+    def idle(self) -> bool:
+        if not self.ready:
+            return False
+        return self.finished or (self.frontier.pending == 0 and self.frontier.in_flight == 0)
+
+    def receive(self, inbox):
+        """Inbox thread: admit links other shards found for this one"""
+        while not self.all_done.is_set():
+            try:
+                batch = inbox.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            self.frontier.add_entries(batch)
+            self.received.incr()
+
+    def report(self, status, stop):
+        """Reporter thread: state for the parent's status line and termination check"""
+        seq = 0
+        while not self.all_done.is_set():
+            if stop.is_set():
+                self.stop()
+            seq += 1
+            # Counters before idle: a batch counted here is already in the frontier
+            sent, received = self.sent.value, self.received.value
+            counts = self.frontier.counts()
+            status.put({"shard": self.index, "seq": seq, "idle": self.idle(), "sent": sent,
+                        "received": received, "processed": self.count.value, **counts})
+            time.sleep(STATUS_EVERY)
+
+
+def _shard_main(config: Dict[str, Any], index: int, count: int, seeds, inboxes: list,
+                results, status, stop, all_done):
+    # Ctrl-C and SIGTERM are handled by the parent, which tells shards to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    engine = ShardEngine(config, index, count, inboxes, results, all_done)
+    # Reset/recover before any inbox batch is admitted
+    engine._open_frontier()
+    threads = [threading.Thread(target=engine.receive, args=(inboxes[index],), daemon=True),
+               threading.Thread(target=engine.report, args=(status, stop), daemon=True)]
+    for t in threads:
+        t.start()
+    try:
+        if seeds == "db":
+            engine.seed_from_db()
+        elif isinstance(seeds, tuple) and seeds[0] == "stale":
+            engine.seed_stale(seeds[1], now=seeds[2])
+        elif seeds:
+            engine.seed_queue(seeds)
+        engine.ready = True
+        engine.run()
+    finally:
+        engine.ready = engine.finished = True
+        # Keep admitting links from other shards until all are done, so a
+        # stopped crawl keeps every link for --resume
+        all_done.wait()
+        for t in threads:
+            t.join()
+        status.put({"shard": index, "run": engine.run_stats.snapshot()})
+        engine.frontier.close()
+
+
+class ShardedCrawl:
+    """
+    main.py --processes N: N shard processes, each a CrawlerEngine with its
+    own fetchers, browser pool and slice of the frontier (dedup key hash % N,
+    so each product URL/SKU always lands in the same shard). Parsing and
+    validation run in the shards; this process only writes the products DB
+    (one writer thread) and prints one status line for all shards.
+    Resume with the same N: each shard keeps its own frontier file.
+    """
+
+    def __init__(self, config: Dict[str, Any], processes: int):
+        self.config = config
+        self.processes = processes
+        self.seeds = None
+        self._ctx = multiprocessing.get_context("spawn")
+        self.stop_event = self._ctx.Event()
+        # Only used here for sitemap discovery (main.py); shards have their own
+        self.browser_pool = BrowserPool.from_config(config)
+        self.writer: Optional[DBWriter] = None
+        self.run_stats = RunStats()
+        self._runs_received = 0
+
+    def seed_queue(self, urls: List[str], priority: Optional[float] = None):
+        self.seeds = list(urls)
+
+    def seed_from_db(self):
+        self.seeds = "db"
+
+    def seed_stale(self, budget: int):
+        # Same ranking time in every shard, so their shares add up to exactly `budget`
+        self.seeds = ("stale", budget, time.time())
+
+    def stop(self):
+        if not self.stop_event.is_set():
+            logger.info("Stop requested: shards finish in-flight pages, frontiers kept for --resume")
+        self.stop_event.set()
+
+    def run(self):
+        n = self.processes
+        logger.info(f"Starting sharded crawl: {n} processes x {self.config.get('num_workers', 3)} workers at {self.config.get('base_url')}")
+        ctx = self._ctx
+        results, status = ctx.Queue(), ctx.Queue()
+        inboxes = [ctx.Queue() for _ in range(n)]
+        all_done = ctx.Event()
+
+        self.writer = DBWriter.from_config(self.config, results, revalidate=bool(self.config.get("revalidate")),
+                                           stats=self.run_stats)
+        self.writer.start()
+
+        procs = []
+        for i in range(n):
+            config = copy.deepcopy(self.config)
+            config["frontier"] = dict(config.get("frontier") or {}, path=shard_frontier_path(self.config, i, n))
+            p = ctx.Process(target=_shard_main, name=f"shard-{i}",
+                            args=(config, i, n, self.seeds, inboxes, results, status, self.stop_event, all_done))
+            p.start()
+            procs.append(p)
+
+        start = time.time()
+        runs = RunRegistry.from_config(self.config)
+        run_id = runs.start(self.config.get("supplier"), f"sharded x{n}")
+        run_status = "failed"
+        reports: Dict[int, Dict[str, Any]] = {}
+        try:
+            try:
+                reports = self._coordinate(procs, status, all_done, start, reports)
+            except KeyboardInterrupt:
+                self.stop()
+                reports = self._coordinate(procs, status, all_done, start, reports)
+            run_status = "stopped" if self.stop_event.is_set() else "finished"
+        finally:
+            self._join(procs, status, reports)
+            self.writer.close()
+            self.browser_pool.close()
+            if self._runs_received < n:
+                run_status = "failed"
+            totals = self._totals(reports)
+            runs.finish(run_id, self.run_stats, self.writer.pipeline.write_summary(), time.time() - start, run_status,
+                        extra={"shards": n, "frontier": {k: totals[k] for k in ("pending", "done", "failed")}})
+
+        totals = self._totals(reports)
+        logger.info(f"Sharded crawl done in {time.time() - start:.1f}s: {totals['processed']} pages, "
+                    f"{self.writer.stats['row']} products written, frontier {dict((k, totals[k]) for k in ('pending', 'done', 'failed'))}")
+
+    def _take(self, msg: Dict[str, Any], reports: Dict[int, Dict[str, Any]]):
+        if "run" in msg:
+            # A shard's final stats, sent once it is done
+            self.run_stats.merge(msg["run"])
+            self._runs_received += 1
+        else:
+            reports[msg["shard"]] = msg
+
+    def _join(self, procs, status, reports: Dict[int, Dict[str, Any]]):
+        """Wait for the shards, reading their final stats meanwhile (a full queue would block their exit)"""
+        while any(p.is_alive() for p in procs) or not status.empty():
+            try:
+                self._take(status.get(timeout=STATUS_EVERY), reports)
+            except queue.Empty:
+                pass
+        for p in procs:
+            p.join()
+
+    def _coordinate(self, procs, status, all_done, start: float,
+                    reports: Dict[int, Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """
+        Collect shard reports until the crawl is finished: every shard idle
+        and as many inbox batches received as sent, in two consecutive full
+        rounds of reports with unchanged totals (nothing was in transit).
+        """
+        n = len(procs)
+        candidate = None
+        last_log = time.time()
+        while not all_done.is_set():
+            try:
+                self._take(status.get(timeout=STATUS_EVERY), reports)
+                while True:
+                    self._take(status.get_nowait(), reports)
+            except queue.Empty:
+                pass
+
+            dead = [p for p in procs if not p.is_alive()]
+            if dead:
+                # Shards only exit after all_done, so this one crashed
+                logger.error(f"Shard process(es) exited early: {[(p.name, p.exitcode) for p in dead]}; stopping")
+                self.stop_event.set()
+                all_done.set()
+                break
+
+            if len(reports) == n and all(r["idle"] for r in reports.values()):
+                totals = self._totals(reports)
+                seqs = {i: r["seq"] for i, r in reports.items()}
+                if totals["sent"] != totals["received"]:
+                    candidate = None
+                elif candidate is None or candidate[1] != totals["sent"]:
+                    candidate = (seqs, totals["sent"])
+                elif all(seqs[i] > candidate[0][i] for i in seqs):
+                    all_done.set()
+            else:
+                candidate = None
+
+            if time.time() - last_log >= LOG_EVERY:
+                self._log_status(reports, start)
+                last_log = time.time()
+        return reports
+
+    @staticmethod
+    def _totals(reports: Dict[int, Dict[str, Any]]) -> Dict[str, int]:
+        keys = ("processed", "pending", "in_flight", "done", "failed", "sent", "received")
+        return {k: sum(r.get(k, 0) for r in reports.values()) for k in keys}
+
+    def _log_status(self, reports: Dict[int, Dict[str, Any]], start: float):
+        totals = self._totals(reports)
+        elapsed = time.time() - start
+        rate = totals["processed"] / elapsed if elapsed > 0 else 0
+        per_shard = "/".join(str(reports[i]["processed"]) if i in reports else "-" for i in range(self.processes))
+        logger.info(f"--- STATUS: {totals['processed']} pages processed | Queue: {totals['pending']} | "
+                    f"In-flight: {totals['in_flight']} | Rate: {rate:.2f} p/s | Written: {self.writer.stats['row']} | "
+                    f"Shards: {per_shard} ---")
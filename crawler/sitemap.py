@@ -1,17 +1,20 @@
 import requests
 import xml.etree.ElementTree as ET
-from typing import List, Set
+from typing import List, Set, Optional
 import logging
 import re
 import time
+from crawler.browser_pool import BrowserPool
 
 logger = logging.getLogger(__name__)
 
 class SitemapCrawler:
     """Fast crawler that uses sitemap.xml to get direct product URLs"""
     
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, pool: Optional[BrowserPool] = None):
         self.base_url = base_url.rstrip('/')
+        # Browser fallback leases from this pool (a private one is created if None)
+        self.pool = pool
         
     def get_product_urls(self) -> List[str]:
         """Fetch all product URLs from sitemap with fallback to browser for captchas"""
@@ -35,22 +38,17 @@ class SitemapCrawler:
 
         # Step 2: Fallback to browser
         if not content or ("sgcaptcha" in content and len(content) < 5000) or ("Robot Challenge" in content):
-            from playwright.sync_api import sync_playwright
+            pool = self.pool or BrowserPool(pages_per_browser=1)
             try:
-                with sync_playwright() as p:
-                    browser = p.chromium.launch(headless=True)
-                    page = browser.new_page()
-                    # Apply stealth for sitemap too
-                    try:
-                        from playwright_stealth import stealth
-                        stealth(page)
-                    except: pass
-                    
+                # Pool pages come with stealth applied
+                with pool.lease() as page:
                     logger.info(f"Fetching sitemap via browser: {index_url}")
                     content = self._fetch_with_page(page, index_url)
-                    browser.close()
             except Exception as e:
                 logger.error(f"Sitemap browser fetch failed: {e}")
+            finally:
+                if pool is not self.pool:
+                    pool.close()
 
         if not content: return []
 
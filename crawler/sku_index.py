@@ -0,0 +1,190 @@
+import bisect
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import sys
+import threading
+from array import array
+from typing import Any, Dict, Iterable, Optional
+from crawler.utils import clean_sku, slugify_supplier
+
+logger = logging.getLogger(__name__)
+
+SORTED = "sorted"
+BLOOM = "bloom"
+
+
+def fingerprint(sku: str) -> int:
+    """64-bit fingerprint of the cleaned SKU (same normalization as products.sku_clean)"""
+    return int.from_bytes(hashlib.blake2b(clean_sku(sku).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class _Bloom:
+    def __init__(self, capacity: int, fp_rate: float):
+        capacity = max(1, capacity)
+        self.num_bits = max(64, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, fp: int):
+        # Double hashing over the two halves of the 64-bit fingerprint
+        h1, h2 = fp & 0xFFFFFFFF, (fp >> 32) | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, fp: int):
+        for pos in self._positions(fp):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, fp: int) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(fp))
+
+
+class _Shard:
+    """One slice of the fingerprint space; only writers take its lock"""
+
+    def __init__(self, bloom: Optional[_Bloom] = None):
+        self.lock = threading.Lock()
+        self.sorted = array("Q")
+        self.recent: set = set()
+        self.bloom = bloom
+        self.count = 0
+        self.string_bytes = 0  # what the same SKUs cost as Python str objects
+
+    def contains(self, fp: int) -> bool:
+        if self.bloom is not None:
+            return fp in self.bloom
+        # recent before sorted: a merge publishes the new array before it
+        # clears recent, so a concurrent reader always sees the fingerprint
+        if fp in self.recent:
+            return True
+        arr = self.sorted
+        i = bisect.bisect_left(arr, fp)
+        return i < len(arr) and arr[i] == fp
+
+
+class SkuIndex:
+    """
+    Known SKUs of one supplier, for incremental skips.
+    Stores 64-bit fingerprints instead of strings: a sorted array (exact up
+    to fingerprint collisions, ~8 bytes/SKU) plus a small set for SKUs added
+    during the run, or a Bloom filter (~1.2 bytes/SKU at 0.1% false positives;
+    a false positive skips a product that is not actually in the DB).
+
+    Split into SHARDS by the fingerprint's top bits. Lookups take no lock;
+    adds only lock their own shard, so crawl workers rarely contend.
+    """
+
+    MERGE_EVERY = 4096
+    SHARD_BITS = 4
+    SHARDS = 1 << SHARD_BITS
+
+    def __init__(self, supplier: str, mode: str = SORTED, fp_rate: float = 0.001, capacity: int = 0):
+        if mode not in (SORTED, BLOOM):
+            raise ValueError(f"Unknown SKU index mode: {mode}")
+        self.supplier_slug = slugify_supplier(supplier) if supplier else ""
+        self.mode = mode
+        self.fp_rate = fp_rate
+        shard_capacity = capacity // self.SHARDS + 1
+        self._shards = [_Shard(_Bloom(shard_capacity, fp_rate) if mode == BLOOM else None)
+                        for _ in range(self.SHARDS)]
+
+    def _shard(self, fp: int) -> _Shard:
+        return self._shards[fp >> (64 - self.SHARD_BITS)]
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "SkuIndex":
+        """`sku_index: {mode: sorted|bloom, fp_rate: 0.001}`, loaded for config['supplier']"""
+        opts = config.get("sku_index") or {}
+        return cls.load(config.get("db_path", "products.db"), config.get("supplier", ""),
+                        mode=opts.get("mode", SORTED), fp_rate=opts.get("fp_rate", 0.001))
+
+    @classmethod
+    def load(cls, db_path: str, supplier: str, mode: str = SORTED, fp_rate: float = 0.001) -> "SkuIndex":
+        """One query on the (supplier_slug, sku_clean) index"""
+        fps = array("Q")
+        string_bytes = 0
+        if os.path.exists(db_path):
+            try:
+                conn = sqlite3.connect(db_path)
+                rows = conn.execute(
+                    "SELECT sku_clean FROM products WHERE supplier_slug = ? AND sku_clean IS NOT NULL",
+                    (slugify_supplier(supplier),))
+                for (sku,) in rows:
+                    if sku:
+                        fps.append(fingerprint(sku))
+                        string_bytes += sys.getsizeof(sku)
+                conn.close()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to load existing SKUs: {e}")
+
+        # Headroom so SKUs found during the run keep the Bloom error rate
+        index = cls(supplier, mode=mode, fp_rate=fp_rate, capacity=int(len(fps) * 1.5) + 1000)
+        if mode == BLOOM:
+            for fp in fps:
+                index._shard(fp).bloom.add(fp)
+        else:
+            # Shards own contiguous ranges of the sorted fingerprints
+            ordered = sorted(set(fps))
+            shift = 64 - cls.SHARD_BITS
+            for i, shard in enumerate(index._shards):
+                lo = bisect.bisect_left(ordered, i << shift)
+                hi = bisect.bisect_left(ordered, (i + 1) << shift)
+                shard.sorted = array("Q", ordered[lo:hi])
+        for fp in fps:
+            index._shard(fp).count += 1
+        index._shards[0].string_bytes = string_bytes
+        logger.info(f"Loaded {len(fps)} existing SKUs for {index.supplier_slug} ({index.memory_bytes()} bytes, {mode})")
+        return index
+
+    def add(self, sku: str):
+        if not sku:
+            return
+        fp = fingerprint(sku)
+        shard = self._shard(fp)
+        with shard.lock:
+            if shard.contains(fp):
+                return
+            shard.count += 1
+            shard.string_bytes += sys.getsizeof(sku)
+            if shard.bloom is not None:
+                shard.bloom.add(fp)
+                return
+            shard.recent.add(fp)
+            if len(shard.recent) >= self.MERGE_EVERY:
+                shard.sorted = array("Q", sorted(list(shard.sorted) + list(shard.recent)))
+                shard.recent.clear()
+
+    def update(self, skus: Iterable[str]):
+        for sku in skus:
+            self.add(sku)
+
+    def __contains__(self, sku: str) -> bool:
+        if not sku:
+            return False
+        fp = fingerprint(sku)
+        return self._shard(fp).contains(fp)
+
+    def __len__(self) -> int:
+        return sum(shard.count for shard in self._shards)
+
+    def memory_bytes(self) -> int:
+        if self.mode == BLOOM:
+            return sum(len(shard.bloom.bits) for shard in self._shards)
+        return sum(shard.sorted.buffer_info()[1] * shard.sorted.itemsize + sys.getsizeof(shard.recent)
+                   for shard in self._shards)
+
+    def report(self) -> Dict[str, Any]:
+        """Memory use vs. the set-of-strings it replaces (estimated: strings + set table)"""
+        n = len(self)
+        set_table = sys.getsizeof(set()) + 16 * (1 << max(3, math.ceil(math.log2(max(1, n) * 5 / 3))))
+        string_bytes = sum(shard.string_bytes for shard in self._shards)
+        return {
+            "supplier": self.supplier_slug,
+            "mode": self.mode,
+            "skus": n,
+            "bytes": self.memory_bytes(),
+            "str_set_bytes_est": string_bytes + set_table if n else 0,
+        }
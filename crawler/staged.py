@@ -0,0 +1,220 @@
+import logging
+import multiprocessing
+import queue
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional
+from crawler.core import CrawlerEngine, LEASE_AHEAD, PageParser
+from crawler.fetcher import FetchResult, HTMLFetcher
+from crawler.pipeline import DataPipeline
+from crawler.stats import AtomicCounter
+from crawler.tracing import PageTrace, activate, span
+
+logger = logging.getLogger(__name__)
+
+PARSE_MODES = ("threads", "processes")
+
+# Parse process state: the supplier's parsing rules and a pipeline that never opens the DB
+_parser: Optional[PageParser] = None
+_pipeline: Optional[DataPipeline] = None
+
+
+def _init_parse_process(config: Dict[str, Any]):
+    global _parser, _pipeline
+    _parser = PageParser(config)
+    _pipeline = DataPipeline(config.get("db_path", "products.db"), validation=config.get("validation", "fast"),
+                             init_db=False)
+
+
+def _parse_in_process(url: str, html: str, card: Optional[Dict[str, Any]]):
+    """Parse + validate one page in a parse process: (sku, row, links, listing, spans)"""
+    if card is not None:
+        _parser._cards[url] = card
+    trace = PageTrace(url)
+    row = sku = None
+    with activate(trace):
+        with span("parse"):
+            product_data, links, listing = _parser._extract_page(url, html)
+        if product_data:
+            sku = product_data.get("sku")
+            with span("store.prepare"):
+                row = _pipeline.prepare_row(product_data)
+    return sku, row, links, listing, trace.spans
+
+
+class StagedCrawlerEngine(CrawlerEngine):
+    """
+    CrawlerEngine split into stages joined by bounded queues, so fetchers
+    never wait on parsing or SQLite:
+
+        frontier -> fetch (fetch_workers threads) -> parse queue
+                 -> parse (parse_workers threads or processes) -> store queue
+                 -> store (one DBWriter thread)
+
+    A full queue blocks the stage in front of it (backpressure), and the
+    frontier leases only as many URLs as the fetchers and the parse queue
+    can hold. `stage_depths()` gives the current queue depths; the run
+    report has their peaks and the time pages spent queued ("queue.parse").
+    """
+
+    RUN_MODE = "staged"
+
+    def __init__(self, config: Dict[str, Any], **kwargs):
+        super().__init__(config, **kwargs)
+        # The store stage is the writer
+        self.use_writer = True
+        opts = config.get("stages") or {}
+        # Fetchers are the engine's workers: the frontier feeds them
+        self.num_workers = opts.get("fetch_workers", self.num_workers)
+        self.parse_workers = max(1, opts.get("parse_workers", 2))
+        self.parse_mode = opts.get("parse_mode", "threads")
+        if self.parse_mode not in PARSE_MODES:
+            raise ValueError(f"stages.parse_mode must be one of {PARSE_MODES}, got {self.parse_mode!r}")
+        self.parse_queue_size = max(1, opts.get("parse_queue", 4 * self.num_workers))
+        self.store_queue_size = max(1, opts.get("store_queue", 1000))
+        self._parse_queue: Optional[queue.Queue] = None
+        self._store_queue: Optional[queue.Queue] = None
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        self.peak_depths = {"parse": 0, "store": 0}
+
+    def stage_depths(self) -> Dict[str, int]:
+        """Items waiting in front of each stage (0 outside run())"""
+        return {"parse": self._parse_queue.qsize() if self._parse_queue else 0,
+                "store": self._store_queue.qsize() if self._store_queue else 0}
+
+    def _max_outstanding(self) -> int:
+        # Enough leased URLs to keep every fetcher busy while the parse queue is full
+        return self.num_workers * LEASE_AHEAD + self.parse_queue_size + self.parse_workers
+
+    def run(self):
+        logger.info(f"Starting staged crawl at {self.base_url}: {self.num_workers} fetchers, "
+                    f"{self.parse_workers} parse {self.parse_mode}, 1 writer")
+        self._open_frontier()
+        self._start_run()
+        start_time = time.time()
+        self.count = AtomicCounter()
+        work: queue.Queue = queue.Queue()
+        self._events = queue.SimpleQueue()
+        self._parse_queue = queue.Queue(maxsize=self.parse_queue_size)
+        # Store stage: the DBWriter owns all products-DB writes; parsers hand it validated rows
+        writer = self._start_writer(maxsize=self.store_queue_size)
+        self._store_queue = writer.results
+        if self.parse_mode == "processes":
+            self._parse_pool = ProcessPoolExecutor(self.parse_workers, mp_context=multiprocessing.get_context("spawn"),
+                                                   initializer=_init_parse_process, initargs=(self.config,))
+
+        status = "failed"
+        try:
+            with ThreadPoolExecutor(max_workers=1 + self.num_workers + self.parse_workers) as executor:
+                owner = executor.submit(self._run_frontier, work)
+                fetchers = [executor.submit(self._fetch_worker, work, start_time) for _ in range(self.num_workers)]
+                parsers = [executor.submit(self._parse_worker, start_time) for _ in range(self.parse_workers)]
+                try:
+                    owner.result()
+                finally:
+                    # The frontier always releases the fetchers; parsers stop once nothing more can arrive
+                    wait(fetchers)
+                    for _ in parsers:
+                        self._parse_queue.put(None)
+                for future in fetchers + parsers:
+                    future.result()
+            status = "stopped" if self.stop_event.is_set() else "finished"
+        finally:
+            self._stop_writer(writer)
+            if self._parse_pool:
+                self._parse_pool.shutdown()
+                self._parse_pool = None
+            self._events = None
+            self._parse_queue = self._store_queue = None
+            if self._owns_pool:
+                self.browser_pool.close()
+            self._finish_run(status)
+
+        logger.info(f"Stages: peak queue depths {self.peak_depths}")
+        self._log_summary()
+
+    def _fetch_worker(self, work: queue.Queue, start_time: float):
+        fetcher = HTMLFetcher(pool=self.browser_pool, clearance=self.clearance,
+                              rate_limiter=self.rate_limiter, validators=self.validators)
+        try:
+            while True:
+                url = work.get()
+                if url is None:
+                    break
+                logger.info(f"Processing: {url}")
+                trace = self.tracer.begin(url)
+                result = None
+                try:
+                    with activate(trace):
+                        result = self._fetch_url(url, fetcher, trace)
+                except Exception as e:
+                    logger.error(f"Error fetching {url}: {e}")
+                if result is None:
+                    self._page_done(url, trace, start_time)
+                    continue
+                # Blocks while the parsers are behind; the frontier stops leasing meanwhile
+                self._parse_queue.put((url, result, trace, time.perf_counter()))
+                self._note_depth("parse", self._parse_queue)
+        finally:
+            with self.lock:
+                self.tier_counts.update(fetcher.tier_counts)
+            fetcher.close()
+
+    def _parse_worker(self, start_time: float):
+        while True:
+            item = self._parse_queue.get()
+            if item is None:
+                return
+            url, result, trace, queued = item
+            trace.add("queue.parse", time.perf_counter() - queued)
+            try:
+                with activate(trace):
+                    if self._parse_pool:
+                        self._handle_page_remote(url, result, trace)
+                    else:
+                        self._handle_page(url, result, trace)
+            except Exception as e:
+                logger.error(f"Error processing {url}: {e}")
+            self._page_done(url, trace, start_time)
+
+    def _handle_page_remote(self, url: str, result: FetchResult, trace: PageTrace):
+        """_handle_page with parsing and validation in a parse process"""
+        card = self._cards.pop(url, None)
+        sku, row, links, listing, spans = self._parse_pool.submit(_parse_in_process, url, result.html, card).result()
+        for phase, seconds in spans.items():
+            trace.add(phase, seconds)
+        if sku:
+            self.sku_index.add(sku)
+        if row:
+            with span("store"):
+                self._store_queue.put(("row", row))
+                self._remember_validators(result)
+        self._enqueue_links(links, parent=url, listing=listing)
+        trace.finish("ok", len(result.html))
+
+    def _page_done(self, url: str, trace: PageTrace, start_time: float):
+        self.tracer.end(trace)
+        self._note_depth("store", self._store_queue)
+        self._events.put(("done", url, trace.outcome != "failed"))
+        count = self.count.incr()
+        if count % 10 == 0:
+            self._log_status(count, start_time)
+
+    def _note_depth(self, stage: str, q: queue.Queue):
+        depth = q.qsize()
+        if depth > self.peak_depths[stage]:
+            self.peak_depths[stage] = depth
+
+    def _log_status(self, count: int, start_time: float):
+        elapsed = time.time() - start_time
+        rate = count / elapsed if elapsed > 0 else 0
+        depths = self.stage_depths()
+        logger.info(f"--- STATUS: {count} pages processed | Queue: {self.frontier.pending} | "
+                    f"Parse queue: {depths['parse']}/{self.parse_queue_size} | "
+                    f"Store queue: {depths['store']}/{self.store_queue_size} | Rate: {rate:.2f} p/s ---")
+
+    def _run_extra(self) -> Dict[str, Any]:
+        return {**super()._run_extra(),
+                "stages": {"fetch_workers": self.num_workers, "parse_workers": self.parse_workers,
+                           "parse_mode": self.parse_mode, "parse_queue": self.parse_queue_size,
+                           "store_queue": self.store_queue_size, "peak_depths": dict(self.peak_depths)}}
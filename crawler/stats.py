@@ -0,0 +1,100 @@
+import itertools
+import math
+import threading
+from typing import Any, Dict
+
+
+class AtomicCounter:
+    """
+    Counter that worker threads can bump without a lock: next() on an
+    itertools.count is a single C call, so increments are never lost.
+    `value` is the last value handed out (may trail a concurrent incr()).
+    """
+
+    def __init__(self):
+        self._it = itertools.count(1)
+        self._value = 0
+
+    def incr(self) -> int:
+        value = next(self._it)
+        self._value = value
+        return value
+
+    def reset(self):
+        self._it = itertools.count(1)
+        self._value = 0
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+    def __repr__(self):
+        return str(self._value)
+
+
+class LatencyHistogram:
+    """
+    Latency distribution in fixed log-spaced buckets (each GROWTH times
+    wider than the last, from MIN_SECONDS up), so p50/p95/p99 stay within
+    a few percent at constant memory however many pages a run fetches.
+    Snapshots are plain dicts: they merge across shard processes.
+    """
+
+    MIN_SECONDS = 1e-4
+    GROWTH = 1.1
+    BUCKETS = 220  # up to ~1e-4 * 1.1**220 s, about 14 hours
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def _bucket(self, seconds: float) -> int:
+        if seconds <= self.MIN_SECONDS:
+            return 0
+        return min(self.BUCKETS - 1, int(math.log(seconds / self.MIN_SECONDS, self.GROWTH)) + 1)
+
+    def add(self, seconds: float):
+        i = self._bucket(seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Geometric middle of the bucket holding the q-quantile (capped at the max seen)"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = q * self.count
+            seen = 0
+            for i, n in enumerate(self.counts):
+                seen += n
+                if n and seen >= rank:
+                    return min(self.max, self.MIN_SECONDS * self.GROWTH ** max(0.0, i - 0.5))
+            return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """count, mean and p50/p95/p99/max in milliseconds"""
+        if not self.count:
+            return {"count": 0}
+        return {"count": self.count, "mean_ms": round(1000 * self.total / self.count, 1),
+                **{f"p{int(q * 100)}_ms": round(1000 * self.quantile(q), 1) for q in (0.5, 0.95, 0.99)},
+                "max_ms": round(1000 * self.max, 1)}
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"counts": {i: n for i, n in enumerate(self.counts) if n},
+                    "count": self.count, "total": self.total, "max": self.max}
+
+    def merge(self, snapshot: Dict[str, Any]):
+        with self._lock:
+            for i, n in snapshot["counts"].items():
+                self.counts[int(i)] += n
+            self.count += snapshot["count"]
+            self.total += snapshot["total"]
+            self.max = max(self.max, snapshot["max"])
@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+from crawler.runs import RunStats
+from crawler.utils import slugify_supplier
+
+logger = logging.getLogger(__name__)
+
+# Trace of the page being processed by this thread / asyncio task.
+# asyncio.to_thread copies the context, so pipeline work sent to a thread still lands in it.
+_current: ContextVar[Optional["PageTrace"]] = ContextVar("page_trace", default=None)
+
+
+class PageTrace:
+    """Seconds spent per phase while processing one URL (repeated spans add up)"""
+
+    __slots__ = ("url", "started", "spans", "outcome", "tier", "nbytes")
+
+    def __init__(self, url: str):
+        self.url = url
+        self.started = time.perf_counter()
+        self.spans: Dict[str, float] = {}
+        self.outcome = "failed"
+        self.tier: Optional[str] = None
+        self.nbytes = 0
+
+    def add(self, phase: str, seconds: float):
+        self.spans[phase] = self.spans.get(phase, 0.0) + seconds
+
+    def finish(self, outcome: str, nbytes: int = 0):
+        self.outcome = outcome
+        self.nbytes = nbytes
+
+
+class _Span:
+    __slots__ = ("phase", "trace", "start")
+
+    def __init__(self, phase: str, trace: PageTrace):
+        self.phase = phase
+        self.trace = trace
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.trace.add(self.phase, time.perf_counter() - self.start)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(phase: str):
+    """
+    `with span("fetch.goto"): ...` times a block into the current page's
+    trace; a no-op outside Tracer.page() (replay, scripts, the DB writer thread).
+    """
+    trace = _current.get()
+    return _Span(phase, trace) if trace is not None else _NO_SPAN
+
+
+@contextmanager
+def activate(trace: PageTrace) -> Iterator[PageTrace]:
+    """Make `trace` the current one for spans in this block"""
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+class Tracer:
+    """
+    Per-URL timing spans. Each finished page feeds the run's RunStats (page
+    outcome plus one latency histogram per phase, so per supplier: every
+    engine has its own), and optionally one JSONL line
+    {"url", "supplier", "ts", "outcome", "tier", "bytes", "total_ms", "spans": {phase: ms}}.
+    """
+
+    def __init__(self, stats: RunStats, supplier: Optional[str] = None, jsonl_path: Optional[str] = None):
+        self.stats = stats
+        self.supplier = supplier
+        self.jsonl_path = jsonl_path
+        self._fd: Optional[int] = None
+        self._open_lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], stats: RunStats) -> "Tracer":
+        """`tracing: {jsonl: traces/{supplier}.jsonl}`; without a path only the histograms are kept"""
+        supplier = config.get("supplier")
+        path = (config.get("tracing") or {}).get("jsonl")
+        if path:
+            path = path.replace("{supplier}", slugify_supplier(supplier) if supplier else "all")
+        return cls(stats, supplier=supplier, jsonl_path=path or None)
+
+    @contextmanager
+    def page(self, url: str) -> Iterator[PageTrace]:
+        trace = self.begin(url)
+        try:
+            with activate(trace):
+                yield trace
+        finally:
+            self.end(trace)
+
+    # A page handed from stage to stage (staged engine): begin() in the
+    # fetcher, activate() in each stage that works on it, end() in the last one
+
+    def begin(self, url: str) -> PageTrace:
+        return PageTrace(url)
+
+    def end(self, trace: PageTrace):
+        self._record(trace, time.perf_counter() - trace.started)
+
+    def _record(self, trace: PageTrace, total: float):
+        stats = self.stats
+        stats.page(trace.outcome, trace.tier, trace.nbytes)
+        stats.time("page", total)
+        for phase, seconds in trace.spans.items():
+            stats.time(phase, seconds)
+        if self.jsonl_path:
+            self._write({"url": trace.url, "supplier": self.supplier, "ts": round(time.time(), 3),
+                         "outcome": trace.outcome, "tier": trace.tier, "bytes": trace.nbytes,
+                         "total_ms": round(1000 * total, 2),
+                         "spans": {phase: round(1000 * s, 2) for phase, s in trace.spans.items()}})
+
+    def _write(self, record: Dict[str, Any]):
+        try:
+            if self._fd is None:
+                with self._open_lock:
+                    if self._fd is None:
+                        directory = os.path.dirname(self.jsonl_path)
+                        if directory:
+                            os.makedirs(directory, exist_ok=True)
+                        self._fd = os.open(self.jsonl_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            # One write() per line on an O_APPEND fd: lines from worker threads
+            # and shard processes never interleave
+            os.write(self._fd, (json.dumps(record, ensure_ascii=False) + "\n").encode())
+        except OSError as e:
+            logger.error(f"Could not write trace to {self.jsonl_path}: {e}")
+            self.jsonl_path = None
+
+    def close(self):
+        with self._open_lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
@@ -0,0 +1,108 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+
+class UrlVerdict(NamedTuple):
+    allowed: bool      # no host (relative) or host in allowed_domains
+    is_product: bool
+    is_category: bool
+    sku: str           # group 1 of sku_url_regex for product URLs, "" otherwise
+
+
+_BLOCKED = UrlVerdict(False, False, False, "")
+
+
+# Group references (\1, (?P=name), (?(1)...)) and named groups depend on the
+# pattern's own group numbering and names, which a joined alternation changes
+_GROUP_DEPENDENT = re.compile(r"\\[1-9]|\(\?P[=<]|\(\?\(")
+
+
+class _Patterns:
+    """
+    One pattern list: plain entries are substrings (checked with `in`, much
+    faster than a big alternation in `re`), `regex:` entries are joined into
+    a single regex, except those that refer to their own groups, which are
+    searched one by one.
+    """
+
+    __slots__ = ("literals", "regex", "standalone")
+
+    def __init__(self, patterns: Iterable[str]):
+        literals, parts, standalone = [], [], []
+        for p in patterns:
+            if p.startswith("regex:"):
+                compiled = re.compile(p[6:])  # report a bad pattern on its own
+                if _GROUP_DEPENDENT.search(p[6:]):
+                    standalone.append(compiled)
+                else:
+                    parts.append(f"(?:{p[6:]})")
+            else:
+                literals.append(p)
+        self.literals = tuple(literals)
+        self.regex = re.compile("|".join(parts)) if parts else None
+        self.standalone = tuple(standalone)
+
+    def search(self, url: str) -> bool:
+        for literal in self.literals:
+            if literal in url:
+                return True
+        if self.regex and self.regex.search(url):
+            return True
+        return any(regex.search(url) for regex in self.standalone)
+
+
+class UrlClassifier:
+    """
+    A supplier's URL rules compiled once: product and category patterns
+    are split into substrings and one combined regex each (patterns with
+    group references or named groups stay separate), the SKU regex is
+    precompiled and only run for product URLs, and verdicts for
+    recently seen URLs (menus and footers repeat on every page) come from
+    an LRU cache.
+    """
+
+    def __init__(self, product_patterns: Iterable[str] = (), category_patterns: Iterable[str] = (),
+                 sku_url_regex: Optional[str] = None, allowed_domains: Iterable[str] = (),
+                 cache_size: int = 65536):
+        try:
+            self._product = _Patterns(product_patterns)
+            self._category = _Patterns(category_patterns)
+            self._sku = re.compile(sku_url_regex) if sku_url_regex else None
+        except re.error as e:
+            raise ValueError(f"Invalid URL pattern in config: {e}") from e
+        self.allowed_domains = frozenset(allowed_domains)
+        self.classify = lru_cache(maxsize=cache_size)(self._classify)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "UrlClassifier":
+        """product_url_patterns / category_url_patterns / sku_url_regex / allowed_domains"""
+        return cls(product_patterns=config.get("product_url_patterns", []),
+                   category_patterns=config.get("category_url_patterns", []),
+                   sku_url_regex=config.get("sku_url_regex"),
+                   allowed_domains=config.get("allowed_domains", []),
+                   cache_size=(config.get("url_classifier") or {}).get("cache_size", 65536))
+
+    def _classify(self, url: str) -> UrlVerdict:
+        netloc = urlsplit(url).netloc
+        if netloc and netloc not in self.allowed_domains:
+            return _BLOCKED
+        is_product = self._product.search(url)
+        sku = ""
+        if is_product and self._sku:
+            match = self._sku.search(url)
+            if match:
+                sku = match.group(1)
+        return UrlVerdict(True, is_product, self._category.search(url), sku)
+
+    def is_product(self, url: str) -> bool:
+        return self.classify(url).is_product
+
+    def sku(self, url: str) -> str:
+        """SKU from any URL (a page parsed as a product may not match the product patterns)"""
+        match = self._sku.search(url) if self._sku else None
+        return match.group(1) if match else ""
+
+    def cache_info(self):
+        return self.classify.cache_info()
@@ -0,0 +1,181 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Set, Tuple
+from crawler.fetcher import FetchResult
+from crawler.pipeline import DataPipeline
+from crawler.revalidation import ValidatorStore
+from crawler.runs import RunStats
+from crawler.utils import normalize_url
+
+logger = logging.getLogger(__name__)
+
+
+class QueuedPipeline:
+    """
+    DataPipeline stand-in for a crawler that shares the products DB:
+    items are normalized, validated and serialized by the caller, then
+    handed to the DBWriter as ready rows.
+    """
+
+    def __init__(self, pipeline: DataPipeline, results):
+        self.db_path = pipeline.db_path
+        self._pipeline = pipeline
+        self._results = results
+
+    def process_item(self, item_data: Dict[str, Any], seen_at=None):
+        row = self._pipeline.prepare_row(item_data, seen_at)
+        if row:
+            self._results.put(("row", row))
+
+    def touch_url(self, url: str):
+        self._results.put(("touch", url))
+
+
+class QueuedValidators:
+    """Reads validators directly; writes go through the DBWriter, after the row they belong to"""
+
+    def __init__(self, store: ValidatorStore, results):
+        self._store = store
+        self._results = results
+
+    def get(self, url: str):
+        return self._store.get(url)
+
+    def remember(self, result):
+        if result.body_hash:
+            self._results.put(("validators", FetchResult(url=result.url, etag=result.etag,
+                                                         last_modified=result.last_modified,
+                                                         body_hash=result.body_hash)))
+
+    def close(self):
+        self._store.close()
+
+
+class DBWriter:
+    """
+    The only writer of the products DB during a crawl (threads / async /
+    staged engines, shard processes, or suppliers crawled together).
+    Consumes ("row" | "touch" | "validators", payload) messages from
+    `results` (a queue.Queue or multiprocessing Queue) on one thread, in
+    arrival order, over one long-lived WAL connection.
+
+    Group commit: messages are applied in one transaction per batch, which
+    ends after `batch_size` messages or `max_delay` seconds after its first
+    one, whichever comes first. Rows that did not change since they were
+    stored only get last_seen_at, bumped once per batch. Validators are
+    stored after the commit of the rows they belong to, and dropped when
+    that row was not written (its page must be parsed again next time).
+    close() flushes what is queued.
+    """
+
+    def __init__(self, db_path: str, results, revalidate: bool = False,
+                 pipeline: Optional[DataPipeline] = None, stats: Optional[RunStats] = None,
+                 batch_size: int = 500, max_delay: float = 0.5):
+        # Schema is created here, before any producer opens the DB
+        self.pipeline = pipeline or DataPipeline(db_path)
+        self.validators = ValidatorStore(db_path) if revalidate else None
+        self.results = results
+        self.batch_size = max(1, batch_size)
+        self.max_delay = max_delay
+        # Time per group commit ("store.write"), when the writer serves one crawl
+        self.run_stats = stats
+        self.stats: Counter = Counter()
+        self._thread: Optional[threading.Thread] = None
+        # url_clean of the previous batch's unwritten rows: their validators may arrive in this batch
+        self._unwritten: Set[str] = set()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], results, **kwargs) -> "DBWriter":
+        """`writer: {batch_size: 500, max_delay_ms: 500}`"""
+        opts = config.get("writer") or {}
+        return cls(config.get("db_path", "products.db"), results, batch_size=opts.get("batch_size", 500),
+                   max_delay=opts.get("max_delay_ms", 500) / 1000, **kwargs)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="db-writer")
+        self._thread.start()
+
+    def close(self):
+        """Write everything queued so far, then stop"""
+        self.results.put(None)
+        if self._thread:
+            self._thread.join()
+        if self.validators:
+            self.validators.close()
+
+    def _run(self):
+        conn = self.pipeline.connect()
+        try:
+            closing = False
+            while not closing:
+                batch, closing = self._next_batch()
+                if batch:
+                    self._apply(conn, batch)
+        finally:
+            conn.close()
+
+    def _next_batch(self) -> Tuple[List[tuple], bool]:
+        """Messages for one transaction, and whether close() was seen"""
+        msg = self.results.get()
+        batch = []
+        deadline = time.monotonic() + self.max_delay
+        while msg is not None:
+            batch.append(msg)
+            timeout = deadline - time.monotonic()
+            if len(batch) >= self.batch_size or timeout <= 0:
+                return batch, False
+            try:
+                msg = self.results.get(timeout=timeout)
+            except queue.Empty:
+                return batch, False
+        return batch, True
+
+    def _apply(self, conn, batch: List[tuple]):
+        start = time.perf_counter()
+        written, touched, validators, bumps = [], [], [], []
+        unwritten = set()
+        for kind, payload in batch:
+            try:
+                if kind == "row":
+                    outcome = self.pipeline.upsert(conn, payload, bumps)
+                    if outcome:
+                        written.append((payload, outcome))
+                    else:
+                        unwritten.add(payload.get("url_clean"))
+                elif kind == "touch":
+                    touched.extend(self.pipeline.touch(conn, payload))
+                elif kind == "validators" and self.validators:
+                    validators.append(payload)
+                self.stats[kind] += 1
+            except Exception as e:
+                if kind == "row":
+                    unwritten.add(payload.get("url_clean"))
+                logger.error(f"Writer error ({kind}): {e}")
+        try:
+            # Unchanged rows: one last_seen_at UPDATE for the batch instead of rewriting each row
+            self.pipeline.bump_seen(conn, bumps)
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Writer commit failed, {len(batch)} messages lost: {e}")
+            conn.rollback()
+            self.pipeline.forget_stored()
+            self._unwritten = {payload.get("url_clean") for kind, payload in batch if kind == "row"}
+            return
+        self.stats["commits"] += 1
+        for payload, outcome in written:
+            self.pipeline.count_write(payload, outcome)
+        self.pipeline.count_touched(touched)
+        skip = unwritten | self._unwritten
+        self._unwritten = unwritten
+        validators = [result for result in validators if normalize_url(result.url) not in skip]
+        if validators:
+            try:
+                self.validators.remember_many(validators)
+            except sqlite3.Error as e:
+                logger.error(f"Writer error (validators): {e}")
+        if self.run_stats:
+            self.run_stats.time("store.write", time.perf_counter() - start)
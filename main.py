@@ -1,23 +1,108 @@
 import argparse
+import signal
 import yaml
 from pathlib import Path
+from typing import Optional
 from crawler.core import CrawlerEngine
 
 def load_config(config_path: str) -> dict:
     with open(config_path, "r") as f:
         return yaml.safe_load(f)
 
+def build_config(config_path: str, args, db_path: str) -> Optional[dict]:
+    config_path = Path(config_path)
+    if not config_path.exists():
+        print(f"Error: Config file not found at {config_path}")
+        return None
+        
+    config = load_config(config_path)
+    config['db_path'] = db_path
+    config['incremental'] = args.incremental
+    config['resume'] = args.resume
+    if args.budget:
+        # Spend the budget on the chosen products only, no discovery
+        config['discover'] = False
+    if args.trace:
+        # One JSON line of phase timings per URL ({supplier} -> supplier slug)
+        config['tracing'] = dict(config.get('tracing') or {}, jsonl=args.trace)
+    if args.recrawl or args.budget:
+        # Conditional GETs: unchanged product pages cost headers, not a full parse + write
+        config.setdefault('revalidate', True)
+    return config
+
+def seed(engine, config: dict, args):
+    # Optional: Load from Sitemap first
+    if args.resume:
+         print("Resuming from the saved frontier (no re-seeding)")
+    elif args.budget:
+         print(f"Freshness mode: refetching the {args.budget} products most likely to have changed...")
+         engine.seed_stale(args.budget)
+    elif args.recrawl:
+         print("Recrawl mode: Loading all known product URLs from DB...")
+         engine.seed_from_db()
+    elif args.sitemap:
+        print(f"Fetching URLs from sitemap: {config.get('sitemap_url')} ...")
+        from crawler.sitemap import SitemapCrawler
+        sitemap_crawler = SitemapCrawler(config.get('base_url'), pool=engine.browser_pool)
+        urls = sitemap_crawler.get_product_urls()
+        if urls:
+            print(f"Seeding queue with {len(urls)} URLs from sitemap...")
+            engine.seed_queue(urls)
+        else:
+            print("Sitemap blocked or empty. Seeding from Category Patterns in config...")
+            cat_patterns = config.get("category_url_patterns", [])
+            base = config.get("base_url").rstrip('/')
+            seed_urls = [base + p if p.startswith('/') else p for p in cat_patterns if p.startswith('/')]
+            engine.seed_queue(seed_urls)
+
+def run_single(config: dict, args):
+    if args.replay:
+        print(f"Replaying archived pages for {config.get('supplier', 'Unknown Supplier')}")
+        CrawlerEngine(config).replay()
+    elif not args.no_crawl:
+        print(f"Starting crawler for {config.get('supplier', 'Unknown Supplier')}")
+        
+        # Initialize Engine
+        if args.processes > 1:
+            from crawler.sharded import ShardedCrawl
+            if args.use_async or args.staged:
+                print("--async / --staged are ignored with --processes (shards use threaded workers)")
+            engine = ShardedCrawl(config, processes=args.processes)
+        elif args.use_async:
+            from crawler.async_core import AsyncCrawlerEngine
+            if args.staged:
+                print("--staged is ignored with --async")
+            engine = AsyncCrawlerEngine(config)
+        elif args.staged:
+            from crawler.staged import StagedCrawlerEngine
+            engine = StagedCrawlerEngine(config)
+        else:
+            engine = CrawlerEngine(config)
+
+        # /api/stop sends SIGTERM: stop leasing, finish in-flight pages, keep the frontier
+        signal.signal(signal.SIGTERM, lambda *_: engine.stop())
+        seed(engine, config, args)
+        engine.run()
+
 def main():
     parser = argparse.ArgumentParser(description="Supplier Catalog Crawler")
     parser = argparse.ArgumentParser(description="Supplier Catalog Crawler")
     parser.add_argument("--config", type=str, help="Path to supplier config YAML")
+    parser.add_argument("--configs", type=str, nargs="+", help="Crawl several suppliers at once (shared browser pool and DB writer)")
     parser.add_argument("--sitemap", action="store_true", help="Seed queue from sitemap.xml")
     parser.add_argument("--incremental", action="store_true", help="Skip already crawled SKUs")
     parser.add_argument("--recrawl", action="store_true", help="Recrawl ALL URLs existing in the DB (ignore discovery)")
+    parser.add_argument("--budget", type=int, help="Recrawl only the N known products most likely to have changed (adaptive revisit intervals)")
+    parser.add_argument("--trace", type=str, help="Append per-URL phase timings as JSON lines to this file")
     parser.add_argument("--export", type=str, help="Path to export output (e.g. products.csv)")
     parser.add_argument("--format", type=str, default="csv", choices=["csv", "xlsx", "json"], help="Export format")
     parser.add_argument("--db", type=str, default="products.db", help="Path to SQLite DB")
     parser.add_argument("--no-crawl", action="store_true", help="Skip crawling, only export")
+    parser.add_argument("--resume", action="store_true", help="Continue the last (stopped or crashed) crawl from its saved frontier")
+    parser.add_argument("--replay", action="store_true", help="Re-parse archived pages with the current selectors (no network)")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Use the asyncio engine (num_workers = max in-flight requests)")
+    parser.add_argument("--staged", action="store_true", help="Fetch, parse and store in separate stages joined by bounded queues (see `stages` in the config)")
+    parser.add_argument("--processes", type=int, default=1, help="Shard the crawl across N processes (num_workers threads each, one DB writer)")
     parser.add_argument("--export-frontend", action="store_true", help="Generate frontend-ready JSON snapshots in data/out/")
     args = parser.parse_args()
     
@@ -34,41 +119,23 @@ def main():
         # Requirement says "Frontend Export step", implies it acts as an operation.
         return 
 
-    config_path = Path(args.config)
-    if not config_path.exists():
-        print(f"Error: Config file not found at {config_path}")
-        return
-        
-    config = load_config(config_path)
-    config['db_path'] = db_path
-    config['incremental'] = args.incremental
-    
-    if not args.no_crawl:
-        print(f"Starting crawler for {config.get('supplier', 'Unknown Supplier')}")
-        
-        # Initialize Engine
-        engine = CrawlerEngine(config)
-        
-        # Optional: Load from Sitemap first
-        if args.recrawl:
-             print("Recrawl mode: Loading all known product URLs from DB...")
-             engine.seed_from_db()
-        elif args.sitemap:
-            print(f"Fetching URLs from sitemap: {config.get('sitemap_url')} ...")
-            from crawler.sitemap import SitemapCrawler
-            sitemap_crawler = SitemapCrawler(config.get('base_url'))
-            urls = sitemap_crawler.get_product_urls()
-            if urls:
-                print(f"Seeding queue with {len(urls)} URLs from sitemap...")
-                engine.seed_queue(urls)
-            else:
-                print("Sitemap blocked or empty. Seeding from Category Patterns in config...")
-                cat_patterns = config.get("category_url_patterns", [])
-                base = config.get("base_url").rstrip('/')
-                seed_urls = [base + p if p.startswith('/') else p for p in cat_patterns if p.startswith('/')]
-                engine.seed_queue(seed_urls)
-
-        engine.run()
+    if args.configs:
+        configs = [build_config(path, args, db_path) for path in args.configs]
+        if None in configs:
+            return
+        if not args.no_crawl:
+            from crawler.orchestrator import MultiSupplierCrawl
+            print(f"Starting crawler for {', '.join(c.get('supplier', 'Unknown Supplier') for c in configs)}")
+            crawl = MultiSupplierCrawl(configs)
+            signal.signal(signal.SIGTERM, lambda *_: crawl.stop())
+            for engine in crawl.engines:
+                seed(engine, engine.config, args)
+            crawl.run()
+    else:
+        config = build_config(args.config, args, db_path)
+        if config is None:
+            return
+        run_single(config, args)
         
     if args.export:
         print(f"Exporting data to {args.export}...")
@@ -0,0 +1,165 @@
+"""
+Worker-coordination microbenchmark: shared locks vs. CrawlerEngine.run().
+
+Both crawl the same synthetic site (no network) into the same disk-backed
+Frontier: every page "fetch" sleeps --fetch-ms (I/O, releases the GIL) and
+yields --links links, a third of them products. Only the coordination differs:
+
+  shared-lock  every worker leases, admits each link (one commit per link)
+               and completes through the frontier lock, and bumps counters
+               under an engine-wide lock; "lock wait" is the time workers
+               spent blocked on those two locks
+  engine       CrawlerEngine.run(): work queue + a single frontier thread
+               that applies worker events in batched transactions, sharded
+               SKU index, atomic counters
+
+Usage: python scripts/bench_engine_contention.py [--pages 3000] [--workers 16 32 64]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler.core import CrawlerEngine, PRIORITY_PRODUCT
+
+BASE = "http://bench.local"
+
+
+def page_links(url, pages, links_per_page):
+    """Deterministic links of a synthetic page: categories and products, within `pages` ids"""
+    n = int(url.rsplit("/", 1)[1])
+    out = set()
+    for i in range(1, links_per_page + 1):
+        target = (n * 7919 + i * 104729) % pages
+        kind = "product" if i % 3 == 0 else "category"
+        out.add(f"{BASE}/{kind}/{target}")
+    return out
+
+
+def busy(links):
+    # Stand-in for parsing: a little GIL-holding work per link
+    return sum(len(link) for link in links)
+
+
+class TimedLock:
+    """threading.Lock that adds up how long callers waited for it"""
+
+    def __init__(self, lock=None):
+        self._lock = lock or threading.Lock()
+        self.waited = 0.0
+
+    def __enter__(self):
+        t = time.perf_counter()
+        self._lock.acquire()
+        self.waited += time.perf_counter() - t
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
+def make_engine(workers, tmpdir, name):
+    config = {
+        "supplier": "Bench",
+        "base_url": f"{BASE}/category/0",
+        "allowed_domains": ["bench.local"],
+        "category_url_patterns": ["/category/"],
+        "product_url_patterns": ["/product/"],
+        "sku_url_regex": r"/product/(\d+)",
+        "num_workers": workers,
+        "db_path": os.path.join(tmpdir, f"bench_{name}_{workers}.db"),
+        "archive": {"enabled": False},
+    }
+    return CrawlerEngine(config)
+
+
+def simulate_page(engine, url, pages, fetch_ms, links_per_page):
+    time.sleep(fetch_ms / 1000)
+    links = page_links(url, pages, links_per_page)
+    busy(links)
+    if "/product/" in url:
+        engine.sku_index.add(url.rsplit("/", 1)[1])
+    return links
+
+
+def legacy_run(pages, workers, fetch_ms, links_per_page, tmpdir):
+    """Same Frontier, but every worker leases, admits each link and finishes under shared locks"""
+    engine = make_engine(workers, tmpdir, "legacy")
+    engine._open_frontier()
+    frontier = engine.frontier
+    frontier._lock = TimedLock(threading.RLock())
+    lock = TimedLock()
+    state = {"count": 0, "in_flight": 0}
+
+    def worker():
+        while True:
+            url = frontier.lease()
+            if url is None:
+                with lock:
+                    if state["in_flight"] == 0:
+                        return
+                time.sleep(0.001)
+                continue
+            with lock:
+                state["in_flight"] += 1
+            links = simulate_page(engine, url, pages, fetch_ms, links_per_page)
+            depth = frontier.depth(url) + 1
+            added = 0
+            for link in links:
+                if engine._can_crawl(link):
+                    priority = PRIORITY_PRODUCT if engine._is_product_url(link) else engine._listing_priority(link, depth)
+                    added += frontier.add(link, priority=priority, depth=depth)
+            frontier.record_yield(url, added)
+            frontier.complete(url)
+            with lock:
+                state["count"] += 1
+                state["in_flight"] -= 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(worker) for _ in range(workers)]:
+            future.result()
+    elapsed = time.perf_counter() - start
+    return state["count"], elapsed, lock.waited + frontier._lock.waited
+
+
+def engine_run(pages, workers, fetch_ms, links_per_page, tmpdir):
+    engine = make_engine(workers, tmpdir, "engine")
+
+    def process(url, fetcher):
+        engine._enqueue_links(simulate_page(engine, url, pages, fetch_ms, links_per_page), parent=url)
+        return True
+
+    engine._process_url = process
+    start = time.perf_counter()
+    engine.run()
+    elapsed = time.perf_counter() - start
+    engine.frontier.close()
+    return engine.count.value, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--pages", type=int, default=3000, help="Distinct pages per kind in the synthetic site")
+    parser.add_argument("--workers", type=int, nargs="+", default=[16, 32, 64])
+    parser.add_argument("--fetch-ms", type=float, default=5.0, help="Simulated fetch latency per page")
+    parser.add_argument("--links", type=int, default=40, help="Links per page")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    print(f"{'workers':>7} {'mode':<12} {'pages':>6} {'secs':>7} {'pages/s':>9} {'lock wait s':>11}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for workers in args.workers:
+            count, elapsed, wait = legacy_run(args.pages, workers, args.fetch_ms, args.links, tmpdir)
+            print(f"{workers:>7} {'shared-lock':<12} {count:>6} {elapsed:>7.2f} {count / elapsed:>9.0f} {wait:>11.2f}")
+            count, elapsed = engine_run(args.pages, workers, args.fetch_ms, args.links, tmpdir)
+            print(f"{workers:>7} {'engine':<12} {count:>6} {elapsed:>7.2f} {count / elapsed:>9.0f} {'-':>11}")
+
+
+if __name__ == "__main__":
+    main()
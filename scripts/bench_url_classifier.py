@@ -0,0 +1,108 @@
+"""
+URL classification microbenchmark: per-link pattern loops vs. UrlClassifier.
+
+Links come from the saved HTML fixtures (repo root *.html and tests/mock_site),
+resolved against each supplier's base_url and classified with that supplier's
+config, --repeat times over (every page of a real crawl repeats the same menu
+and footer links). Modes:
+
+  legacy   the engine's old per-link checks: urlparse + a loop over the
+           pattern lists with re.search per `regex:` entry, SKU regex
+           searched again for product links
+  cold     UrlClassifier with the cache disabled (combined regexes only)
+  warm     UrlClassifier with its default LRU cache
+
+Usage: python scripts/bench_url_classifier.py [--repeat 200]
+"""
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+from urllib.parse import urlparse
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from crawler.parser import HTMLParser
+from crawler.url_classifier import UrlClassifier
+
+FIXTURES = {
+    "config/comfort_gifts.yaml": ["debug_comfort.html", "debug_static.html", "debug_missing_img.html", "missing_p.html"],
+    "config/zeus.yaml": ["zeus_cat.html", "zeus_product.html"],
+    "config/mock.yaml": ["tests/mock_site/*.html"],
+}
+
+
+def legacy_matches(patterns, url):
+    for p in patterns:
+        if p.startswith("regex:"):
+            if re.search(p[6:], url):
+                return True
+        elif p in url:
+            return True
+    return False
+
+
+def legacy_classify(config, allowed, url):
+    parsed = urlparse(url)
+    if parsed.netloc and parsed.netloc not in allowed:
+        return False
+    is_category = legacy_matches(config.get("category_url_patterns", []), url)
+    if legacy_matches(config.get("product_url_patterns", []), url):
+        sku_regex = config.get("sku_url_regex")
+        if sku_regex:
+            re.search(sku_regex, url)
+        return True
+    return is_category
+
+
+def load_links():
+    """(config, links) per supplier, links in page order as the engine sees them"""
+    suppliers = []
+    for config_path, patterns in FIXTURES.items():
+        with open(os.path.join(ROOT, config_path)) as f:
+            config = yaml.safe_load(f)
+        links = []
+        for pattern in patterns:
+            for path in sorted(glob.glob(os.path.join(ROOT, pattern))):
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    links.extend(sorted(HTMLParser(f.read()).extract_links(config["base_url"])))
+        if links:
+            suppliers.append((config_path, config, links))
+    return suppliers
+
+
+def timed(fn, links, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for link in links:
+            fn(link)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=200, help="Passes over each fixture's links")
+    args = parser.parse_args()
+
+    print(f"{'config':<26} {'links':>6} {'mode':<7} {'secs':>7} {'links/s':>11} {'speedup':>8}")
+    for config_path, config, links in load_links():
+        allowed = set(config.get("allowed_domains", []))
+        base = timed(lambda url: legacy_classify(config, allowed, url), links, args.repeat)
+        rows = [("legacy", base)]
+        cold = UrlClassifier.from_config(dict(config, url_classifier={"cache_size": 0}))
+        rows.append(("cold", timed(cold.classify, links, args.repeat)))
+        warm = UrlClassifier.from_config(config)
+        rows.append(("warm", timed(warm.classify, links, args.repeat)))
+        total = len(links) * args.repeat
+        for mode, secs in rows:
+            print(f"{os.path.basename(config_path):<26} {len(links):>6} {mode:<7} {secs:>7.3f} "
+                  f"{total / secs:>11.0f} {base / secs:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
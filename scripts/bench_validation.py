@@ -0,0 +1,103 @@
+"""
+Validation + serialization benchmark: DataPipeline.prepare_row per validation mode.
+
+N synthetic product records shaped like real catalog pages (Hebrew titles
+and descriptions, category path, ~10 properties, --images image URLs,
+color variants) go through the pipeline's pre-write steps. Modes:
+
+  model        validation: model, prepare_row per item (Product + model_dump)
+  fast         validation: fast, prepare_row per item (prebuilt TypeAdapter)
+
+"total" is all of prepare_row: identity, URL normalization and content
+hash too. "validate" is only the part the modes differ in (validation and
+serialization of already-normalized items). Every mode must produce the
+same rows; the script checks that before printing.
+
+Usage: python scripts/bench_validation.py [--items 5000] [--images 8]
+"""
+import argparse
+import copy
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from crawler.models import Product, SCRAPED_FIELDS, check_system_fields
+from crawler.pipeline import DataPipeline
+
+
+def make_items(n: int, images: int):
+    items = []
+    for i in range(n):
+        items.append({
+            "url": f"https://shop.example/product/sofa-{i}?ref=cat",
+            "supplier": "Bench",
+            "sku": f"SF-{i:05d}",
+            "title": f"ספה תלת מושבית דגם {i}",
+            "price": 1990 + i % 500,
+            "currency": "ILS",
+            "availability": "in_stock" if i % 7 else "out_of_stock",
+            "category_path": ["ריהוט", "סלון", "ספות"],
+            "description": "ספה מרווחת עם ריפוד בד איכותי ורגלי עץ מלא. " * 8,
+            "properties": {f"מאפיין {k}": f"ערך {k}-{i % 13}" for k in range(10)},
+            "images": [f"https://cdn.shop.example/img/{i}/{k}.jpg?w=1200" for k in range(images)],
+            "variants": [{"name": color} for color in ("אפור", "בז'", "כחול")],
+            "raw": {"breadcrumbs": 3, "source": "jsonld"},
+        })
+    return items
+
+
+def run(mode: str, items, seen_at):
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = DataPipeline(os.path.join(tmp, "products.db"),
+                                validation="model" if mode == "model" else "fast")
+        batch = copy.deepcopy(items)
+        start = time.perf_counter()
+        rows = [pipeline.prepare_row(item, seen_at) for item in batch]
+        total = time.perf_counter() - start
+
+        # Same items, normalized again (untimed), through validation + serialization alone
+        batch = copy.deepcopy(items)
+        for item in batch:
+            pipeline._normalize(item, seen_at)
+        start = time.perf_counter()
+        if mode == "model":
+            [pipeline._serialize(Product(**item)) for item in batch]
+        else:
+            for item in batch:
+                check_system_fields(item)
+                pipeline._row(item, SCRAPED_FIELDS.validate_python(item))
+        return total, time.perf_counter() - start, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--images", type=int, default=8)
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+    items = make_items(args.items, args.images)
+    seen_at = datetime.now(timezone.utc)
+
+    results = {mode: run(mode, items, seen_at) for mode in ("model", "fast")}
+    reference = results["model"][2]
+    for mode, (_, _, rows) in results.items():
+        if rows != reference:
+            sys.exit(f"{mode}: rows differ from the model path")
+
+    print(f"{args.items} products, {args.images} images each (identical rows in every mode)")
+    print(f"{'mode':<12} {'total':>8} {'items/s':>10} {'speedup':>8} {'validate':>9} {'speedup':>8}")
+    base_total, base_validate, _ = results["model"]
+    for mode, (total, validate, _) in results.items():
+        print(f"{mode:<12} {total:>7.2f}s {args.items / total:>10.0f} {base_total / total:>7.1f}x "
+              f"{validate:>8.2f}s {base_validate / validate:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
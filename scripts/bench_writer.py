@@ -0,0 +1,94 @@
+"""
+Products-DB write benchmark: per-item commits vs. the group-committing DBWriter.
+
+N synthetic products (validated once up front, so only writing is timed) are
+written into a fresh DB by --threads producer threads. Modes:
+
+  per_item   each producer calls DataPipeline.write_row: its own connection,
+             upsert and commit per product (the engine's old write path)
+  writer     producers queue rows to one DBWriter: one WAL connection,
+             a commit per --batch-size rows or --max-delay-ms
+  batch      DataPipeline.write_rows for everything: one transaction
+
+The second pass over the same products measures revisits: all unchanged, so
+only their last_seen_at is bumped (one UPDATE ... IN per batch).
+
+Usage: python scripts/bench_writer.py [--items 2000] [--threads 4] [--batch-size 500]
+"""
+import argparse
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from crawler.pipeline import DataPipeline
+from crawler.writer import DBWriter
+
+
+def make_rows(pipeline: DataPipeline, n: int):
+    rows = []
+    for i in range(n):
+        row = pipeline.prepare_row({"url": f"https://shop.example/product/P{i}", "supplier": "Bench",
+                                    "sku": f"P{i}", "title": f"Product {i}", "price": 10 + i % 90,
+                                    "description": "x" * 400, "images": [f"https://shop.example/img/{i}.jpg"]})
+        rows.append(row)
+    return rows
+
+
+def produce(rows, threads: int, put):
+    chunks = [rows[i::threads] for i in range(threads)]
+    workers = [threading.Thread(target=lambda c=c: [put(r) for r in c]) for c in chunks]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+
+def run(mode: str, rows, args) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline = DataPipeline(os.path.join(tmp, "products.db"))
+        times = []
+        for _ in range(2):
+            start = time.perf_counter()
+            if mode == "per_item":
+                produce(rows, args.threads, pipeline.write_row)
+            elif mode == "writer":
+                results: queue.Queue = queue.Queue()
+                writer = DBWriter(pipeline.db_path, results, pipeline=pipeline,
+                                  batch_size=args.batch_size, max_delay=args.max_delay_ms / 1000)
+                writer.start()
+                produce(rows, args.threads, lambda r: results.put(("row", r)))
+                writer.close()
+            else:
+                pipeline.write_rows(rows)
+            times.append(time.perf_counter() - start)
+        return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--max-delay-ms", type=float, default=500)
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = make_rows(DataPipeline(os.path.join(tmp, "rows.db")), args.items)
+
+    print(f"{args.items} products, {args.threads} producer threads")
+    print(f"{'mode':<10} {'insert':>10} {'revisit':>10} {'rows/s':>10}")
+    for mode in ("per_item", "writer", "batch"):
+        first, second = run(mode, rows, args)
+        print(f"{mode:<10} {first:>9.2f}s {second:>9.2f}s {args.items / first:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
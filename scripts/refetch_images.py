@@ -1,9 +1,16 @@
 import logging
+import sys
 import sqlite3
 import json
 import time
 import random
-from playwright.sync_api import sync_playwright
+from pathlib import Path
+
+# Add project root to sys.path to allow importing 'crawler' module
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from crawler.browser_pool import BrowserPool
 
 DB_PATH = "products.db"
 SUPPLIER = "Comfort Gifts"
@@ -23,28 +30,13 @@ def refetch_images():
     logger.info(f"Found {len(rows)} products missing images.")
     if not rows: return
 
-    with sync_playwright() as p:
-        # Launch options - trying to mimic a real user better
-        browser = p.chromium.launch(
-            headless=False,
-            slow_mo=50,
-            args=["--no-sandbox", "--disable-blink-features=AutomationControlled"]
-        )
-        context = browser.new_context(
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            viewport={"width": 1280, "height": 720}
-        )
-        
-        # Apply stealth manually-ish by ensuring navigator properties
-        page = context.new_page()
-        page.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', {
-                get: () => undefined
-            });
-        """)
-
-        updated_count = 0
+    # Pages come from the shared pool: stealth applied, health-checked and
+    # recycled, so a dead context is simply replaced on the next lease.
+    pool = BrowserPool(headless=False, pages_per_browser=1, max_navigations=50,
+                       slow_mo=50, args=["--no-sandbox"])
+    updated_count = 0
 
+    try:
         for i, row in enumerate(rows):
             rid = row['rowid']
             url = row['url']
@@ -53,29 +45,30 @@ def refetch_images():
             logger.info(f"[{i+1}/{len(rows)}] Processing SKU {sku}...")
             
             try:
-                # Go to page
-                page.goto(url, wait_until="domcontentloaded", timeout=30000)
-                
-                # Check for captcha title
-                if "Robot Challenge" in page.title() or "Access denied" in page.title():
-                    logger.warning("  -> Blocked. Retrying with delay...")
-                    time.sleep(5)
-                    page.reload(wait_until="domcontentloaded")
-                
-                # Explicit wait for the element we want
-                try:
-                    page.wait_for_selector("a.popup-image", timeout=5000)
-                except:
-                    # Ignore timeout, maybe logic below handles it
-                    pass
+                with pool.lease() as page:
+                    # Go to page
+                    page.goto(url, wait_until="domcontentloaded", timeout=30000)
+                    
+                    # Check for captcha title
+                    if "Robot Challenge" in page.title() or "Access denied" in page.title():
+                        logger.warning("  -> Blocked. Retrying with delay...")
+                        time.sleep(5)
+                        page.reload(wait_until="domcontentloaded")
+                    
+                    # Explicit wait for the element we want
+                    try:
+                        page.wait_for_selector("a.popup-image", timeout=5000)
+                    except:
+                        # Ignore timeout, maybe logic below handles it
+                        pass
 
-                # Extract
-                images = page.evaluate("""() => {
-                    let srcs = new Set();
-                    // Selector 1: Configuration default
-                    document.querySelectorAll('a.popup-image img').forEach(img => srcs.add(img.src));
-                    return Array.from(srcs).filter(s => s.includes('/image/') || s.includes('/cache/'));
-                }""")
+                    # Extract
+                    images = page.evaluate("""() => {
+                        let srcs = new Set();
+                        // Selector 1: Configuration default
+                        document.querySelectorAll('a.popup-image img').forEach(img => srcs.add(img.src));
+                        return Array.from(srcs).filter(s => s.includes('/image/') || s.includes('/cache/'));
+                    }""")
                 
                 if images:
                     logger.info(f"  -> Found {len(images)} images.")
@@ -90,14 +83,8 @@ def refetch_images():
                 
             except Exception as e:
                 logger.error(f"  -> Error: {e}")
-                # Re-create page if context died
-                if "Target closed" in str(e) or "Execution context" in str(e):
-                    try:
-                        page.close()
-                    except: pass
-                    page = context.new_page()
-
-        browser.close()
+    finally:
+        pool.close()
         
     logger.info(f"Refetch complete. Updated {updated_count} products.")
     conn.close()
@@ -1,12 +1,21 @@
 import logging
+import sys
 import sqlite3
 import json
 import time
 import random
-from playwright.sync_api import sync_playwright
+from pathlib import Path
+
+# Add project root to sys.path to allow importing 'crawler' module
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from crawler.browser_pool import BrowserPool
+from crawler.clearance import ClearanceManager
 
 DB_PATH = "products.db"
 SUPPLIER = "Comfort Gifts"
+BASE_URL = "https://www.comfort-gifts.com/"
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger()
@@ -23,39 +32,21 @@ def refetch_images_v3():
     logger.info(f"Found {len(rows)} products missing images.")
     if not rows: return
 
-    # Use a persistent context to keep cookies/session alive
-    user_data_dir = "./browser_data"
-    
-    # User provided raw cookie string (from fix_language.py)
-    raw_cookie = 'currency=ILS; _gid=GA1.2.2000003724.1769685630; language=he-il; _ga_V7RXWZK55D=GS2.1.s1769685630$o4$g1$t1769687077$j59$l0$h0; _ga=GA1.1.1549641350.1769369680'
-    
-    cookies_to_add = []
-    for part in raw_cookie.split(';'):
-        if '=' in part:
-            name, value = part.strip().split('=', 1)
-            cookies_to_add.append({
-                "name": name,
-                "value": value,
-                "domain": ".comfort-gifts.com", 
-                "path": "/"
-            })
+    # Site preferences (Hebrew, ILS). Challenge cookies come from the clearance store.
+    preference_cookies = [
+        {"name": "language", "value": "he-il", "domain": ".comfort-gifts.com", "path": "/"},
+        {"name": "currency", "value": "ILS", "domain": ".comfort-gifts.com", "path": "/"},
+    ]
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch_persistent_context(
-            user_data_dir,
-            headless=False, 
-            slow_mo=50,    
-            args=["--no-sandbox", "--disable-blink-features=AutomationControlled"],
-            viewport={"width": 1280, "height": 800}
-        )
-        
-        # Inject cookies
-        browser.add_cookies(cookies_to_add)
-        
-        page = browser.pages[0]
-        
-        updated_count = 0
+    # Leased pages are recycled every 50 navigations, so cookies are
+    # injected on every lease rather than once per browser. Two pages so a
+    # re-solve can lease its own page while one is held.
+    pool = BrowserPool(headless=False, pages_per_browser=2, max_navigations=50)
+    clearance = ClearanceManager(pool)
+    updated_count = 0
 
+    try:
+        clearance.solve(BASE_URL)
         for i, row in enumerate(rows):
             rid = row['rowid']
             url = row['url']
@@ -64,35 +55,42 @@ def refetch_images_v3():
             logger.info(f"[{i+1}/{len(rows)}] Processing SKU {sku}...")
             
             try:
-                # Navigate
-                page.goto(url, wait_until="domcontentloaded", timeout=45000)
-                
-                # Check for image selector
-                # We wait for EITHER the image OR a captcha title
-                found_img = False
-                try:
-                    page.wait_for_selector("a.popup-image", timeout=5000)
-                    found_img = True
-                except:
-                    # If not found immediately, check if we are blocked
-                    title = page.title()
-                    if "Robot" in title or "Access denied" in title:
-                        logger.warning("  -> Blocked. Pausing 10s...")
-                        time.sleep(10)
-                        page.reload()
-                        try:
-                            page.wait_for_selector("a.popup-image", timeout=5000)
-                            found_img = True
-                        except: pass
+                with pool.lease() as page:
+                    page.context.add_cookies(preference_cookies)
+                    clearance.apply_to_page(page, url)
 
-                # Extract
-                if found_img:
-                    images = page.evaluate("""() => {
-                        let srcs = new Set();
-                        document.querySelectorAll('a.popup-image img').forEach(img => srcs.add(img.src));
-                        return Array.from(srcs).filter(s => s.includes('/image/') || s.includes('/cache/'));
-                    }""")
+                    # Navigate
+                    page.goto(url, wait_until="domcontentloaded", timeout=45000)
                     
+                    # Check for image selector
+                    # We wait for EITHER the image OR a captcha title
+                    found_img = False
+                    try:
+                        page.wait_for_selector("a.popup-image", timeout=5000)
+                        found_img = True
+                    except:
+                        # If not found immediately, check if we are blocked
+                        title = page.title()
+                        if "Robot" in title or "Access denied" in title:
+                            logger.warning("  -> Blocked. Re-solving challenge...")
+                            clearance.solve(url, force=True)
+                            clearance.apply_to_page(page, url)
+                            page.reload()
+                            try:
+                                page.wait_for_selector("a.popup-image", timeout=5000)
+                                found_img = True
+                            except: pass
+
+                    # Extract
+                    images = []
+                    if found_img:
+                        images = page.evaluate("""() => {
+                            let srcs = new Set();
+                            document.querySelectorAll('a.popup-image img').forEach(img => srcs.add(img.src));
+                            return Array.from(srcs).filter(s => s.includes('/image/') || s.includes('/cache/'));
+                        }""")
+                        
+                if found_img:
                     if images:
                         logger.info(f"  -> Found {len(images)} images.")
                         cursor.execute("UPDATE products SET images = ? WHERE rowid = ?", (json.dumps(images), rid))
@@ -105,14 +103,13 @@ def refetch_images_v3():
                     
             except Exception as e:
                 logger.error(f"  -> Failed: {e}")
-                # If context crashes, we might need to recreate, but persistent context is hard to recreate in loop
-                # Just continue
+                # A crashed context is replaced by the pool on the next lease
                 pass
                 
             # Random delay
             time.sleep(random.uniform(1, 3))
-
-        browser.close()
+    finally:
+        pool.close()
         
     logger.info(f"Refetch complete. Updated {updated_count} products.")
     conn.close()
@@ -5,7 +5,7 @@ import logging
 import sqlite3
 import glob
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 from fastapi import FastAPI, HTTPException, Body, UploadFile, File, Form
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, PlainTextResponse
@@ -115,6 +115,41 @@ def get_status():
         "has_category": has_category
     }
 
+@app.get("/api/runs")
+def list_crawl_runs(supplier: Optional[str] = None, limit: int = 20):
+    """Latest crawl runs (throughput, outcomes, product changes), newest first"""
+    from crawler.runs import list_runs
+    if not os.path.exists(DB_FILE):
+        return []
+    return list_runs(DB_FILE, supplier=supplier, limit=limit)
+
+@app.get("/api/runs/{run_id}")
+def get_crawl_run(run_id: int):
+    """One run with its full report (fetch tiers, per-phase latency percentiles)"""
+    from crawler.runs import get_run
+    run = get_run(DB_FILE, run_id) if os.path.exists(DB_FILE) else None
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+@app.get("/api/changes")
+def list_product_changes(since: str, until: Optional[str] = None, supplier: Optional[str] = None, limit: int = 1000):
+    """Products inserted or changed since `since` (ISO time or unix seconds), with only the changed fields"""
+    from crawler.history import changes
+    from crawler.utils import slugify_supplier
+    if not os.path.exists(DB_FILE):
+        return []
+    return changes(DB_FILE, since, until, supplier_slug=slugify_supplier(supplier) if supplier else None, limit=limit)
+
+@app.get("/api/products/{catalog_id}/at")
+def get_product_at(catalog_id: str, at: str):
+    """A product's tracked fields as they were at `at`, rebuilt from product_changes"""
+    from crawler.history import product_at
+    state = product_at(DB_FILE, catalog_id, at) if os.path.exists(DB_FILE) else None
+    if state is None:
+        raise HTTPException(status_code=404, detail="No history for this product at that time")
+    return state
+
 @app.get("/api/logs")
 def get_logs(lines: int = 50):
     if not os.path.exists(LOG_FILE):
@@ -129,7 +164,9 @@ def get_logs(lines: int = 50):
         return PlainTextResponse(f"Error reading logs: {str(e)}")
 
 @app.post("/api/start")
-def start_crawler(config_file: str = Body(..., embed=True)):
+def start_crawler(config_file: Optional[str] = Body(None, embed=True),
+                  config_files: Optional[List[str]] = Body(None, embed=True)):
+    """One supplier (`config_file`), or several crawled together in one run (`config_files`)"""
     global crawler_process
     
     # Don't start if already running
@@ -137,11 +174,16 @@ def start_crawler(config_file: str = Body(..., embed=True)):
     if status["running"]:
         return {"status": "error", "message": "Crawler already running"}
     
-    cmd = [
-        "python3", "main.py",
-        "--config", config_file,
-        "--db", DB_FILE
-    ]
+    if config_files:
+        cmd = ["python3", "main.py", "--configs", *config_files, "--db", DB_FILE]
+    elif config_file:
+        cmd = [
+            "python3", "main.py",
+            "--config", config_file,
+            "--db", DB_FILE
+        ]
+    else:
+        return {"status": "error", "message": "No config given"}
     
     # Open log file for appending
     log_fd = open(LOG_FILE, "a")
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import yaml
+from crawler.archive import PageArchive
+from crawler.core import CrawlerEngine
+from crawler.fetcher import FetchResult
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestPageArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive = PageArchive(os.path.join(self.tmp.name, "pages.db"), codec="zlib")
+
+    def tearDown(self):
+        self.archive.close()
+        self.tmp.cleanup()
+
+    def test_identical_bodies_stored_once(self):
+        html = "<html>" + "<p>same</p>" * 500 + "</html>"
+        self.archive.store(FetchResult(url="https://example.com/a", html=html, status=200, tier="http"), "S")
+        self.archive.store(FetchResult(url="https://example.com/b", html=html, status=200, tier="browser"), "S")
+        self.assertEqual(self.archive.stats["stored"], 1)
+        self.assertEqual(self.archive.stats["deduped"], 1)
+        self.assertLess(self.archive.stats["stored_bytes"], self.archive.stats["raw_bytes"])
+        pages = list(self.archive.latest("S"))
+        self.assertEqual([p[0] for p in pages], ["https://example.com/a", "https://example.com/b"])
+        self.assertEqual(pages[0][2], html)
+
+    def test_latest_fetch_wins(self):
+        self.archive.store(FetchResult(url="https://example.com/a", html="<h1>old</h1>"), "S")
+        self.archive.store(FetchResult(url="https://example.com/a#x", html="<h1>new</h1>"), "S")
+        self.archive.store(FetchResult(url="https://example.com/c", html="<h1>other</h1>"), "T")
+        self.assertEqual([p[2] for p in self.archive.latest("S")], ["<h1>new</h1>"])
+
+    def test_failed_fetch_not_archived(self):
+        self.archive.store(FetchResult(url="https://example.com/a"), "S")
+        self.assertEqual(list(self.archive.latest()), [])
+
+
+class TestReplay(unittest.TestCase):
+    def test_replay_parses_archived_product(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(ROOT, "config", "mock.yaml")) as f:
+                config = yaml.safe_load(f)
+            config["db_path"] = os.path.join(tmp, "products.db")
+            engine = CrawlerEngine(config)
+            with open(os.path.join(ROOT, "tests", "mock_site", "product1.html")) as f:
+                html = f.read()
+            engine.archive.store(FetchResult(url="http://localhost:8000/product1.html", html=html,
+                                             status=200, tier="http"), config["supplier"])
+
+            engine.replay()
+
+            conn = sqlite3.connect(config["db_path"])
+            rows = conn.execute("SELECT sku FROM products").fetchall()
+            conn.close()
+            engine.archive.close()
+            self.assertEqual(len(rows), 1)
+            self.assertTrue(os.path.exists(os.path.join(tmp, "products.archive.db")))
+
+    def test_replay_keeps_newer_last_seen(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(ROOT, "config", "mock.yaml")) as f:
+                config = yaml.safe_load(f)
+            config["db_path"] = os.path.join(tmp, "products.db")
+            with open(os.path.join(ROOT, "tests", "mock_site", "product1.html")) as f:
+                html = f.read()
+            engine = CrawlerEngine(config)
+            engine.archive.store(FetchResult(url="http://localhost:8000/product1.html", html=html,
+                                             status=200, tier="http"), config["supplier"])
+            engine.replay()
+            engine.archive.close()
+
+            # Refreshed since (a 304 is never archived); then replayed unchanged, and replayed changed
+            later = "2099-01-01 00:00:00+00:00"
+            for content_hash in (None, "stale"):
+                conn = sqlite3.connect(config["db_path"])
+                conn.execute("UPDATE products SET last_seen_at = ?, content_hash = COALESCE(?, content_hash)",
+                             (later, content_hash))
+                conn.commit()
+                conn.close()
+                engine = CrawlerEngine(config)
+                engine.replay()
+                engine.archive.close()
+                conn = sqlite3.connect(config["db_path"])
+                self.assertEqual(conn.execute("SELECT last_seen_at FROM products").fetchall(), [(later,)])
+                conn.close()
+
+    def test_replay_restores_listing_cards(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config = {"supplier": "Shop", "base_url": "https://shop.example/", "allowed_domains": ["shop.example"],
+                      "category_url_patterns": ["/category/"], "product_url_patterns": ["/product/"],
+                      "selectors": {"title": "h1", "sku": ".sku", "product_link": "a.go"},
+                      "listing": {"card": ".card", "card_fields": {"price": ".cost"}},
+                      "db_path": os.path.join(tmp, "products.db"),
+                      "archive": {"enabled": True, "path": os.path.join(tmp, "pages.db")}}
+            engine = CrawlerEngine(config)
+            listing = "<div class='card'><a class='go' href='/item/C3'>C</a><span class='cost'>12.5</span></div>"
+            engine.archive.store(FetchResult(url="https://shop.example/category/bags", html=listing,
+                                             status=200, tier="http"), "Shop")
+            # Harvested from a card only: the URL is not a product URL
+            engine.archive.store(FetchResult(url="https://shop.example/item/C3", html="<h1>Bag C</h1><b class='sku'>C3</b>",
+                                             status=200, tier="http"), "Shop")
+            engine.replay()
+            engine.archive.close()
+            conn = sqlite3.connect(config["db_path"])
+            self.assertEqual(conn.execute("SELECT sku, title, price FROM products").fetchall(), [("C3", "Bag C", 12.5)])
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from contextlib import asynccontextmanager
+
+import httpx
+
+from crawler.async_core import AsyncCrawlerEngine
+from crawler.frontier import DONE, FAILED, IN_FLIGHT, PENDING
+
+HOME = ('<html><body><a href="/product/A1">A</a><a href="/product/B2">B</a>'
+        '<a href="/product/GONE">Gone</a></body></html>')
+CHALLENGE = "<html><head><title>Robot Challenge Screen</title></head><body>sgcaptcha</body></html>"
+
+
+def product(sku):
+    return f"<html><body><h1>Bag {sku}</h1><span class='price'>10</span></body></html>"
+
+
+class FakePage:
+    """Just enough of a Playwright page for AsyncCrawlerEngine._fetch_dynamic"""
+
+    def __init__(self, visits, challenge=False):
+        self.visits = visits
+        self.url = None
+        self.context = self
+        self.challenge = challenge
+
+    async def cookies(self):
+        return [{"name": "_sgc", "value": "ok", "domain": ".shop.example", "path": "/", "expires": -1}]
+
+    async def evaluate(self, expression):
+        return "FakeBrowser/1.0"
+
+    async def add_cookies(self, cookies):
+        pass
+
+    async def clear_cookies(self):
+        pass
+
+    async def goto(self, url, **kwargs):
+        self.url = url
+        self.visits.append(url)
+
+    async def title(self):
+        # The challenge screen clears after one look
+        challenge, self.challenge = self.challenge, False
+        return "Robot Challenge Screen" if challenge else ""
+
+    async def content(self):
+        return product(self.url.rsplit("/", 1)[1])
+
+    async def wait_for_selector(self, selector, **kwargs):
+        pass
+
+
+class FakePool:
+    resource_policy = None
+    stats = {}
+
+    def __init__(self, challenge=False):
+        self.visits = []
+        self.challenge = challenge
+        self.solves = []
+
+    @asynccontextmanager
+    async def lease(self):
+        yield FakePage(self.visits, self.challenge)
+
+    # acquire / release: the sync view (BrowserPool.over) clearance solves lease through
+    async def acquire(self):
+        page = FakePage(self.solves)
+
+        async def content():
+            return CHALLENGE  # the solve does not clear: the URL goes to the browser tier
+        page.content = content
+        return type("Slot", (), {"page": page})()
+
+    async def release(self, slot, healthy=True):
+        pass
+
+    async def close(self):
+        pass
+
+
+class TestAsyncCrawl(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = {
+            "supplier": "Shop",
+            "base_url": "https://shop.example/",
+            "allowed_domains": ["shop.example"],
+            "product_url_patterns": ["/product/"],
+            "sku_url_regex": r"/product/([A-Z0-9]+)",
+            "selectors": {"title": "h1", "price": ".price"},
+            "rate_limit": {"initial_rps": 100, "max_rps": 100, "burst": 10, "penalty": 0},
+            "db_path": os.path.join(self.tmp.name, "products.db"),
+            "archive": {"enabled": False},
+            "num_workers": 2,
+        }
+        self.requests = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def handler(self, request):
+        self.requests.append(request.url.path)
+        if request.url.path == "/":
+            return httpx.Response(200, text=HOME)
+        if request.url.path == "/product/B2":
+            return httpx.Response(403, text=CHALLENGE)
+        if request.url.path == "/product/GONE":
+            return httpx.Response(404, text="Not found")
+        return httpx.Response(200, text=product("A1"))
+
+    def test_http_browser_escalation_and_frontier(self):
+        engine = AsyncCrawlerEngine(self.config)
+        engine._transport = httpx.MockTransport(self.handler)
+        engine.async_pool = FakePool()
+        engine.run()
+
+        self.assertEqual(sorted(self.requests), ["/", "/product/A1", "/product/B2", "/product/GONE"])
+        # Only the challenged product went to the browser, not the 404
+        self.assertEqual(engine.async_pool.visits, ["https://shop.example/product/B2"])
+        self.assertEqual(engine.tier_counts["http"], 2)
+        self.assertEqual(engine.tier_counts["browser"], 1)
+        conn = sqlite3.connect(self.config["db_path"])
+        self.assertEqual(conn.execute("SELECT sku, title FROM products ORDER BY sku").fetchall(),
+                         [("A1", "Bag A1"), ("B2", "Bag B2")])
+        conn.close()
+        # Every leased URL was finished; the 404 as a plain failure
+        self.assertEqual(engine.frontier.counts(), {PENDING: 0, IN_FLIGHT: 0, DONE: 3, FAILED: 1})
+
+    def test_browser_tier_shares_clearance(self):
+        self.config["clearance"] = {"enabled": True, "path": os.path.join(self.tmp.name, "clearance.json")}
+        engine = AsyncCrawlerEngine(self.config)
+        engine._transport = httpx.MockTransport(self.handler)
+        engine.async_pool = FakePool(challenge=True)
+        engine.run()
+
+        # The HTTP tier's solve leased from the async pool: no second browser pool
+        self.assertIs(engine.clearance.pool._async_pool, engine.async_pool)
+        self.assertEqual(engine.async_pool.solves, ["https://shop.example/product/B2"])
+        # The browser tier got past the challenge and stored the cookies for everyone
+        clearance = engine.clearance.get("https://shop.example/product/A1")
+        self.assertEqual(clearance.user_agent, "FakeBrowser/1.0")
+        self.assertEqual([c["name"] for c in clearance.cookies], ["_sgc"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import unittest
+from crawler.browser_pool import AsyncBrowserPool, BrowserPool, pool_options
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.closed = False
+        self.handlers = []
+        self.url = "about:blank"
+
+    def on(self, event, handler):
+        self.handlers.append(handler)
+
+    def set_default_timeout(self, ms):
+        pass
+
+    def is_closed(self):
+        return self.closed
+
+    async def evaluate(self, expr):
+        return 1
+
+    async def goto(self, url, **kwargs):
+        self.url = url
+        for handler in self.handlers:
+            handler(self)
+        return None
+
+    async def title(self):
+        return f"Title of {self.url}"
+
+
+class FakeContext:
+    def __init__(self):
+        self.closed = False
+
+    async def new_page(self):
+        return FakePage(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    def is_connected(self):
+        return True
+
+    async def new_context(self, **kwargs):
+        ctx = FakeContext()
+        self.contexts.append(ctx)
+        return ctx
+
+    async def close(self):
+        pass
+
+
+class FakeAsyncPool(AsyncBrowserPool):
+    """Pool wired to fake browsers instead of launching Chromium"""
+
+    async def start(self):
+        if self._playwright:
+            return
+        self._playwright = object()
+        self._browsers = [FakeBrowser() for _ in range(self.num_browsers)]
+        self._idle = asyncio.Queue()
+
+    async def close(self):
+        self._closed = True
+        self._playwright = None
+
+
+class TestAsyncBrowserPool(unittest.TestCase):
+    def test_recycles_after_max_navigations(self):
+        async def scenario():
+            pool = FakeAsyncPool(pages_per_browser=1, max_navigations=2)
+            async with pool.lease() as page:
+                first_context = page.context
+                await page.goto("https://example.com/1")
+                await page.goto("https://example.com/2")
+            async with pool.lease() as page:
+                self.assertIsNot(page.context, first_context)
+            self.assertTrue(first_context.closed)
+            self.assertEqual(pool.stats["recycled"], 1)
+            self.assertEqual(pool.stats["leases"], 2)
+        asyncio.run(scenario())
+
+    def test_leases_are_bounded_by_capacity(self):
+        async def scenario():
+            pool = FakeAsyncPool(browsers=2, pages_per_browser=1)
+            a = await pool.acquire()
+            b = await pool.acquire()
+            self.assertNotEqual(a.browser_index, b.browser_index)
+            waiter = asyncio.create_task(pool.acquire())
+            await asyncio.sleep(0.05)
+            self.assertFalse(waiter.done())
+            await pool.release(a)
+            c = await asyncio.wait_for(waiter, timeout=2)
+            self.assertIs(c.page, a.page)
+        asyncio.run(scenario())
+
+    def test_unhealthy_page_is_replaced(self):
+        async def scenario():
+            pool = FakeAsyncPool(pages_per_browser=1)
+            async with pool.lease() as page:
+                page.closed = True
+                dead = page
+            async with pool.lease() as page:
+                self.assertIsNot(page, dead)
+            self.assertEqual(pool.stats["unhealthy"], 1)
+        asyncio.run(scenario())
+
+
+class TestLaunchOptions(unittest.TestCase):
+    def test_config_reaches_chromium_launch(self):
+        launched = {}
+
+        class Chromium:
+            async def launch(self, **kwargs):
+                launched.update(kwargs)
+                return FakeBrowser()
+
+        pool = AsyncBrowserPool(**pool_options({"browser_pool": {"slow_mo": 50, "args": ["--no-sandbox"]}}))
+        pool._playwright = type("Playwright", (), {"chromium": Chromium()})()
+        asyncio.run(pool._launch())
+        self.assertEqual(launched["slow_mo"], 50)
+        self.assertEqual(launched["args"], ["--disable-blink-features=AutomationControlled", "--no-sandbox"])
+
+
+class TestSyncBrowserPool(unittest.TestCase):
+    def test_threads_share_pages_through_proxy(self):
+        pool = BrowserPool(pages_per_browser=2)
+        pool._async_pool = FakeAsyncPool(pages_per_browser=2)
+        titles = []
+
+        def work(i):
+            with pool.lease() as page:
+                page.goto(f"https://example.com/{i}")
+                titles.append(page.title())
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        pool.close()
+
+        self.assertEqual(len(titles), 6)
+        self.assertTrue(all(t.startswith("Title of https://example.com/") for t in titles))
+        self.assertEqual(pool.stats["leases"], 6)
+        self.assertLessEqual(pool._async_pool._created, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+from crawler.clearance import ClearanceManager, domain_key
+from crawler.fetcher import HTMLFetcher
+
+
+class FakeContext:
+    def __init__(self):
+        self.added = []
+
+    def cookies(self):
+        return [{"name": "_sgc", "value": "ok", "domain": ".comfort-gifts.com", "path": "/", "expires": time.time() + 600}]
+
+    def add_cookies(self, cookies):
+        self.added.extend(cookies)
+
+
+class FakePage:
+    def __init__(self):
+        self.context = FakeContext()
+
+    def goto(self, url, **kwargs):
+        time.sleep(0.05)
+
+    def title(self):
+        return "Comfort"
+
+    def content(self):
+        return "<h1>Home</h1>"
+
+    def evaluate(self, expr):
+        return "FakeAgent/1.0"
+
+
+class FakePool:
+    def __init__(self):
+        self.leases = 0
+
+    @contextmanager
+    def lease(self):
+        self.leases += 1
+        yield FakePage()
+
+
+class TestClearanceManager(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "clearance.json")
+
+    def test_domain_key(self):
+        self.assertEqual(domain_key("https://www.Comfort-Gifts.com/x"), "comfort-gifts.com")
+        self.assertEqual(domain_key("https://comfort-gifts.com/"), "comfort-gifts.com")
+
+    def test_concurrent_workers_share_one_solve(self):
+        pool = FakePool()
+        manager = ClearanceManager(pool, path=self.path)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(manager.solve("https://www.comfort-gifts.com/p/1")))
+                   for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(pool.leases, 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(results[0].user_agent, "FakeAgent/1.0")
+        # Expiry is capped by the earliest cookie expiry
+        self.assertLess(results[0].expires_at, time.time() + 601)
+
+    def test_expiry_ignores_tracking_and_other_domain_cookies(self):
+        now = time.time()
+        context = FakeContext()
+        context.cookies = lambda: [
+            {"name": "_sgc", "value": "ok", "domain": ".comfort-gifts.com", "expires": now + 3600},
+            {"name": "_gat_UA-1", "value": "1", "domain": ".comfort-gifts.com", "expires": now + 60},
+            {"name": "_ga", "value": "GA1", "domain": ".comfort-gifts.com", "expires": now + 1800},
+            {"name": "session", "value": "s", "domain": "www.comfort-gifts.com", "expires": -1},
+            {"name": "IDE", "value": "x", "domain": ".doubleclick.net", "expires": now + 120},
+        ]
+        page = FakePage()
+        page.context = context
+        manager = ClearanceManager(FakePool(), path=self.path, ttl=86400)
+        clearance = manager.store_from_page(page, "https://www.comfort-gifts.com/")
+        self.assertAlmostEqual(clearance.expires_at, now + 3600, delta=1)
+        self.assertFalse(clearance.expired)
+
+    def test_persisted_clearance_survives_restart(self):
+        ClearanceManager(FakePool(), path=self.path).solve("https://comfort-gifts.com/")
+        pool = FakePool()
+        manager = ClearanceManager(pool, path=self.path)
+        self.assertIsNotNone(manager.get("https://www.comfort-gifts.com/p/2"))
+        manager.solve("https://www.comfort-gifts.com/p/2")
+        self.assertEqual(pool.leases, 0)
+
+    def test_http_tier_uses_clearance_after_one_solve(self):
+        manager = ClearanceManager(FakePool(), path=self.path)
+        fetcher = HTMLFetcher(clearance=manager)
+        responses = [("<title>Robot Challenge Screen</title>", 200), ("<h1>Pen</h1>", 200), ("<h1>Mug</h1>", 200)]
+        with mock.patch.object(fetcher, "fetch_static", side_effect=responses), \
+             mock.patch.object(fetcher, "fetch_dynamic") as dyn:
+            first = fetcher.fetch_page("https://www.comfort-gifts.com/p/1")
+            second = fetcher.fetch_page("https://www.comfort-gifts.com/p/2")
+        dyn.assert_not_called()
+        self.assertEqual((first.tier, second.tier), ("http", "http"))
+        self.assertEqual(fetcher.session.headers["User-Agent"], "FakeAgent/1.0")
+        self.assertEqual(manager.stats["solved"], 1)
+        fetcher.close()
+
+    def test_http_tier_gives_up_when_clearance_does_not_help(self):
+        manager = ClearanceManager(FakePool(), path=self.path)
+        fetcher = HTMLFetcher(clearance=manager)
+        challenge = ("<title>Robot Challenge Screen</title>", 200)
+        with mock.patch.object(fetcher, "fetch_static", return_value=challenge) as static, \
+             mock.patch.object(fetcher, "fetch_dynamic", return_value="<h1>Pen</h1>"):
+            for i in range(ClearanceManager.MAX_HTTP_FAILURES + 2):
+                fetcher.fetch_page(f"https://www.comfort-gifts.com/p/{i}")
+            calls_before = static.call_count
+            result = fetcher.fetch_page("https://www.comfort-gifts.com/p/last")
+        self.assertEqual(result.tier, "browser")
+        self.assertEqual(static.call_count, calls_before)
+        self.assertFalse(manager.http_usable("https://www.comfort-gifts.com/"))
+        fetcher.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from unittest import mock
+from crawler.fetcher import HTMLFetcher, is_challenge_page
+
+
+class TestTieredFetch(unittest.TestCase):
+    def setUp(self):
+        self.fetcher = HTMLFetcher()
+
+    def tearDown(self):
+        self.fetcher.close()
+
+    def test_challenge_markers(self):
+        self.assertTrue(is_challenge_page("<title>Robot Challenge Screen</title>"))
+        self.assertTrue(is_challenge_page("<script src='/.well-known/sgcaptcha/'></script>"))
+        self.assertTrue(is_challenge_page("<h1>Access Denied</h1>"))
+        self.assertFalse(is_challenge_page("<h1>Pen</h1>"))
+        self.assertFalse(is_challenge_page(""))
+
+    def test_http_tier_serves_clean_page(self):
+        with mock.patch.object(self.fetcher, "fetch_static", return_value=("<h1>Pen</h1>", 200)), \
+             mock.patch.object(self.fetcher, "fetch_dynamic") as dyn:
+            result = self.fetcher.fetch_page("https://example.com/product/1")
+        self.assertEqual(result.tier, "http")
+        self.assertEqual(result.html, "<h1>Pen</h1>")
+        dyn.assert_not_called()
+        self.assertEqual(self.fetcher.tier_counts["http"], 1)
+
+    def test_challenge_escalates_to_browser(self):
+        challenge = "<title>Robot Challenge Screen</title>"
+        with mock.patch.object(self.fetcher, "fetch_static", return_value=(challenge, 200)), \
+             mock.patch.object(self.fetcher, "fetch_dynamic", return_value="<h1>Pen</h1>") as dyn:
+            result = self.fetcher.fetch_page("https://example.com/product/1")
+        dyn.assert_called_once()
+        self.assertEqual(result.tier, "browser")
+        self.assertEqual(self.fetcher.tier_counts["browser"], 1)
+
+    def test_http_errors_are_not_escalated(self):
+        for status in (404, 410, 500):
+            with mock.patch.object(self.fetcher, "fetch_static", return_value=(None, status)), \
+                 mock.patch.object(self.fetcher, "fetch_dynamic") as dyn:
+                result = self.fetcher.fetch_page("https://example.com/product/gone")
+            dyn.assert_not_called()
+            self.assertEqual((result.tier, result.status), ("failed", status))
+        # A dead connection (no status) may still be a block: the browser gets a try
+        with mock.patch.object(self.fetcher, "fetch_static", return_value=(None, None)), \
+             mock.patch.object(self.fetcher, "fetch_dynamic", return_value="<h1>Pen</h1>") as dyn:
+            self.assertEqual(self.fetcher.fetch_page("https://example.com/product/1").tier, "browser")
+        dyn.assert_called_once()
+
+    def test_dynamic_skips_http_tier(self):
+        with mock.patch.object(self.fetcher, "fetch_static") as static, \
+             mock.patch.object(self.fetcher, "fetch_dynamic", return_value=None):
+            result = self.fetcher.fetch_page("https://example.com/product/1", dynamic=True)
+        static.assert_not_called()
+        self.assertEqual(result.tier, "failed")
+        self.assertFalse(result.ok)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from crawler.core import CrawlerEngine
+from crawler.freshness import DAY, FreshnessScheduler
+from crawler.pipeline import DataPipeline
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class TestFreshness(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "products.db")
+        self.pipeline = DataPipeline(self.db_path)
+        self.scheduler = FreshnessScheduler(self.db_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def visit(self, sku: str, day: int, price: float):
+        self.pipeline.process_item({"url": f"https://shop.example/product/{sku}", "supplier": "Shop",
+                                    "sku": sku, "title": f"Item {sku}", "price": price},
+                                   seen_at=START + timedelta(days=day))
+
+    def history(self, sku: str):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute("SELECT checks, changes FROM product_freshness WHERE catalog_id = ?",
+                                (f"shop:{sku}",)).fetchone()
+        finally:
+            conn.close()
+
+    def test_change_history_recorded(self):
+        for day, price in enumerate([10, 11, 11, 12]):
+            self.visit("A1", day, price)
+        self.assertEqual(self.history("A1"), (3, 2))
+        self.pipeline.touch_url("https://shop.example/product/A1")
+        self.assertEqual(self.history("A1"), (4, 2))
+
+    def test_intervals_adapt(self):
+        default = self.scheduler.interval(0, 0, 0)
+        self.assertEqual(default, 7 * DAY)
+        # Changed on every daily visit: revisit within a day; never changed: back off gradually
+        self.assertLess(self.scheduler.interval(10, 10, 10 * DAY), DAY)
+        quiet = [self.scheduler.interval(n, 0, n * 7 * DAY) for n in (1, 5, 50)]
+        self.assertTrue(default < quiet[0] < quiet[1] < quiet[2] == self.scheduler.max_interval)
+
+    def test_budget_picks_volatile_products(self):
+        for day in range(6):
+            self.visit("HOT", day, 10 + day)   # new price every day
+            self.visit("COLD", day, 10)        # never changes
+        self.visit("NEW", 5, 10)               # no history yet
+        now = (START + timedelta(days=7)).timestamp()
+        stale = self.scheduler.most_stale(2, now=now)
+        self.assertEqual([url.rsplit("/", 1)[1] for url, _ in stale], ["HOT", "NEW"])
+        self.assertGreater(stale[0][1], stale[1][1])
+
+    def test_engine_seeds_budget(self):
+        for sku, price in (("HOT", 11), ("COLD", 10)):
+            self.visit(sku, 0, 10)
+            self.visit(sku, 1, price)
+        engine = CrawlerEngine({"supplier": "Shop", "base_url": "https://shop.example/",
+                                "allowed_domains": ["shop.example"], "product_url_patterns": ["/product/"],
+                                "db_path": self.db_path, "archive": {"enabled": False}})
+        engine._open_frontier()
+        self.assertEqual(engine.frontier.lease(), "https://shop.example/")
+        engine.seed_stale(1, now=(START + timedelta(days=3)).timestamp())
+        self.assertEqual(engine.frontier.lease(), "https://shop.example/product/HOT")
+        self.assertIsNone(engine.frontier.lease())
+        engine.frontier.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
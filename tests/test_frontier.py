@@ -0,0 +1,174 @@
+import os
+import tempfile
+import unittest
+from crawler.canonical import UrlCanonicalizer
+from crawler.core import CrawlerEngine
+from crawler.frontier import Frontier
+from crawler.url_classifier import UrlClassifier
+
+
+class TestFrontier(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "frontier.db")
+        self.frontier = Frontier(self.path)
+
+    def tearDown(self):
+        self.frontier.close()
+        self.tmp.cleanup()
+
+    def test_urls_admitted_once(self):
+        self.assertTrue(self.frontier.add("https://example.com/a"))
+        self.assertFalse(self.frontier.add("https://example.com/a"))
+        self.assertEqual(self.frontier.add_many(["https://example.com/a", "https://example.com/b"]), 1)
+        self.assertEqual(self.frontier.pending, 2)
+
+    def test_lease_lifecycle(self):
+        self.frontier.add_many(["https://example.com/a", "https://example.com/b"])
+        a = self.frontier.lease()
+        b = self.frontier.lease()
+        self.assertEqual((a, b), ("https://example.com/a", "https://example.com/b"))
+        self.assertIsNone(self.frontier.lease())
+        self.frontier.complete(a)
+        self.frontier.fail(b)
+        self.assertEqual(self.frontier.counts(), {"pending": 0, "in_flight": 0, "done": 1, "failed": 1})
+        # Done URLs stay known: links to them are not re-admitted
+        self.assertFalse(self.frontier.add(a))
+
+    def test_resume_after_crash(self):
+        self.frontier.add_many(["https://example.com/a", "https://example.com/b", "https://example.com/c"])
+        self.frontier.complete(self.frontier.lease())
+        self.frontier.lease()  # in flight when the process dies
+        self.frontier.close()
+
+        self.frontier = Frontier(self.path)
+        self.assertEqual(self.frontier.counts(), {"pending": 1, "in_flight": 1, "done": 1, "failed": 0})
+        self.assertEqual(self.frontier.recover(), 1)
+        leased = {self.frontier.lease(), self.frontier.lease()}
+        self.assertEqual(leased, {"https://example.com/b", "https://example.com/c"})
+
+    def test_highest_priority_first(self):
+        self.frontier.add_many(["https://example.com/c1", "https://example.com/c2"], priority=50)
+        self.frontier.add("https://example.com/p1", priority=100, depth=3)
+        self.frontier.add("https://example.com/c3", priority=60)
+        order = [self.frontier.lease() for _ in range(4)]
+        self.assertEqual(order, ["https://example.com/p1", "https://example.com/c3",
+                                 "https://example.com/c1", "https://example.com/c2"])
+        self.assertEqual(self.frontier.depth("https://example.com/p1"), 3)
+
+    def test_spill_to_disk_keeps_every_link_in_order(self):
+        frontier = Frontier(os.path.join(self.tmp.name, "small.db"), heap_size=2)
+        urls = [(f"https://example.com/{i}", float(i % 7)) for i in range(50)]
+        for url, priority in urls:
+            frontier.add(url, priority=priority)
+        self.assertGreater(frontier.stats["spilled"], 0)
+        leased = []
+        while True:
+            url = frontier.lease()
+            if url is None:
+                break
+            leased.append(url)
+            if len(leased) == 10:
+                # Late high-priority discovery jumps the spilled backlog
+                frontier.add("https://example.com/late", priority=99)
+        self.assertEqual(len(leased), 51)
+        self.assertEqual(leased[10], "https://example.com/late")
+        rest = leased[:10] + leased[11:]
+        priorities = [dict(urls)[u] for u in rest]
+        self.assertEqual(priorities, sorted(priorities, reverse=True))
+        frontier.close()
+
+    def test_resume_keeps_priorities(self):
+        self.frontier.add("https://example.com/c", priority=50)
+        self.frontier.add("https://example.com/p", priority=100)
+        self.frontier.close()
+        self.frontier = Frontier(self.path)
+        self.frontier.add("https://example.com/base", priority=50)
+        self.assertEqual(self.frontier.lease(), "https://example.com/p")
+
+    def test_reset(self):
+        self.frontier.add("https://example.com/a")
+        self.frontier.reset()
+        self.assertEqual(self.frontier.pending, 0)
+        self.assertNotIn("https://example.com/a", self.frontier)
+
+    def test_release_returns_lease(self):
+        self.frontier.add("https://example.com/low", priority=10)
+        self.frontier.add("https://example.com/high", priority=90)
+        url = self.frontier.lease()
+        self.frontier.release(url)
+        self.assertEqual(self.frontier.counts()["in_flight"], 0)
+        self.assertEqual(self.frontier.lease(), "https://example.com/high")
+
+    def test_batched_transaction(self):
+        with self.frontier.transaction():
+            self.frontier.add_entries([("https://example.com/a", 10, 1), ("https://example.com/b", 20, 1)])
+            self.frontier.complete(self.frontier.lease())
+        self.frontier.close()
+        self.frontier = Frontier(self.path)
+        self.assertEqual(self.frontier.counts(), {"pending": 1, "in_flight": 0, "done": 1, "failed": 0})
+
+
+class TestCanonicalAdmission(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        classifier = UrlClassifier(product_patterns=["/product/"], allowed_domains=["example.com"],
+                                   sku_url_regex=r"(?:^|/)(\d+)[^/]*$")
+        canon = UrlCanonicalizer(strip_params=["sort"], sku_of=lambda u: classifier.classify(u).sku)
+        self.frontier = Frontier(os.path.join(self.tmp.name, "frontier.db"), canonicalize=canon)
+
+    def tearDown(self):
+        self.frontier.close()
+        self.tmp.cleanup()
+
+    def test_variants_collapse_to_one_fetch(self):
+        added = self.frontier.add_many([
+            "https://Example.com/category/pens/?utm_source=x",
+            "https://example.com/category/pens",
+            "https://example.com/category/pens?sort=price#top",
+            "https://example.com/category/pens?b=2&a=1",
+            "https://example.com/category/pens?a=1&b=2",
+        ])
+        self.assertEqual(added, 2)
+        self.assertEqual(self.frontier.lease(), "https://example.com/category/pens")
+        self.assertEqual(self.frontier.aliases, 3)
+
+    def test_sku_path_aliases(self):
+        self.assertTrue(self.frontier.add("https://example.com/product/123-blue-pen"))
+        self.assertFalse(self.frontier.add("https://example.com/product/sale/123-blue-pen-sale"))
+        # Seen again from another page: still one avoided fetch
+        self.assertFalse(self.frontier.add("https://example.com/product/sale/123-blue-pen-sale"))
+        self.assertTrue(self.frontier.add("https://example.com/product/124-red-pen"))
+        self.assertEqual(self.frontier.aliases, 1)
+        self.assertEqual(self.frontier.pending, 2)
+
+    def test_revisit_is_not_an_alias(self):
+        self.frontier.add("https://example.com/category/pens")
+        self.frontier.add("https://example.com/category/pens")
+        self.assertEqual(self.frontier.aliases, 0)
+
+
+class TestEngineDedupKeys(unittest.TestCase):
+    def test_keys_agree_with_extracted_skus(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        # Comfort-style rules: a broad numeric product pattern plus OpenCart query ids
+        engine = CrawlerEngine({"supplier": "Shop", "base_url": "https://shop.example/",
+                                "allowed_domains": ["shop.example"],
+                                "product_url_patterns": ["regex:/\\d+($|[/-])", "product_id="],
+                                "category_url_patterns": ["/category/"],
+                                "sku_url_regex": r"(?:product_id=|/)(\d+)(?:[^/]*$|&)",
+                                "db_path": os.path.join(tmp.name, "products.db"),
+                                "archive": {"enabled": False}})
+        canon = engine.frontier.canonicalize
+        url = "https://shop.example/index.php?route=product/product&product_id=42"
+        self.assertEqual(canon(url)[1], "sku:42")
+        self.assertEqual(canon(url)[1], f"sku:{engine._extract_sku_from_url(url)}")
+        self.assertEqual(canon("https://shop.example/42-blue-pen")[1], "sku:42")
+        # Numeric category and pagination URLs keep their own keys
+        self.assertEqual(canon("https://shop.example/category/42")[1], "https://shop.example/category/42")
+        self.assertEqual(canon("https://shop.example/pens/page/2")[1], "https://shop.example/pens/page/2")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from crawler.history import changes, product_at
+from crawler.pipeline import DataPipeline
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def day(n: float) -> datetime:
+    return START + timedelta(days=n)
+
+
+class TestProductHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "products.db")
+        self.pipeline = DataPipeline(self.db_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def visit(self, sku: str, n: int, supplier: str = "Shop", **fields):
+        self.pipeline.process_item(dict({"url": f"https://shop.example/product/{sku}", "supplier": supplier,
+                                         "sku": sku, "title": f"Item {sku}", "price": 10.0}, **fields),
+                                   seen_at=day(n))
+
+    def test_records_only_changed_fields(self):
+        self.visit("A1", 0)
+        self.visit("A1", 1)
+        self.visit("A1", 2, price=12.5)
+        self.visit("A1", 3, price=12.5, title="Item A1 v2", availability="out_of_stock")
+        self.visit("B1", 3, supplier="Other")
+
+        found = changes(self.db_path, day(1))
+        self.assertEqual([(c["catalog_id"], c["kind"]) for c in found],
+                         [("shop:A1", "changed"), ("shop:A1", "changed"), ("other:B1", "inserted")])
+        self.assertEqual([c["fields"] for c in found[:2]],
+                         [{"price": 12.5}, {"title": "Item A1 v2", "availability": "out_of_stock"}])
+        self.assertEqual((found[2]["fields"]["title"], found[2]["fields"]["price"]), ("Item B1", 10.0))
+        self.assertEqual(len(changes(self.db_path, day(0), until=day(2))), 1)
+        self.assertEqual([c["kind"] for c in changes(self.db_path, str(day(0).timestamp()), supplier_slug="shop")],
+                         ["inserted", "changed", "changed"])
+
+        self.assertIsNone(product_at(self.db_path, "shop:A1", day(-1)))
+        self.assertEqual(product_at(self.db_path, "shop:A1", day(1.5))["price"], 10.0)
+        state = product_at(self.db_path, "shop:A1", day(3))
+        self.assertEqual((state["price"], state["title"], state["availability"]), (12.5, "Item A1 v2", "out_of_stock"))
+
+    def test_baseline_for_products_stored_before_history(self):
+        self.visit("A1", 0)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("DELETE FROM product_changes")
+        conn.commit()
+        conn.close()
+
+        self.visit("A1", 5, price=8.0)
+        self.assertEqual([c["fields"] for c in changes(self.db_path, day(0))], [{"price": 8.0}])
+        # The state it was last seen in is where the deltas start
+        self.assertEqual(product_at(self.db_path, "shop:A1", day(1))["price"], 10.0)
+        self.assertEqual(product_at(self.db_path, "shop:A1", day(5))["price"], 8.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+from crawler.core import CrawlerEngine, PRIORITY_PRODUCT
+from crawler.listing import ListingHarvester
+from crawler.parser import HTMLParser
+
+LISTING = """
+<html><body>
+  <nav><a href="/category/bags">Bags</a><a href="/product/AD1">Deal of the day</a></nav>
+  <div class="card"><a class="go" href="/product/A1#reviews">A</a><span class="name">Bag A</span>
+    <span class="cost">$10.50</span><img src="/img/a.jpg"></div>
+  <div class="card"><a class="go" href="/product/B2">B</a><span class="name">Bag B</span></div>
+  <div class="pages"><a href="?page=1">1</a><a class="next" href="?page=2">2</a><a href="?page=3">3</a></div>
+</body></html>
+"""
+URL = "https://shop.example/category/bags"
+
+
+class TestListingHarvester(unittest.TestCase):
+    def test_cards_and_next_button(self):
+        harvester = ListingHarvester(card=".card", product_link="a.go",
+                                     card_fields={"title": ".name", "price": ".cost", "images": "img::src"},
+                                     pagination={"type": "next_button", "selector": "a.next"})
+        listing = harvester.harvest(HTMLParser(LISTING), URL)
+        self.assertEqual(listing.products, {
+            "https://shop.example/product/A1": {"title": "Bag A", "price": "$10.50", "images": ["/img/a.jpg"]},
+            "https://shop.example/product/B2": {"title": "Bag B"},
+        })
+        self.assertEqual(listing.pages, ["https://shop.example/category/bags?page=2"])
+
+    def test_product_link_and_numbered_pages(self):
+        harvester = ListingHarvester(product_link="a.go", pagination={"type": "numbered", "selector": ".pages a"})
+        listing = harvester.harvest(HTMLParser(LISTING), URL)
+        self.assertEqual(set(listing.products), {"https://shop.example/product/A1", "https://shop.example/product/B2"})
+        self.assertEqual(len(listing.pages), 3)
+
+    def test_from_config(self):
+        self.assertIsNone(ListingHarvester.from_config({"selectors": {"title": "h1"}}))
+        # polo.yaml style: product_link among the selectors
+        harvester = ListingHarvester.from_config({"selectors": {"product_link": "a.tablevel_2"}})
+        self.assertEqual(harvester.product_link, "a.tablevel_2")
+        self.assertIsNone(ListingHarvester.from_config({"pagination": {"selector": "a.next"}, "listing": {"enabled": False}}))
+        with self.assertRaises(ValueError):
+            ListingHarvester.from_config({"pagination": {"type": "infinite", "selector": "a.next"}})
+
+
+class TestListingCrawl(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = CrawlerEngine({
+            "supplier": "Shop",
+            "base_url": "https://shop.example/",
+            "allowed_domains": ["shop.example"],
+            "category_url_patterns": ["/category/"],
+            "product_url_patterns": ["/product/"],
+            "sku_url_regex": r"/product/([A-Z0-9]+)",
+            "selectors": {"title": "h1", "product_link": "a.go"},
+            "listing": {"card": ".card", "card_fields": {"title": ".name", "price": ".cost"}},
+            "pagination": {"selector": "a.next"},
+            "db_path": os.path.join(self.tmp.name, "products.db"),
+            "archive": {"enabled": False},
+        })
+        self.engine._open_frontier()
+        self.frontier = self.engine.frontier
+
+    def tearDown(self):
+        self.frontier.close()
+        self.tmp.cleanup()
+
+    def leased(self):
+        urls = []
+        while (url := self.engine._lease()) is not None:
+            urls.append(url)
+        return urls
+
+    def test_listing_feeds_cards_and_pagination(self):
+        self.frontier.lease()  # the base URL
+        self.frontier.add(URL, priority=50.0)
+        self.assertEqual(self.frontier.lease(), URL)
+        _, links, listing = self.engine._extract_page(URL, LISTING)
+        self.engine._enqueue_links(links, parent=URL, listing=listing)
+
+        order = self.leased()
+        # Cards first, then the next page; the nav's product link is not a card
+        self.assertEqual(order[:3], ["https://shop.example/product/A1", "https://shop.example/product/B2",
+                                     "https://shop.example/category/bags?page=2"])
+        self.assertNotIn("https://shop.example/product/AD1", order)
+        self.assertEqual(self.frontier.card("https://shop.example/product/A1"), {"title": "Bag A", "price": "$10.50"})
+        self.assertIsNone(self.frontier.card(URL))
+
+    def test_card_fills_product_page(self):
+        self.frontier.add("https://shop.example/product/B2", priority=PRIORITY_PRODUCT, depth=1)
+        self.frontier.add_entries([("https://shop.example/product/A1", PRIORITY_PRODUCT, 1, {"title": "Bag A", "price": "$10.50"})])
+        self.assertIn("https://shop.example/product/A1", self.leased())
+        html = "<html><body><h1>Leather Bag A</h1><a href='/product/Z9'>Related</a></body></html>"
+        product, links, listing = self.engine._extract_page("https://shop.example/product/A1", html)
+        # The page wins, the card fills gaps; product pages are leaves in listing mode
+        self.assertEqual((product["title"], product["price"], product["sku"]), ("Leather Bag A", 10.5, "A1"))
+        self.assertEqual((links, listing), (set(), None))
+        self.assertNotIn("product_link", product)
+
+
+if __name__ == '__main__':
+    unittest.main()
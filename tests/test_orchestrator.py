@@ -0,0 +1,93 @@
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import contextmanager
+from crawler.orchestrator import MultiSupplierCrawl, PoolQuota
+from crawler.pipeline import DataPipeline
+from crawler.writer import DBWriter, QueuedPipeline
+
+
+class FakePool:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def lease(self):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            time.sleep(0.01)
+            yield "page"
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class TestMultiSupplier(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "products.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def config(self, supplier, **extra):
+        config = {"supplier": supplier, "base_url": f"https://{supplier}.example/",
+                  "allowed_domains": [f"{supplier}.example"], "db_path": self.db_path,
+                  "archive": {"enabled": False}}
+        config.update(extra)
+        return config
+
+    def test_pool_quota(self):
+        pool = FakePool()
+        quota = PoolQuota(pool, 2)
+
+        def use():
+            with quota.lease():
+                pass
+
+        threads = [threading.Thread(target=use) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(pool.peak, 2)
+
+    def test_shared_pool_and_writer(self):
+        crawl = MultiSupplierCrawl([self.config("zeus", num_workers=4, browser_pool={"browsers": 1, "pages": 4}),
+                                    self.config("kraus", num_workers=2, browser_quota=1)])
+        zeus, kraus = crawl.engines
+        self.assertIs(zeus.browser_pool.pool, kraus.browser_pool.pool)
+        self.assertEqual((zeus.browser_pool.limit, kraus.browser_pool.limit), (2, 1))
+        self.assertEqual((zeus.num_workers, kraus.num_workers), (4, 2))
+        self.assertIsNot(zeus.rate_limiter, kraus.rate_limiter)
+        self.assertNotEqual(zeus.frontier.path, kraus.frontier.path)
+        self.assertIsInstance(zeus.pipeline, QueuedPipeline)
+
+    def test_one_db_required(self):
+        other = dict(self.config("kraus"), db_path=os.path.join(self.tmp.name, "other.db"))
+        with self.assertRaises(ValueError):
+            MultiSupplierCrawl([self.config("zeus"), other])
+
+    def test_writer_applies_queued_rows(self):
+        results = queue.Queue()
+        writer = DBWriter(self.db_path, results)
+        writer.start()
+        sink = QueuedPipeline(DataPipeline(self.db_path), results)
+        sink.process_item({"url": "https://zeus.example/p/1", "supplier": "Zeus", "sku": "Z1", "title": "One"})
+        writer.close()
+        conn = sqlite3.connect(self.db_path)
+        self.assertEqual(conn.execute("SELECT catalog_id, title FROM products").fetchall(), [("zeus:Z1", "One")])
+        conn.close()
+        self.assertEqual(writer.stats["row"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from crawler import ratelimit
+from crawler.ratelimit import AdaptiveRateLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestAdaptiveRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = AdaptiveRateLimiter(initial_rps=2.0, min_rps=0.5, max_rps=4.0,
+                                           increase=0.5, decrease=0.5, burst=1, penalty=10,
+                                           clock=self.clock)
+
+    def test_token_bucket_spaces_requests(self):
+        url = "https://www.zeus.co.il/product/1"
+        self.assertEqual(self.limiter.reserve(url), 0.0)
+        self.assertAlmostEqual(self.limiter.reserve(url), 0.5)
+        self.assertAlmostEqual(self.limiter.reserve(url), 1.0)
+        # Other domains have their own bucket
+        self.assertEqual(self.limiter.reserve("https://www.wave2.co.il/product/1"), 0.0)
+
+    def test_additive_increase_capped(self):
+        url = "https://www.zeus.co.il/product/1"
+        for _ in range(10):
+            self.limiter.record(url, ratelimit.OK)
+        self.assertEqual(self.limiter.rate(url), 4.0)
+
+    def test_multiplicative_decrease_with_penalty(self):
+        url = "https://www.comfort-gifts.com/1"
+        self.limiter.reserve(url)
+        self.limiter.record(url, ratelimit.THROTTLED)
+        self.assertEqual(self.limiter.rate(url), 1.0)
+        # Every worker now waits out the 10s penalty
+        self.assertGreaterEqual(self.limiter.reserve(url), 10.0)
+        self.limiter.record(url, ratelimit.TIMEOUT)
+        self.limiter.record(url, ratelimit.TIMEOUT)
+        self.assertEqual(self.limiter.rate(url), 0.5)
+        self.assertEqual(self.limiter.rates(), {"www.comfort-gifts.com": 0.5})
+
+    def test_refill_over_time(self):
+        url = "https://www.zeus.co.il/product/1"
+        self.limiter.reserve(url)
+        self.clock.now += 0.5
+        self.assertEqual(self.limiter.reserve(url), 0.0)
+
+    def test_from_config(self):
+        limiter = AdaptiveRateLimiter.from_config({"rate_limit": {"initial_rps": 0.5, "max_rps": 2}})
+        self.assertEqual(limiter.initial_rps, 0.5)
+        self.assertEqual(limiter.max_rps, 2)
+        self.assertEqual(AdaptiveRateLimiter.from_config({}).initial_rps, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import asyncio
+import unittest
+from crawler.resource_policy import ResourcePolicy
+
+
+class FakeRequest:
+    def __init__(self, url, resource_type, frame):
+        self.url = url
+        self.resource_type = resource_type
+        self.frame = frame
+
+
+class FakeResponse:
+    async def body(self):
+        return b"x" * 1000
+
+
+class FakeRoute:
+    def __init__(self, request):
+        self.request = request
+        self.outcome = None
+
+    async def continue_(self):
+        self.outcome = "continue"
+
+    async def abort(self):
+        self.outcome = "abort"
+
+    async def fetch(self):
+        return FakeResponse()
+
+    async def fulfill(self, response=None, body=None):
+        self.outcome = "fulfill"
+
+
+class FakePage:
+    def __init__(self):
+        self.main_frame = object()
+        self.handler = None
+        self.listeners = []
+
+    async def route(self, pattern, handler):
+        self.handler = handler
+
+    def on(self, event, cb):
+        self.listeners.append(cb)
+
+    async def navigate(self, subresources):
+        routes = [FakeRoute(FakeRequest("https://shop.example/p/1", "document", self.main_frame))]
+        routes += [FakeRoute(FakeRequest(url, rtype, self.main_frame)) for url, rtype in subresources]
+        for r in routes:
+            await self.handler(r)
+        for cb in self.listeners:
+            cb()
+        return routes
+
+
+class TestResourcePolicy(unittest.TestCase):
+    def test_should_block(self):
+        policy = ResourcePolicy()
+        self.assertTrue(policy.should_block("image", "https://shop.example/a.jpg"))
+        self.assertTrue(policy.should_block("script", "https://www.google-analytics.com/analytics.js"))
+        self.assertFalse(policy.should_block("script", "https://shop.example/app.js"))
+        self.assertFalse(policy.should_block("script", "https://shop.example/.well-known/sgcaptcha/x.js"))
+        self.assertFalse(policy.should_block("document", "https://shop.example/a.jpg"))
+
+    def test_from_config(self):
+        self.assertIsNone(ResourcePolicy.from_config({}))
+        policy = ResourcePolicy.from_config({"resource_policy": {"block_types": ["font"], "sample_every": 0}})
+        self.assertEqual(policy.block_types, {"font"})
+        self.assertFalse(policy.should_block("image", "https://shop.example/a.jpg"))
+
+    def test_control_samples_measure_savings(self):
+        async def scenario():
+            policy = ResourcePolicy(sample_every=2)
+            page = FakePage()
+            await policy.install(page)
+            subresources = [("https://shop.example/a.jpg", "image"), ("https://shop.example/app.js", "script")]
+            control = await page.navigate(subresources)   # nav 0 -> control sample
+            blocked = await page.navigate(subresources)   # nav 1 -> blocked
+            return policy, control, blocked
+
+        policy, control, blocked = asyncio.run(scenario())
+        self.assertEqual([r.outcome for r in control], ["continue", "fulfill", "continue"])
+        self.assertEqual([r.outcome for r in blocked], ["continue", "abort", "continue"])
+        report = policy.report()
+        self.assertEqual(report["navigations"], 1)
+        self.assertEqual(report["control_navigations"], 1)
+        self.assertEqual(report["blocked_requests"], {"image": 1})
+        self.assertEqual(report["est_bytes_saved"], 1000)
+        self.assertIsNotNone(report["est_nav_time_saved_s"])
+
+    def test_failed_control_fetch_falls_back_to_continue(self):
+        class BrokenRoute(FakeRoute):
+            async def fetch(self):
+                raise RuntimeError("connection reset")
+
+        async def scenario():
+            policy = ResourcePolicy(sample_every=1)
+            page = FakePage()
+            await policy.install(page)
+            await page.handler(FakeRoute(FakeRequest("https://shop.example/p/1", "document", page.main_frame)))
+            route = BrokenRoute(FakeRequest("https://shop.example/a.jpg", "image", page.main_frame))
+            await page.handler(route)
+            return route
+
+        self.assertEqual(asyncio.run(scenario()).outcome, "continue")
+
+    def test_control_samples_among_interleaved_pages(self):
+        async def scenario():
+            policy = ResourcePolicy(sample_every=3)
+            pages = [FakePage() for _ in range(6)]
+            for page in pages:
+                await policy.install(page)
+            # Every page starts its navigation before any of them loads
+            for page in pages:
+                await page.handler(FakeRoute(FakeRequest("https://shop.example/p/1", "document", page.main_frame)))
+            images = []
+            for page in pages:
+                route = FakeRoute(FakeRequest("https://shop.example/a.jpg", "image", page.main_frame))
+                await page.handler(route)
+                images.append(route.outcome)
+            # Two of them time out before load: the next navigations still rotate
+            for page in pages[2:]:
+                for cb in page.listeners:
+                    cb()
+            route = FakeRoute(FakeRequest("https://shop.example/a.jpg", "image", pages[0].main_frame))
+            await pages[0].handler(FakeRoute(FakeRequest("https://shop.example/p/2", "document", pages[0].main_frame)))
+            await pages[0].handler(route)
+            return policy, images, route.outcome
+
+        policy, images, after = asyncio.run(scenario())
+        self.assertEqual(images, ["fulfill", "abort", "abort", "fulfill", "abort", "abort"])
+        self.assertEqual(after, "fulfill")  # the 7th navigation started
+        self.assertEqual((policy.control_navigations, policy.navigations), (1, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
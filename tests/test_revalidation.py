@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+from crawler.fetcher import HTMLFetcher, FetchResult
+from crawler.pipeline import DataPipeline
+from crawler.revalidation import ValidatorStore, body_hash, conditional_headers
+
+
+class TestValidatorStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "products.db")
+        self.store = ValidatorStore(self.db_path)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_remember_keyed_by_normalized_url(self):
+        result = FetchResult(url="https://Example.com/product/1?utm_source=x#top", html="<h1>Pen</h1>",
+                             etag='"abc"', last_modified="Wed, 01 Jan 2025 00:00:00 GMT",
+                             body_hash=body_hash("<h1>Pen</h1>"))
+        self.store.remember(result)
+        stored = self.store.get("https://example.com/product/1")
+        self.assertEqual(stored["etag"], '"abc"')
+        self.assertEqual(conditional_headers(stored), {
+            "If-None-Match": '"abc"',
+            "If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT",
+        })
+
+    def test_no_validators_no_headers(self):
+        self.assertIsNone(self.store.get("https://example.com/product/2"))
+        self.assertEqual(conditional_headers(None), {})
+
+    def test_touch_url_bumps_last_seen(self):
+        pipeline = DataPipeline(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT INTO products (catalog_id, url_clean, last_seen_at) VALUES ('c1', ?, 'old')",
+                     ("https://example.com/product/1",))
+        conn.commit()
+        pipeline.touch_url("https://example.com/product/1#reviews")
+        seen = conn.execute("SELECT last_seen_at FROM products WHERE catalog_id = 'c1'").fetchone()[0]
+        conn.close()
+        self.assertNotEqual(seen, "old")
+
+
+class TestConditionalFetch(unittest.TestCase):
+    URL = "https://example.com/product/1"
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ValidatorStore(os.path.join(self.tmp.name, "products.db"))
+        self.fetcher = HTMLFetcher(validators=self.store)
+        self.store.remember(FetchResult(url=self.URL, etag='"v1"', body_hash=body_hash("<h1>Pen</h1>")))
+
+    def tearDown(self):
+        self.fetcher.close()
+        self.store.close()
+        self.tmp.cleanup()
+
+    def test_304_is_unchanged_without_browser(self):
+        with mock.patch.object(self.fetcher, "fetch_static", return_value=("", 304)) as static, \
+             mock.patch.object(self.fetcher, "fetch_dynamic") as dyn:
+            result = self.fetcher.fetch_page(self.URL)
+        static.assert_called_once_with(self.URL, {"If-None-Match": '"v1"'})
+        dyn.assert_not_called()
+        self.assertTrue(result.not_modified)
+        self.assertTrue(result.unchanged)
+
+    def test_same_body_is_unchanged(self):
+        with mock.patch.object(self.fetcher, "fetch_static", return_value=("<h1>Pen</h1>", 200)):
+            result = self.fetcher.fetch_page(self.URL)
+        self.assertFalse(result.not_modified)
+        self.assertTrue(result.unchanged)
+
+    def test_changed_body_is_processed(self):
+        with mock.patch.object(self.fetcher, "fetch_static", return_value=("<h1>Pen v2</h1>", 200)):
+            result = self.fetcher.fetch_page(self.URL)
+        self.assertFalse(result.unchanged)
+        self.assertEqual(result.body_hash, body_hash("<h1>Pen v2</h1>"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+from crawler.pipeline import DataPipeline
+from crawler.runs import RunRegistry, RunStats, get_run, list_runs
+from crawler.stats import LatencyHistogram
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_percentiles_within_bucket_error(self):
+        rng = random.Random(7)
+        samples = sorted(rng.expovariate(1 / 0.3) for _ in range(20000))
+        hist = LatencyHistogram()
+        for x in samples:
+            hist.add(x)
+        for q in (0.5, 0.95, 0.99):
+            exact = samples[int(q * len(samples))]
+            self.assertAlmostEqual(hist.quantile(q) / exact, 1.0, delta=0.06)
+
+    def test_merge(self):
+        a, b = LatencyHistogram(), LatencyHistogram()
+        for x in (0.01, 0.02):
+            a.add(x)
+        b.add(2.0)
+        a.merge(json.loads(json.dumps(b.snapshot())))  # survives a trip through JSON / a process queue
+        self.assertEqual(a.count, 3)
+        self.assertEqual(a.max, 2.0)
+
+
+class TestRunRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "products.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_write_outcomes(self):
+        pipeline = DataPipeline(self.db_path)
+        item = {"url": "https://shop.example/product/A1", "supplier": "Shop", "sku": "A1", "title": "Bag", "price": 10}
+        pipeline.process_item(dict(item))
+        pipeline.process_item(dict(item))
+        pipeline.process_item(dict(item, price=12))
+        pipeline.touch_url(item["url"])
+        self.assertEqual(pipeline.write_summary("shop"), {"inserted": 1, "changed": 1, "unchanged": 2})
+        self.assertEqual(pipeline.write_summary("other"), {"inserted": 0, "changed": 0, "unchanged": 0})
+
+    def test_run_row_and_report(self):
+        registry = RunRegistry.from_config({"db_path": self.db_path})
+        run_id = registry.start("Shop", "threads")
+        self.assertEqual(list_runs(self.db_path)[0]["status"], "running")
+
+        stats, shard = RunStats(), RunStats()
+        stats.page("ok", "http", 1000)
+        stats.time("fetch", 0.2)
+        shard.page("failed", "browser")
+        shard.time("fetch", 0.4)
+        stats.merge(shard.snapshot())
+        registry.finish(run_id, stats, {"inserted": 1, "changed": 0, "unchanged": 0}, 2.0)
+
+        row = list_runs(self.db_path, supplier="Shop")[0]
+        self.assertEqual((row["status"], row["pages_ok"], row["pages_failed"], row["bytes"], row["pages_per_sec"]),
+                         ("finished", 1, 1, 1000, 1.0))
+        report = get_run(self.db_path, run_id)["report"]
+        self.assertEqual(report["tiers"], {"http": 1, "browser": 1})
+        self.assertEqual(report["latency"]["fetch"]["count"], 2)
+        with open(os.path.join(self.tmp.name, "runs", f"shop-{run_id}.json")) as f:
+            self.assertEqual(json.load(f)["products"]["inserted"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
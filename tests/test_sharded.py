@@ -0,0 +1,70 @@
+import os
+import queue
+import tempfile
+import threading
+import unittest
+from crawler.sharded import ShardEngine, shard_frontier_path, shard_of
+
+
+class TestShardEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = {
+            "supplier": "Shop",
+            "base_url": "https://shop.example/",
+            "allowed_domains": ["shop.example"],
+            "category_url_patterns": ["/category/"],
+            "product_url_patterns": ["/product/"],
+            "sku_url_regex": r"/product/([A-Z0-9]+)",
+            "db_path": os.path.join(self.tmp.name, "products.db"),
+            "archive": {"enabled": False},
+        }
+        self.inboxes = [queue.Queue(), queue.Queue()]
+        self.results = queue.Queue()
+        self.engines = []
+
+    def tearDown(self):
+        for engine in self.engines:
+            engine.frontier.close()
+        self.tmp.cleanup()
+
+    def engine(self, index: int) -> ShardEngine:
+        config = dict(self.config, frontier={"path": shard_frontier_path(self.config, index, 2)})
+        engine = ShardEngine(config, index, 2, self.inboxes, self.results, threading.Event())
+        engine.frontier.reset()
+        self.engines.append(engine)
+        return engine
+
+    def test_stable_shards(self):
+        self.assertEqual(shard_of("sku:A1", 4), shard_of("sku:A1", 4))
+        self.assertEqual({shard_of(f"sku:{i}", 4) for i in range(200)}, {0, 1, 2, 3})
+        self.assertTrue(shard_frontier_path(self.config, 1, 2).endswith("products.shop.shard1of2.frontier.db"))
+
+    def test_links_routed_to_owner(self):
+        engine = self.engine(0)
+        urls = [f"https://shop.example/category/{i}" for i in range(50)]
+        added = engine._add_links([(url, 50.0, 1) for url in urls])
+        self.assertTrue(self.inboxes[0].empty())
+        forwarded = self.inboxes[1].get_nowait()
+        self.assertEqual(added + len(forwarded), 50)
+        self.assertEqual(engine.frontier.pending, added)
+        self.assertTrue(all(engine._owner(url) == 1 for url, _, _ in forwarded))
+        self.assertEqual(engine.sent.value, 1)
+
+    def test_sku_aliases_share_a_shard(self):
+        engine = self.engine(0)
+        self.assertEqual(engine._owner("https://shop.example/product/AB12"),
+                         engine._owner("https://shop.example/sale/product/AB12?utm_source=x"))
+
+    def test_products_prepared_in_shard(self):
+        engine = self.engine(0)
+        engine.pipeline.process_item({"url": "https://shop.example/product/AB12", "supplier": "Shop",
+                                      "sku": "AB12", "title": "Widget"})
+        kind, row = self.results.get_nowait()
+        self.assertEqual(kind, "row")
+        self.assertEqual(row["catalog_id"], "shop:AB12")
+        self.assertIsInstance(row["images"], str)  # serialized, ready for the writer
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from crawler.pipeline import DataPipeline
+from crawler.sku_index import SkuIndex
+
+
+class TestSkuIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "products.db")
+        DataPipeline(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        rows = [(f"zeus:Z{i}", "zeus", f"Z{i}") for i in range(20000)]
+        rows += [("comfort:C1", "comfort", "C1"), ("comfort:SHARED", "comfort", "SHARED")]
+        conn.executemany("INSERT INTO products (catalog_id, supplier_slug, sku_clean) VALUES (?, ?, ?)", rows)
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_scoped_to_supplier(self):
+        index = SkuIndex.load(self.db_path, "Zeus")
+        self.assertEqual(len(index), 20000)
+        self.assertIn("z42", index)  # same cleaning as sku_clean
+        self.assertNotIn("C1", index)
+        self.assertNotIn("SHARED", index)
+        self.assertIn("SHARED", SkuIndex.load(self.db_path, "Comfort"))
+
+    def test_added_during_run(self):
+        index = SkuIndex.load(self.db_path, "Comfort")
+        index.MERGE_EVERY = 3
+        for sku in ("N1", "N2", "N3", "N4"):
+            index.add(sku)
+        for sku in ("N1", "N2", "N3", "N4", "C1"):
+            self.assertIn(sku, index)
+        self.assertEqual(len(index), 6)
+
+    def test_concurrent_adds(self):
+        index = SkuIndex.load(self.db_path, "Comfort")
+        index.MERGE_EVERY = 16
+
+        def add(worker):
+            for i in range(2000):
+                index.add(f"W{worker}-{i}")
+
+        threads = [threading.Thread(target=add, args=(w,)) for w in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(index), 2 + 8 * 2000)
+        self.assertTrue(all(f"W{w}-{i}" in index for w in range(8) for i in range(0, 2000, 37)))
+
+    def test_bloom_mode(self):
+        index = SkuIndex.load(self.db_path, "Zeus", mode="bloom", fp_rate=0.001)
+        self.assertTrue(all(f"Z{i}" in index for i in range(0, 20000, 97)))
+        false_positives = sum(f"X{i}" in index for i in range(5000))
+        self.assertLess(false_positives, 25)
+        self.assertLess(index.memory_bytes(), SkuIndex.load(self.db_path, "Zeus").memory_bytes())
+
+    def test_memory_report(self):
+        report = SkuIndex.load(self.db_path, "Zeus").report()
+        self.assertLess(report["bytes"], report["str_set_bytes_est"] / 4)
+
+    def test_load_uses_catalog_index(self):
+        conn = sqlite3.connect(self.db_path)
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT sku_clean FROM products "
+                            "WHERE supplier_slug = ? AND sku_clean IS NOT NULL", ("zeus",)).fetchall()
+        conn.close()
+        self.assertIn("idx_catalog_lookup", str(plan))
+
+
+if __name__ == '__main__':
+    unittest.main()
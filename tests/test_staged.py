@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from crawler.fetcher import FetchResult
+from crawler import staged
+from crawler.core import PageParser
+from crawler.staged import StagedCrawlerEngine
+
+BASE = "https://shop.example/"
+PRODUCTS = [f"{BASE}product/P{i}" for i in range(6)]
+
+
+class FakeFetcher:
+    fetched = []
+    all_fetched = threading.Event()
+    lock = threading.Lock()
+
+    def __init__(self, **kwargs):
+        self.tier_counts = {}
+
+    def fetch_page(self, url, dynamic=False):
+        if url == BASE:
+            html = "".join(f"<a href='{u}'>x</a>" for u in PRODUCTS)
+        else:
+            html = f"<html><h1>Item {url[-2:]}</h1></html>"
+        with self.lock:
+            self.fetched.append(url)
+            if len(self.fetched) == len(PRODUCTS) + 1:
+                self.all_fetched.set()
+        return FetchResult(url=url, html=html, status=200, tier="http")
+
+    def close(self):
+        pass
+
+
+class TestStagedEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "products.db")
+        FakeFetcher.fetched = []
+        FakeFetcher.all_fetched = threading.Event()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def engine(self, **stages):
+        return StagedCrawlerEngine({"supplier": "Shop", "base_url": BASE, "allowed_domains": ["shop.example"],
+                                    "product_url_patterns": ["/product/"], "sku_url_regex": r"/product/(P\d+)",
+                                    "selectors": {"title": "h1"}, "db_path": self.db_path,
+                                    "archive": {"enabled": False}, "num_workers": 2, "stages": stages})
+
+    def test_fetchers_run_ahead_of_parsing(self):
+        engine = self.engine(parse_workers=1, parse_queue=len(PRODUCTS))
+        extract = engine._extract_page
+        unblocked = []
+
+        def slow_extract(url, html, with_links=True):
+            # Product pages are only parsed once every page has been fetched
+            if url != BASE:
+                unblocked.append(FakeFetcher.all_fetched.wait(5))
+            return extract(url, html, with_links)
+
+        engine._extract_page = slow_extract
+        with mock.patch("crawler.staged.HTMLFetcher", FakeFetcher):
+            engine.run()
+
+        self.assertEqual(unblocked, [True] * len(PRODUCTS))
+        conn = sqlite3.connect(self.db_path)
+        try:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM products").fetchone()[0], len(PRODUCTS))
+        finally:
+            conn.close()
+        report = engine.run_report
+        self.assertEqual(report["pages"]["ok"], len(PRODUCTS) + 1)
+        self.assertEqual(report["products"]["inserted"], len(PRODUCTS))
+        self.assertGreater(report["stages"]["peak_depths"]["parse"], 1)
+        self.assertIn("queue.parse", report["latency"])
+        self.assertEqual(engine.stage_depths(), {"parse": 0, "store": 0})
+
+    def test_settings(self):
+        engine = self.engine(fetch_workers=5, parse_workers=3)
+        self.assertEqual((engine.num_workers, engine.parse_workers, engine.parse_queue_size), (5, 3, 20))
+        with self.assertRaises(ValueError):
+            self.engine(parse_mode="fibers")
+
+    def test_parse_process_opens_nothing(self):
+        config = dict(self.engine().config, db_path=os.path.join(self.tmp.name, "parse", "products.db"))
+        staged._init_parse_process(config)
+        sku, row, links, listing, spans = staged._parse_in_process(PRODUCTS[1], "<h1>Item P1</h1>", None)
+        self.assertEqual((sku, row["title"], row["catalog_id"]), ("P1", "Item P1", "shop:P1"))
+        self.assertIsInstance(staged._parser, PageParser)
+        # No products DB, frontier or clearance store next to it
+        self.assertFalse(os.path.exists(os.path.dirname(config["db_path"])))
+
+
+if __name__ == '__main__':
+    unittest.main()
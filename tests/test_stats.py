@@ -0,0 +1,33 @@
+import threading
+import unittest
+from crawler.stats import AtomicCounter
+
+
+class TestAtomicCounter(unittest.TestCase):
+    def test_no_lost_increments(self):
+        counter = AtomicCounter()
+        seen = []
+
+        def bump():
+            seen.extend(counter.incr() for _ in range(10000))
+
+        threads = [threading.Thread(target=bump) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # Every value handed out exactly once
+        self.assertEqual(sorted(seen), list(range(1, 80001)))
+
+    def test_reset(self):
+        counter = AtomicCounter()
+        counter.incr()
+        counter.incr()
+        self.assertEqual(counter.value, 2)
+        counter.reset()
+        self.assertEqual(counter.value, 0)
+        self.assertEqual(counter.incr(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
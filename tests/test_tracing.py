@@ -0,0 +1,96 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from crawler.core import CrawlerEngine
+from crawler.fetcher import FetchResult
+from crawler.runs import RunStats
+from crawler.tracing import Tracer, span
+
+PRODUCT = "<html><body><h1>Bag A</h1><a href='/product/B2'>B</a></body></html>"
+
+
+class FakeFetcher:
+    def fetch_page(self, url, dynamic=False):
+        with span("fetch.http"):
+            return FetchResult(url=url, html=PRODUCT, status=200, tier="http")
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_spans_feed_histograms_and_jsonl(self):
+        stats = RunStats()
+        tracer = Tracer.from_config({"supplier": "My Shop",
+                                     "tracing": {"jsonl": os.path.join(self.tmp.name, "traces", "{supplier}.jsonl")}},
+                                    stats)
+        with span("fetch"):  # outside a page: ignored
+            pass
+        with tracer.page("https://shop.example/product/A1") as trace:
+            with span("fetch"):
+                pass
+            for _ in range(2):
+                with span("store.commit"):
+                    pass
+            trace.finish("ok", 100)
+        with self.assertRaises(RuntimeError):
+            with tracer.page("https://shop.example/product/B2"):
+                with span("fetch"):
+                    raise RuntimeError("boom")
+        tracer.close()
+
+        self.assertEqual(dict(stats.pages), {"ok": 1, "failed": 1})
+        self.assertEqual({phase: s["count"] for phase, s in stats.latency().items()},
+                         {"fetch": 2, "page": 2, "store.commit": 1})
+        with open(os.path.join(self.tmp.name, "traces", "my-shop.jsonl")) as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([(r["outcome"], r["bytes"], sorted(r["spans"])) for r in lines],
+                         [("ok", 100, ["fetch", "store.commit"]), ("failed", 0, ["fetch"])])
+
+    def test_async_tasks_keep_their_own_trace(self):
+        stats = RunStats()
+        tracer = Tracer(stats)
+        traces = {}
+
+        def store():
+            with span("store"):
+                pass
+
+        async def process(url, delay):
+            with tracer.page(url) as trace:
+                with span("fetch"):
+                    await asyncio.sleep(delay)
+                # Work sent to a thread still lands in this page's trace
+                await asyncio.to_thread(store)
+                traces[url] = dict(trace.spans)
+
+        async def main():
+            await asyncio.gather(process("a", 0.05), process("b", 0.0))
+
+        asyncio.run(main())
+        self.assertGreater(traces["a"]["fetch"], traces["b"]["fetch"] + 0.03)
+        self.assertEqual(set(traces["b"]), {"fetch", "store"})
+        self.assertEqual(stats.latency()["store"]["count"], 2)
+
+    def test_engine_phases(self):
+        engine = CrawlerEngine({"supplier": "Shop", "base_url": "https://shop.example/",
+                                "allowed_domains": ["shop.example"], "product_url_patterns": ["/product/"],
+                                "sku_url_regex": r"/product/([A-Z0-9]+)", "selectors": {"title": "h1"},
+                                "db_path": os.path.join(self.tmp.name, "products.db"),
+                                "archive": {"enabled": False}})
+        engine._open_frontier()
+        self.assertTrue(engine._process_url("https://shop.example/product/A1", FakeFetcher()))
+        engine.frontier.close()
+        phases = set(engine.run_stats.latency())
+        self.assertTrue({"page", "fetch", "fetch.http", "parse", "parse.lexbor", "parse.fields",
+                         "store", "store.validate", "store.upsert", "store.commit"} <= phases, phases)
+        self.assertEqual(engine.run_stats.pages["ok"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from crawler.url_classifier import UrlClassifier
+
+
+class TestUrlClassifier(unittest.TestCase):
+    def setUp(self):
+        self.classifier = UrlClassifier.from_config({
+            "allowed_domains": ["shop.example", "www.shop.example"],
+            "product_url_patterns": ["regex:/\\d+($|[/-])", "product_id="],
+            "category_url_patterns": ["/bags", "regex:path=\\d+(_\\d+)*"],
+            "sku_url_regex": r"(?:^|/)(\d+)[^/]*$",
+        })
+
+    def test_substring_and_regex_patterns(self):
+        self.assertTrue(self.classifier.classify("https://shop.example/index.php?product_id=7").is_product)
+        self.assertTrue(self.classifier.classify("https://shop.example/bags/1234-red").is_product)
+        self.assertTrue(self.classifier.classify("https://shop.example/index.php?route=x&path=59_60").is_category)
+        verdict = self.classifier.classify("https://shop.example/about-us")
+        self.assertFalse(verdict.is_product or verdict.is_category)
+
+    def test_product_and_category_in_one_verdict(self):
+        verdict = self.classifier.classify("https://shop.example/bags/1234-red")
+        self.assertTrue(verdict.allowed and verdict.is_product and verdict.is_category)
+        self.assertEqual(verdict.sku, "1234")
+
+    def test_sku_only_in_product_verdicts(self):
+        self.assertEqual(self.classifier.classify("https://shop.example/bags").sku, "")
+        # sku() reads any URL, e.g. a product page reached through another pattern
+        self.assertEqual(self.classifier.sku("/5678"), "5678")
+        self.assertEqual(UrlClassifier().sku("/5678"), "")
+
+    def test_allowed_domains(self):
+        self.assertTrue(self.classifier.classify("/bags").allowed)
+        self.assertTrue(self.classifier.classify("https://www.shop.example/bags").allowed)
+        verdict = self.classifier.classify("https://other.example/bags/1234")
+        self.assertFalse(verdict.allowed or verdict.is_product or verdict.is_category)
+
+    def test_invalid_regex(self):
+        with self.assertRaises(ValueError):
+            UrlClassifier(product_patterns=["regex:(unclosed"])
+
+    def test_patterns_that_use_their_own_groups(self):
+        classifier = UrlClassifier(allowed_domains=["shop.example"],
+                                   product_patterns=["regex:/p/(\\d+)", "regex:/(\\w+)/\\1/",
+                                                     "regex:(?P<id>\\d+)-x$", "regex:(?P<id>\\d+)-y$"])
+        # \1 still means this pattern's group 1, not the first pattern's
+        self.assertTrue(classifier.is_product("https://shop.example/bags/bags/1"))
+        self.assertFalse(classifier.is_product("https://shop.example/bags/shoes/1"))
+        # The same group name in two patterns
+        self.assertTrue(classifier.is_product("https://shop.example/7-y"))
+        self.assertTrue(classifier.is_product("https://shop.example/p/7"))
+
+    def test_repeated_links_are_cached(self):
+        for _ in range(3):
+            self.classifier.classify("https://shop.example/bags")
+        info = self.classifier.cache_info()
+        self.assertEqual((info.hits, info.misses), (2, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import copy
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from crawler.pipeline import DataPipeline
+
+SEEN = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def item(n, **extra):
+    return dict({"url": f"https://Shop.example/product/A{n}?utm_source=x", "supplier": "Shop", "sku": f"A{n}",
+                 "title": f"ספה {n}", "price": 100 + n, "currency": "ILS", "availability": "in_stock",
+                 "category_path": ["ריהוט", "ספות"], "description": "בד איכותי",
+                 "properties": {"רוחב": "200"}, "images": [f"https://cdn.shop.example/{n}/a b.jpg"],
+                 "variants": [{"name": "אפור"}, {"name": "בחר צבע"}], "raw": {"source": "jsonld"}}, **extra)
+
+
+class TestFastValidation(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fast = DataPipeline(os.path.join(self.tmp.name, "fast.db"))
+        self.model = DataPipeline(os.path.join(self.tmp.name, "model.db"), validation="model")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_same_rows_as_the_model_path(self):
+        items = [item(1), item(2, images=[], properties={}, variants=[]), item(3, price=None, description=None)]
+        expected = [self.model.prepare_row(copy.deepcopy(i), SEEN) for i in items]
+        self.assertEqual([self.fast.prepare_row(copy.deepcopy(i), SEEN) for i in items], expected)
+        self.assertEqual(expected[0]["images"], '["https://cdn.shop.example/1/a%20b.jpg"]')
+        self.assertEqual(expected[0]["price"], 101.0)
+
+    def test_rejects_what_the_model_rejects(self):
+        bad = [item(1, images=["ftp://cdn.shop.example/x.jpg"]), item(2, title=None), item(3, sku=None),
+               item(4, properties={"רוחב": 200}), item(5, url="not a url")]
+        for i in bad:
+            self.assertIsNone(self.model.prepare_row(copy.deepcopy(i), SEEN))
+            self.assertIsNone(self.fast.prepare_row(copy.deepcopy(i), SEEN))
+        with self.assertLogs("crawler.pipeline", "ERROR") as logs:
+            summary = self.fast.process_batch([item(0)] + copy.deepcopy(bad) + [item(6)], SEEN)
+        self.assertEqual(summary, {"inserted": 2, "changed": 0, "unchanged": 0})
+        self.assertEqual(len(logs.output), len(bad))
+
+    def test_mode_is_checked(self):
+        with self.assertRaises(ValueError):
+            DataPipeline(os.path.join(self.tmp.name, "x.db"), validation="none")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import os
+import queue
+import sqlite3
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from crawler.fetcher import FetchResult
+from crawler.pipeline import DataPipeline
+from crawler.writer import DBWriter, QueuedPipeline
+
+
+def item(n, **extra):
+    return dict({"url": f"https://shop.example/product/A{n}", "supplier": "Shop", "sku": f"A{n}",
+                 "title": f"Item {n}", "price": 10 + n}, **extra)
+
+
+class TestGroupCommit(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "products.db")
+        self.pipeline = DataPipeline(self.db_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def query(self, sql):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+
+    def test_batches_by_count_and_flushes_on_close(self):
+        results = queue.Queue()
+        writer = DBWriter(self.db_path, results, revalidate=True, pipeline=self.pipeline, batch_size=3, max_delay=60)
+        sink = QueuedPipeline(self.pipeline, results)
+        for n in range(7):
+            sink.process_item(item(n))
+        results.put(("validators", FetchResult(url=item(0)["url"], body_hash="abc")))
+        sink.touch_url(item(0)["url"])
+        writer.start()
+        writer.close()
+        self.assertEqual(writer.stats["commits"], 3)  # 3 + 3 + (1 row, validators, touch)
+        self.assertEqual(self.query("SELECT COUNT(*) FROM products"), [(7,)])
+        self.assertEqual(self.query("SELECT body_hash FROM http_validators"), [("abc",)])
+        self.assertEqual(self.pipeline.write_summary("shop"), {"inserted": 7, "changed": 0, "unchanged": 1})
+        self.assertEqual(self.query("PRAGMA journal_mode"), [("wal",)])
+
+    def test_validators_only_for_written_rows(self):
+        results = queue.Queue()
+        writer = DBWriter(self.db_path, results, revalidate=True, pipeline=self.pipeline, batch_size=3, max_delay=60)
+        upsert = self.pipeline.upsert
+        self.pipeline.upsert = lambda conn, row, bumps=None: None if row["sku"] == "A1" else upsert(conn, row, bumps)
+        sink = QueuedPipeline(self.pipeline, results)
+        for n in range(3):
+            sink.process_item(item(n))
+            # A1's validators land in the next batch, after its failed upsert
+            results.put(("validators", FetchResult(url=item(n)["url"], body_hash=f"h{n}")))
+        writer.start()
+        writer.close()
+        self.assertEqual(self.query("SELECT sku FROM products ORDER BY sku"), [("A0",), ("A2",)])
+        self.assertEqual(self.query("SELECT body_hash FROM http_validators ORDER BY body_hash"), [("h0",), ("h2",)])
+
+    def test_commits_after_time_window(self):
+        results = queue.Queue()
+        writer = DBWriter(self.db_path, results, pipeline=self.pipeline, batch_size=1000, max_delay=0.05)
+        writer.start()
+        try:
+            QueuedPipeline(self.pipeline, results).process_item(item(1))
+            deadline = time.monotonic() + 5
+            while not self.query("SELECT COUNT(*) FROM products")[0][0] and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(self.query("SELECT COUNT(*) FROM products"), [(1,)])
+        finally:
+            writer.close()
+
+    def test_process_batch(self):
+        items = [item(1), item(2), item(3, sku=None)]
+        self.assertEqual(self.pipeline.process_batch(items), {"inserted": 2, "changed": 0, "unchanged": 0})
+        self.assertEqual(self.pipeline.process_batch([item(1), item(2, price=99)]),
+                         {"inserted": 0, "changed": 1, "unchanged": 1})
+        self.assertEqual(self.pipeline.write_summary("shop"), {"inserted": 2, "changed": 1, "unchanged": 1})
+
+
+class TestSkipUnchanged(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "products.db")
+        self.pipeline = DataPipeline(self.db_path)
+        self.statements = []
+        connect = self.pipeline.connect
+
+        def traced():
+            conn = connect()
+            conn.set_trace_callback(self.statements.append)
+            return conn
+
+        self.pipeline.connect = traced
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def query(self, sql):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+
+    def test_unchanged_rows_only_bump_last_seen(self):
+        first = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        self.pipeline.process_batch([item(n) for n in range(3)], seen_at=first)
+        # Marks which rows get rewritten: the content_hash still matches the crawled content
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE products SET description = 'kept'")
+        conn.commit()
+        conn.close()
+
+        self.statements.clear()
+        second = first + timedelta(days=1)
+        summary = self.pipeline.process_batch([item(0), item(1), item(2, price=99)], seen_at=second)
+        self.assertEqual(summary, {"inserted": 0, "changed": 1, "unchanged": 2})
+        self.assertEqual(self.query("SELECT sku, description FROM products ORDER BY sku"),
+                         [("A0", "kept"), ("A1", "kept"), ("A2", None)])
+        self.assertEqual({seen[:10] for seen, in self.query("SELECT last_seen_at FROM products")}, {"2026-01-02"})
+        bumps = [sql for sql in self.statements if "WHERE catalog_id IN" in sql]
+        self.assertEqual(len(bumps), 1)
+        self.assertEqual(sum("INSERT INTO products" in sql for sql in self.statements), 1)
+        # Unchanged revisits still count as freshness checks
+        self.assertEqual(self.query("SELECT SUM(checks), SUM(changes) FROM product_freshness"), [(3, 1)])
+
+    def test_stored_hashes_load_per_supplier(self):
+        self.pipeline.process_batch([item(1), item(2)])
+        fresh = DataPipeline(self.db_path)
+        self.assertEqual(fresh.process_batch([item(1), item(2, title="Renamed"), item(3)]),
+                         {"inserted": 1, "changed": 1, "unchanged": 1})
+        self.assertEqual(fresh.process_batch([item(2, title="Renamed")]), {"inserted": 0, "changed": 0, "unchanged": 1})
+        self.assertEqual(self.query("SELECT title FROM products WHERE sku = 'A2'"), [("Renamed",)])
+        # A moved product is rewritten (and counted as changed) even though its content is the same
+        self.assertEqual(fresh.process_batch([item(1, url="https://shop.example/p/A1")]),
+                         {"inserted": 0, "changed": 1, "unchanged": 0})
+        self.assertEqual(self.query("SELECT url_clean FROM products WHERE sku = 'A1'"),
+                         [("https://shop.example/p/A1",)])
+        self.assertEqual(fresh.process_batch([item(1, url="https://shop.example/p/A1")]),
+                         {"inserted": 0, "changed": 0, "unchanged": 1})
+
+    def test_bumps_keep_each_rows_own_seen_at(self):
+        first = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        self.pipeline.process_batch([item(n) for n in range(2)], seen_at=first)
+        rows = [self.pipeline.prepare_row(item(n), first + timedelta(seconds=10 * (n + 1))) for n in range(2)]
+        conn = self.pipeline.connect()
+        bumps = []
+        self.assertEqual([self.pipeline.upsert(conn, row, bumps) for row in rows], ["unchanged", "unchanged"])
+        self.pipeline.bump_seen(conn, bumps)
+        conn.commit()
+        conn.close()
+        self.assertEqual([seen[:19] for seen, in self.query("SELECT last_seen_at FROM products ORDER BY sku")],
+                         ["2026-01-01 00:00:10", "2026-01-01 00:00:20"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,8 +8,10 @@ import logging
 from pathlib import Path
 from crawler.sitemap import SitemapCrawler
 from crawler.fetcher import HTMLFetcher
+from crawler.ratelimit import AdaptiveRateLimiter
 from crawler.parser import HTMLParser
 from crawler.pipeline import DataPipeline
+from crawler.sku_index import SkuIndex
 from urllib.parse import urljoin
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -48,26 +50,14 @@ def main():
     logger.info(f"Sitemap contains {len(product_urls)} product URLs")
     
     # Step 2: Set up fetcher and pipeline
-    fetcher = HTMLFetcher()
+    # Per-domain adaptive throttle (rate_limit section of the config) instead of a fixed sleep
+    fetcher = HTMLFetcher(rate_limiter=AdaptiveRateLimiter.from_config(config))
     pipeline = DataPipeline(str(db_path))
     
-    # Load existing SKUs to skip duplicates
-    import sqlite3
-    import os
-    visited_skus = set()
-    if os.path.exists(db_path):
-        try:
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT sku FROM products WHERE sku IS NOT NULL")
-            rows = cursor.fetchall()
-            for row in rows:
-                if row[0]:
-                    visited_skus.add(row[0].upper())
-            conn.close()
-            logger.info(f"Loaded {len(visited_skus)} existing SKUs from DB.")
-        except Exception as e:
-            logger.error(f"Failed to load existing SKUs: {e}")
+    # This supplier's existing SKUs (fingerprints, not strings) to skip duplicates
+    visited_skus = SkuIndex.from_config(config)
+    import re
+    sku_re = re.compile(config["sku_url_regex"]) if config.get("sku_url_regex") else None
     
     # Step 3: Crawl each product URL
     processed = 0
@@ -76,25 +66,16 @@ def main():
     
     for idx, url in enumerate(product_urls, 1):
         # Extract SKU from URL for quick skip check
-        try:
-            from crawler.core import CrawlerEngine
-            # Create a temp instance just to use the helper method
-            temp = CrawlerEngine.__new__(CrawlerEngine)
-            sku = temp._extract_sku_from_url(url) if hasattr(CrawlerEngine, '_extract_sku_from_url') else ""
-            
-            if sku and sku in visited_skus:
-                skipped += 1
-                if idx % 100 == 0:
-                    logger.info(f"Progress: {idx}/{len(product_urls)} | Processed: {processed} | Skipped: {skipped} | Errors: {errors}")
-                continue
-        except:
-            pass
+        match = sku_re.search(url) if sku_re else None
+        sku = match.group(1) if match else ""
+        if sku and sku in visited_skus:
+            skipped += 1
+            if idx % 100 == 0:
+                logger.info(f"Progress: {idx}/{len(product_urls)} | Processed: {processed} | Skipped: {skipped} | Errors: {errors}")
+            continue
         
         # Fetch and parse
         try:
-            import time
-            time.sleep(1)  # Rate limiting: 1 second between requests
-            
             logger.info(f"[{idx}/{len(product_urls)}] Processing: {url}")
             html = fetcher.fetch(url)
             if not html:
@@ -131,7 +112,7 @@ def main():
                 
                 # Add to visited SKUs
                 if product_data.get('sku'):
-                    visited_skus.add(product_data['sku'].upper())
+                    visited_skus.add(product_data['sku'])
                 
                 processed += 1
             else:
@@ -151,6 +132,10 @@ def main():
     logger.info(f"Processed: {processed}")
     logger.info(f"Skipped (already in DB): {skipped}")
     logger.info(f"Errors: {errors}")
+    logger.info(f"SKU index: {visited_skus.report()}")
+    logger.info(f"Fetch tiers: {dict(fetcher.tier_counts)}")
+    logger.info(f"Final request rates: {fetcher.rate_limiter.rates()}")
+    fetcher.close()
     logger.info("Done.")
 
 if __name__ == "__main__":
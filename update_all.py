@@ -8,6 +8,9 @@ import logging
 from pathlib import Path
 from crawler.sitemap import SitemapCrawler
 from crawler.fetcher import HTMLFetcher
+from crawler.ratelimit import AdaptiveRateLimiter
+from crawler.revalidation import ValidatorStore
+from crawler.archive import PageArchive
 from crawler.parser import HTMLParser
 from crawler.pipeline import DataPipeline
 from urllib.parse import urljoin
@@ -41,21 +44,30 @@ def main():
     
     logger.info(f"Will update {len(product_urls)} products")
     
-    fetcher = HTMLFetcher()
+    # Per-domain adaptive throttle (rate_limit section of the config) instead of a fixed sleep
+    # Conditional GETs: pages unchanged since the last update are not re-parsed or re-written
+    validators = ValidatorStore(config['db_path'])
+    fetcher = HTMLFetcher(rate_limiter=AdaptiveRateLimiter.from_config(config), validators=validators)
     pipeline = DataPipeline(config['db_path'])
+    archive = PageArchive.from_config(config)
     
     processed = 0
+    unchanged = 0
     errors = 0
     
     for idx, url in enumerate(product_urls, 1):
         try:
-            import time
-            time.sleep(0.5)  # Faster for updates
-            
             if idx % 50 == 0:
-                logger.info(f"Progress: {idx}/{len(product_urls)} | Processed: {processed} | Errors: {errors}")
+                logger.info(f"Progress: {idx}/{len(product_urls)} | Processed: {processed} | Unchanged: {unchanged} | Errors: {errors}")
             
-            html = fetcher.fetch(url)
+            result = fetcher.fetch_page(url)
+            if archive and result.html:
+                archive.store(result, config.get("supplier"))
+            if result.unchanged:
+                pipeline.touch_url(url)
+                unchanged += 1
+                continue
+            html = result.html
             if not html:
                 errors += 1
                 continue
@@ -86,6 +98,7 @@ def main():
                     product_data['properties'] = {}
                 
                 pipeline.process_item(product_data)
+                validators.remember(result)
                 processed += 1
             else:
                 errors += 1
@@ -96,7 +109,15 @@ def main():
     
     logger.info(f"UPDATE Complete!")
     logger.info(f"Processed: {processed}")
+    logger.info(f"Unchanged: {unchanged}")
     logger.info(f"Errors: {errors}")
+    logger.info(f"Fetch tiers: {dict(fetcher.tier_counts)}")
+    logger.info(f"Final request rates: {fetcher.rate_limiter.rates()}")
+    fetcher.close()
+    validators.close()
+    if archive:
+        logger.info(f"Archive: {archive.report()}")
+        archive.close()
 
 if __name__ == "__main__":
     main()